@@ -0,0 +1,164 @@
+"""
+Per-user data versions and cached, pre-serialized profile reads.
+
+Each user has a version counter that is bumped, once the writing transaction
+commits, whenever their profile, portfolios or transactions change. It keys the
+cached (version, data) profile entry and the ETags of the user's GET endpoints.
+Readers take the version before reading the database and store their result
+under it, so a reader racing a write can only ever store data under a version
+that is already stale. Reads from a lagging replica may predate the version,
+so they are neither stored nor given an ETag. A missing counter is started from the current time in
+milliseconds, which stays ahead of any counter that was evicted, so versions
+never go backwards.
+
+Versions only reach every worker through a shared cache backend. With a
+process-local one (the locmem default), a worker never sees another's bumps, so
+versions and entries there expire after PROFILE_LOCAL_CACHE_SECONDS instead,
+which bounds how long that worker serves stale profiles and ETags.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from investments.models import Portfolio, Transaction
+from server.db_router import in_replica_reads, pin_to_primary, process_local
+from virtual_market.models import VirtualPortfolio, VirtualTransaction
+from .models import UserProfile
+from .serializers import UserProfileSerializer
+
+
+def _cache():
+    return caches[settings.PROFILE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f"user:version:{user_id}"
+
+
+def _data_key(user_id):
+    return f"profile:data:{user_id}"
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _timeouts():
+    """(version timeout, data timeout) for the profile cache backend."""
+    if process_local(settings.PROFILE_CACHE_ALIAS):
+        local = settings.PROFILE_LOCAL_CACHE_SECONDS
+        return local, min(local, settings.PROFILE_CACHE_SECONDS)
+    return None, settings.PROFILE_CACHE_SECONDS
+
+
+def get_data_version(user_id):
+    """Current version of a user's data, starting a counter if there is none."""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _now_ms(), _timeouts()[0])
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def get_profile_data(user_id):
+    """
+    Serialized UserProfile for a user id, from the cache when it is current.
+
+    :return: The UserProfileSerializer data, or None if the user has no profile.
+    """
+    cache = _cache()
+    cached = cache.get_many([_version_key(user_id), _data_key(user_id)])
+    version = cached.get(_version_key(user_id))
+    if version is None:
+        version = get_data_version(user_id)
+    entry = cached.get(_data_key(user_id))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    profile = UserProfile.objects.select_related('user').filter(user__id=user_id).first()
+    if profile is None:
+        return None
+    data = dict(UserProfileSerializer(profile).data)
+    if not in_replica_reads():
+        cache.set(_data_key(user_id), (version, data), _timeouts()[1])
+    return data
+
+
+def user_data_etag(request, *args, **kwargs):
+    """
+    ETag for a user's GET endpoint, for use with django.views.decorators.http.condition.
+
+    It changes whenever the user's data version does, and differs per path,
+    query string and negotiated media type (DRF has negotiated it by the time
+    the handler runs) since those select different representations.
+    """
+    user_id = kwargs.get('id', kwargs.get('user_id'))
+    if user_id is None or in_replica_reads():
+        return None
+    media_type = getattr(request, 'accepted_media_type', '') or ''
+    representation = hashlib.md5(f"{request.get_full_path()}|{media_type}".encode()).hexdigest()[:12]
+    return f"{user_id}-{get_data_version(user_id)}-{representation}"
+
+
+def _etag_user_data(view_func):
+    conditional = condition(etag_func=user_data_etag)(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        patch_vary_headers(response, ['Accept'])  # On 304s too, which skip the renderer
+        return response
+
+    return wrapper
+
+
+# For APIView.get methods that take the user id as `id` or `user_id`: answers
+# If-None-Match with 304 after a single cache lookup, before the view runs
+etag_user_data = method_decorator(_etag_user_data)
+
+
+def invalidate_user_data(user_id):
+    """
+    Bump the user's data version once the current transaction commits, and
+    keep their replica-routed reads on the primary while the write replicates.
+    """
+    def bump():
+        cache = _cache()
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), _now_ms(), _timeouts()[0])
+        pin_to_primary(user_id)
+
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_saved_profile(sender, instance, **kwargs):
+    invalidate_user_data(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_saved_user(sender, instance, **kwargs):
+    invalidate_user_data(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Portfolio)
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=VirtualPortfolio)
+@receiver([post_save, post_delete], sender=VirtualTransaction)
+def invalidate_saved_holding(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (User, UserProfile)):
+        return  # Cascaded from deleting the user, which bumps the version itself
+    invalidate_user_data(instance.user_profile.user_id)
@@ -0,0 +1,18 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import user_group
+
+
+class UserEventsConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes a user's trade deltas (balances, changed position, new transaction)."""
+
+    async def connect(self):
+        self.group = user_group(self.scope['url_route']['kwargs']['id'])
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def user_event(self, event):
+        await self.send_json(event['event'])
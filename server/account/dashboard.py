@@ -0,0 +1,149 @@
+"""
+Everything the dashboard screens need for one user, in one response.
+
+The profile comes from the profile cache and each other section is one query
+filtered directly on the user id, so a full dashboard costs at most five simple
+queries. Holdings are valued from cached prices only (the replayed tick for
+virtual holdings during a market replay), falling back to the user's last
+trade price, so building a dashboard never waits on yfinance.
+"""
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+
+from investments.models import Portfolio, Transaction
+from investments.prices import get_cached_prices
+from virtual_market.models import VirtualPortfolio, VirtualTransaction
+from virtual_market.replay import current_prices
+from .cache import get_profile_data
+
+SECTIONS = ['profile', 'portfolio', 'virtual_portfolio', 'transactions', 'virtual_transactions']
+TRANSACTION_FIELDS = ['id', 'asset_symbol', 'quantity', 'transaction_type', 'price', 'amount', 'created_at']
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class DashboardError(Exception):
+    pass
+
+
+def parse_fields(fields):
+    """
+    Parse a sparse field selection like "profile.balance,portfolio".
+
+    :return: {section: set of subfields, or None for the whole section}
+    :raises DashboardError: If a section is unknown.
+    """
+    if not fields:
+        return dict.fromkeys(SECTIONS)
+    selected = {}
+    for item in filter(None, (part.strip() for part in fields.split(','))):
+        section, _, subfield = item.partition('.')
+        if section not in SECTIONS:
+            raise DashboardError(f"Unknown field '{section}'. Valid fields: {', '.join(SECTIONS)}")
+        if not subfield:
+            selected[section] = None
+        elif section not in selected or selected[section] is not None:
+            selected.setdefault(section, set()).add(subfield)
+    return selected
+
+
+def _money(value):
+    return str(value.quantize(Decimal('0.01')))
+
+
+def _value_holdings(rows, market_prices):
+    holdings, total = [], Decimal('0.00')
+    for symbol, quantity, last_trade_price in rows:
+        price, source = market_prices.get(symbol), 'market'
+        if price is None:
+            price, source = last_trade_price, 'last_trade'
+        value = price * quantity if price is not None else None
+        total += value or 0
+        holdings.append({
+            'asset_symbol': symbol,
+            'quantity': quantity,
+            'price': _money(price) if price is not None else None,
+            'price_source': source if price is not None else None,
+            'value': _money(value) if value is not None else None,
+        })
+    return {'holdings': holdings, 'value': _money(total)}
+
+
+def _portfolio(user_id):
+    last_price = Transaction.objects.filter(
+        user_profile=OuterRef('user_profile'), asset_symbol=OuterRef('asset_symbol')
+    ).order_by('-created_at').values('price')[:1]
+    rows = list(Portfolio.objects.filter(user_profile__user_id=user_id).annotate(
+        last_trade_price=Subquery(last_price)
+    ).values_list('asset_symbol', 'quantity', 'last_trade_price'))
+    return _value_holdings(rows, get_cached_prices([row[0] for row in rows]))
+
+
+def _virtual_portfolio(user_id):
+    last_price = VirtualTransaction.objects.filter(
+        user_profile=OuterRef('user_profile'), virtual_asset_symbol=OuterRef('virtual_asset_symbol')
+    ).order_by('-virtual_created_at').values('virtual_price')[:1]
+    rows = list(VirtualPortfolio.objects.filter(user_profile__user_id=user_id).annotate(
+        last_trade_price=Subquery(last_price)
+    ).values_list('virtual_asset_symbol', 'virtual_quantity', 'last_trade_price'))
+    symbols = [row[0] for row in rows]
+    prices = get_cached_prices(symbols)
+    prices.update(current_prices(symbols))  # A running replay sets the virtual market's prices
+    return _value_holdings(rows, prices)
+
+
+def _transactions(rows):
+    return [{
+        'id': id,
+        'asset_symbol': symbol,
+        'quantity': quantity,
+        'transaction_type': transaction_type,
+        'price': _money(price),
+        'amount': _money(amount),
+        'created_at': created_at,
+    } for id, symbol, quantity, transaction_type, price, amount, created_at in rows]
+
+
+def _latest_transactions(user_id, limit):
+    return _transactions(Transaction.objects.filter(user_profile__user_id=user_id).order_by(
+        '-created_at', '-id'
+    ).values_list(*TRANSACTION_FIELDS)[:limit])
+
+
+def _latest_virtual_transactions(user_id, limit):
+    return _transactions(VirtualTransaction.objects.filter(user_profile__user_id=user_id).order_by(
+        '-virtual_created_at', '-id'
+    ).values_list(
+        'id', 'virtual_asset_symbol', 'virtual_quantity', 'virtual_transaction_type',
+        'virtual_price', 'virtual_amount', 'virtual_created_at',
+    )[:limit])
+
+
+def _select(value, subfields):
+    if subfields is None:
+        return value
+    if isinstance(value, list):
+        return [{key: item[key] for key in subfields if key in item} for item in value]
+    return {key: value[key] for key in subfields if key in value}
+
+
+def build_dashboard(user_id, selected, limit=DEFAULT_LIMIT):
+    """
+    Dashboard sections for a user.
+
+    :param selected: Output of `parse_fields`.
+    :return: The dashboard dict, or None if the user has no profile.
+    """
+    profile = get_profile_data(user_id)
+    if profile is None:
+        return None
+
+    builders = {
+        'profile': lambda: profile,
+        'portfolio': lambda: _portfolio(user_id),
+        'virtual_portfolio': lambda: _virtual_portfolio(user_id),
+        'transactions': lambda: _latest_transactions(user_id, limit),
+        'virtual_transactions': lambda: _latest_virtual_transactions(user_id, limit),
+    }
+    return {section: _select(builders[section](), subfields) for section, subfields in selected.items()}
@@ -0,0 +1,57 @@
+"""
+Per-user push events over Channels.
+
+Events are sent to the `user.<id>` group, which every `ws/user/<id>/`
+connection joins, and only once the surrounding database transaction commits
+so clients never see a trade that was rolled back.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+BALANCE_FIELDS = {
+    'real': ['balance', 'boughtsum', 'stocks', 'bonds', 'insurance'],
+    'virtual': ['virtualbalance', 'virtualboughtsum', 'virtualstocks', 'virtualbonds', 'virtualinsurance'],
+}
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+def publish_user_event(user_id, event):
+    """Send an event to the user's connections after the current transaction commits."""
+    def send():
+        try:
+            layer = get_channel_layer()
+            if layer is not None:
+                async_to_sync(layer.group_send)(user_group(user_id), {'type': 'user.event', 'event': event})
+        except Exception as e:
+            # An unavailable channel layer must never fail a trade that already committed
+            logger.warning("Error publishing event for user %s: %s", user_id, e)
+
+    transaction.on_commit(send)
+
+
+def trade_event(profile, market, symbol, quantity, transaction_data, profit_loss=None):
+    """
+    Compact delta for one committed trade.
+
+    :param market: 'real' or 'virtual', selecting which balances are sent.
+    :param quantity: Quantity of the position after the trade; 0 once it is closed.
+    :param transaction_data: JSON-ready fields of the new transaction.
+    """
+    event = {
+        'type': 'trade',
+        'market': market,
+        'balances': {field: str(getattr(profile, field)) for field in BALANCE_FIELDS[market]},
+        'position': {'symbol': symbol, 'quantity': quantity},
+        'transaction': transaction_data,
+    }
+    if profit_loss is not None:
+        event['profit_loss'] = str(profit_loss)
+    return event
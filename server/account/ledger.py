@@ -0,0 +1,117 @@
+"""
+Rebuilding and verifying profile balances from the balance ledger.
+
+A profile's balances are its latest BalanceSnapshot plus the sum of its ledger
+entries after the snapshot's `through_entry` (or the sum of all its entries
+without a snapshot). `check_batch` verifies a batch of profiles with a constant
+number of GROUP BY queries, so the checker streams through millions of ledger
+rows without loading them.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BALANCE_FIELDS, BalanceLedgerEntry, BalanceSnapshot, UserProfile
+
+ZERO = Decimal('0.00')
+
+# Snapshots only cover entries this old, so a slow transaction committing an
+# entry with a lower id than one already visible is never skipped
+SNAPSHOT_SETTLE = timedelta(minutes=1)
+
+
+def _latest_snapshot_through():
+    return BalanceSnapshot.objects.filter(
+        user_profile_id=OuterRef('user_profile_id')
+    ).order_by('-through_entry').values('through_entry')[:1]
+
+
+def _latest_snapshots(profile_ids):
+    latest = BalanceSnapshot.objects.filter(user_profile_id__in=profile_ids).values('user_profile_id').annotate(
+        last=Max('id')
+    ).values('last')
+    return {
+        row[0]: dict(zip(BALANCE_FIELDS, row[1:]))
+        for row in BalanceSnapshot.objects.filter(id__in=latest).values_list('user_profile_id', *BALANCE_FIELDS)
+    }
+
+
+def _tails(profile_ids, settled_through=None):
+    """
+    Per profile: the number of ledger entries after its latest snapshot, their
+    sums, and with `settled_through` the sums and last id of those entries up to it.
+    """
+    aggregates = {'count': Count('id')}
+    aggregates.update({f"sum_{name}": Sum(name) for name in BALANCE_FIELDS})
+    if settled_through is not None:
+        settled = Q(id__lte=settled_through)
+        aggregates['settled_last'] = Max('id', filter=settled)
+        aggregates.update({f"settled_{name}": Sum(name, filter=settled) for name in BALANCE_FIELDS})
+    rows = BalanceLedgerEntry.objects.filter(user_profile_id__in=profile_ids).filter(
+        id__gt=Coalesce(Subquery(_latest_snapshot_through()), Value(0))
+    ).values('user_profile_id').annotate(**aggregates)
+    return {row.pop('user_profile_id'): row for row in rows}
+
+
+def _add(base, tail, prefix='sum_'):
+    return {name: (base or {}).get(name, ZERO) + (tail.get(f"{prefix}{name}") or ZERO) for name in BALANCE_FIELDS}
+
+
+def rebuild_balances(profile_id):
+    """Balances of a profile according to its ledger, as {field: Decimal}."""
+    return _add(_latest_snapshots([profile_id]).get(profile_id), _tails([profile_id]).get(profile_id, {}))
+
+
+def settled_entry_id():
+    """Highest ledger entry id that snapshots may cover."""
+    return BalanceLedgerEntry.objects.filter(
+        created_at__lt=timezone.now() - SNAPSHOT_SETTLE
+    ).aggregate(last=Max('id'))['last'] or 0
+
+
+def check_batch(profile_ids, snapshot_through=None):
+    """
+    Compare the stored balances of profiles with their ledgers.
+
+    :param snapshot_through: If given (see `settled_entry_id`), also snapshot
+        each profile's ledger up to this entry id when it has new entries.
+    :return: (entries_read, {profile_id: {field: (ledger_value, stored_value)}})
+        for profiles whose balances differ from their ledger.
+    """
+    snapshots = _latest_snapshots(profile_ids)
+    tails = _tails(profile_ids, snapshot_through)
+    stored = {row[0]: row[1:] for row in UserProfile.objects.filter(id__in=profile_ids).values_list('id', *BALANCE_FIELDS)}
+
+    mismatches, new_snapshots = {}, []
+    for profile_id, values in stored.items():
+        tail = tails.get(profile_id, {})
+        expected = _add(snapshots.get(profile_id), tail)
+        differences = {name: (expected[name], value) for name, value in zip(BALANCE_FIELDS, values) if expected[name] != value}
+        if differences:
+            mismatches[profile_id] = differences
+        if snapshot_through is not None and tail.get('settled_last'):
+            new_snapshots.append(BalanceSnapshot(
+                user_profile_id=profile_id, through_entry=tail['settled_last'],
+                **_add(snapshots.get(profile_id), tail, prefix='settled_'),
+            ))
+    BalanceSnapshot.objects.bulk_create(new_snapshots)
+    return sum(tail['count'] for tail in tails.values()), mismatches
+
+
+def recheck(profile_id):
+    """
+    Check one profile with its row locked, so a trade committing between the
+    batch queries cannot show up as a mismatch.
+
+    :return: {field: (ledger_value, stored_value)} for the fields that differ.
+    """
+    with transaction.atomic():
+        values = UserProfile.objects.select_for_update().filter(id=profile_id).values_list(*BALANCE_FIELDS).first()
+        if values is None:
+            return {}
+        expected = rebuild_balances(profile_id)
+        return {name: (expected[name], value) for name, value in zip(BALANCE_FIELDS, values) if expected[name] != value}
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from account.ledger import check_batch, recheck, settled_entry_id
+from account.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Verify every profile's balances against the balance ledger in a streaming batch pass, "
+            "optionally taking fresh snapshots so later checks and rebuilds read shorter ledger tails.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Profiles checked per batch of queries")
+        parser.add_argument('--snapshot', action='store_true', help="Snapshot each profile's ledger as it is checked")
+        parser.add_argument('--show', type=int, default=20, help="Mismatched profiles to print in detail")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        snapshot_through = settled_entry_id() if options['snapshot'] else None
+        start = time.perf_counter()
+        profiles = entries = 0
+        mismatched = []
+        last_id = 0
+        while True:
+            ids = list(UserProfile.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            read, mismatches = check_batch(ids, snapshot_through)
+            profiles += len(ids)
+            entries += read
+            for profile_id in mismatches:
+                # A trade may have committed between the batch queries; look again with the row locked
+                differences = recheck(profile_id)
+                if differences:
+                    mismatched.append((profile_id, differences))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Checked {profiles} profiles and {entries} ledger entries in {elapsed:.1f}s"
+                          f"{' (snapshots taken)' if snapshot_through else ''}")
+        for profile_id, differences in mismatched[:options['show']]:
+            details = ', '.join(f"{name} ledger {expected} stored {stored}" for name, (expected, stored) in differences.items())
+            self.stdout.write(f"  profile {profile_id}: {details}")
+        if mismatched:
+            raise CommandError(f"{len(mismatched)} profiles differ from their ledger")
+        self.stdout.write("All balances match their ledgers")
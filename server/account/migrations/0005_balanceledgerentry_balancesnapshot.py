@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_alter_userprofile_virtualboughtsum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('boughtsum', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('stocks', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('bonds', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('insurance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('virtualbalance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('virtualboughtsum', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('virtualstocks', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('virtualbonds', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('virtualinsurance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_profile', 'id'], name='account_bal_user_pr_3767ee_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('through_entry', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('boughtsum', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('stocks', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('bonds', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('insurance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtualbalance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtualboughtsum', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtualstocks', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtualbonds', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtualinsurance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_profile', 'through_entry'], name='account_bal_user_pr_d28af1_idx')],
+            },
+        ),
+    ]
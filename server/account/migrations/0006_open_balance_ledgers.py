@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:29
+
+from django.db import migrations
+
+BALANCE_FIELDS = [
+    'balance', 'boughtsum', 'stocks', 'bonds', 'insurance',
+    'virtualbalance', 'virtualboughtsum', 'virtualstocks', 'virtualbonds', 'virtualinsurance',
+]
+
+
+def open_ledgers(apps, schema_editor):
+    """Start every existing profile's ledger with one entry holding its current balances."""
+    UserProfile = apps.get_model('account', 'UserProfile')
+    BalanceLedgerEntry = apps.get_model('account', 'BalanceLedgerEntry')
+    rows = UserProfile.objects.order_by('id').values_list('id', *BALANCE_FIELDS)
+    entries = []
+    for profile_id, *balances in rows.iterator(chunk_size=5000):
+        entries.append(BalanceLedgerEntry(user_profile_id=profile_id, reason='open', **dict(zip(BALANCE_FIELDS, balances))))
+        if len(entries) >= 5000:
+            BalanceLedgerEntry.objects.bulk_create(entries)
+            entries = []
+    BalanceLedgerEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_balanceledgerentry_balancesnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
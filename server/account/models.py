@@ -1,8 +1,35 @@
-from django.db import models
+import contextvars
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+# Running totals whose every change is appended to the BalanceLedgerEntry table
+BALANCE_FIELDS = [
+    'balance', 'boughtsum', 'stocks', 'bonds', 'insurance',
+    'virtualbalance', 'virtualboughtsum', 'virtualstocks', 'virtualbonds', 'virtualinsurance',
+]
+
+_ledger_reason = contextvars.ContextVar('ledger_reason', default='update')
+
+
+@contextmanager
+def ledger_reason(reason):
+    """Label the ledger entries of profile saves made inside the block, e.g. 'trade'."""
+    token = _ledger_reason.set(reason)
+    try:
+        yield
+    finally:
+        _ledger_reason.reset(token)
+
+
+def _to_cents(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=10000.00)
@@ -22,7 +49,81 @@ class UserProfile(models.Model):
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        """
+        Save, appending the change of every balance field to the ledger in the
+        same transaction. The change is taken from the stored row, locked until
+        the transaction ends, so concurrent saves of stale instances each ledger
+        what they actually changed.
+        """
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        fields = [name for name in BALANCE_FIELDS if update_fields is None or name in update_fields]
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            stored = None
+            if not adding and fields:
+                stored = UserProfile.objects.using(using).select_for_update().filter(pk=self.pk).values(*fields).first()
+            super().save(*args, **kwargs)
+            if any(isinstance(getattr(self, name), models.expressions.Combinable) for name in fields):
+                self.refresh_from_db(fields=fields)  # Saved from F() expressions
+            stored = {name: _to_cents(value) for name, value in (stored or {}).items()}
+            deltas = {name: _to_cents(getattr(self, name)) - stored.get(name, Decimal('0.00')) for name in fields}
+            if any(deltas.values()):
+                BalanceLedgerEntry.objects.create(
+                    user_profile=self, reason='open' if adding else _ledger_reason.get(), **deltas
+                )
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+class BalanceLedgerEntry(models.Model):
+    """
+    One change to a profile's balance fields, appended by UserProfile.save and
+    never updated. A profile's balances are the sum of its entries.
+    """
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    reason = models.CharField(max_length=20)  # 'open', 'trade', 'virtual_trade', 'recompute', 'update', ...
+    created_at = models.DateTimeField(auto_now_add=True)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    boughtsum = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    stocks = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    bonds = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    insurance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    virtualbalance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    virtualboughtsum = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    virtualstocks = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    virtualbonds = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    virtualinsurance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['user_profile', 'id'])]
+
+    def __str__(self):
+        return f"{self.user_profile} - {self.reason} ledger entry {self.id}"
+
+
+class BalanceSnapshot(models.Model):
+    """A profile's balances as the sum of its ledger entries up to and including `through_entry`."""
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    through_entry = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    boughtsum = models.DecimalField(max_digits=15, decimal_places=2)
+    stocks = models.DecimalField(max_digits=15, decimal_places=2)
+    bonds = models.DecimalField(max_digits=15, decimal_places=2)
+    insurance = models.DecimalField(max_digits=15, decimal_places=2)
+    virtualbalance = models.DecimalField(max_digits=15, decimal_places=2)
+    virtualboughtsum = models.DecimalField(max_digits=15, decimal_places=2)
+    virtualstocks = models.DecimalField(max_digits=15, decimal_places=2)
+    virtualbonds = models.DecimalField(max_digits=15, decimal_places=2)
+    virtualinsurance = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=['user_profile', 'through_entry'])]
+
+    def __str__(self):
+        return f"{self.user_profile} - balances through ledger entry {self.through_entry}"
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import UserEventsConsumer
+
+websocket_urlpatterns = [
+    path('ws/user/<int:id>/', UserEventsConsumer.as_asgi()),
+]
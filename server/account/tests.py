@@ -1,3 +1,124 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from investments.trading import execute_trade
+from .cache import _timeouts, get_profile_data
+from .ledger import check_batch
+from .models import BalanceLedgerEntry, UserProfile
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', password='secret')
+        self.profile = UserProfile.objects.get(user=self.user)
+
+    def assertLedgerMatches(self):
+        self.assertEqual(check_batch([self.profile.id])[1], {})
+
+    def trade(self, transaction_type, quantity, price, asset_type='stock'):
+        self.profile.refresh_from_db()
+        execute_trade(self.profile, 'IBM', asset_type, quantity, Decimal(price), transaction_type)
+
+    def virtual_trade(self, transaction_type, quantity, price):
+        response = APIClient().post('/virtual/transactions/', {
+            'user_id': self.user.id, 'virtual_asset_symbol': 'IBM', 'virtual_asset_type': 'stock',
+            'virtual_price': price, 'virtual_quantity': quantity, 'virtual_transaction_type': transaction_type,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_opening_balances_are_ledgered(self):
+        self.assertEqual(BalanceLedgerEntry.objects.get(user_profile=self.profile).reason, 'open')
+        self.assertLedgerMatches()
+
+    def test_trades_keep_ledger_equal_to_balances(self):
+        self.trade('buy', 10, '100')
+        self.trade('buy', 5, '50', asset_type='bond')
+        self.trade('sell', 4, '120')
+        self.assertLedgerMatches()
+        self.assertEqual(BalanceLedgerEntry.objects.filter(user_profile=self.profile, reason='trade').count(), 3)
+
+    def test_virtual_trades_keep_ledger_equal_to_balances(self):
+        self.virtual_trade('buy', 10, '100')
+        self.virtual_trade('sell', 3, '110')
+        self.assertLedgerMatches()
+        self.assertEqual(BalanceLedgerEntry.objects.filter(user_profile=self.profile, reason='virtual_trade').count(), 2)
+
+    def test_save_of_stale_instance_ledgers_the_stored_change(self):
+        stale = UserProfile.objects.get(id=self.profile.id)
+        self.trade('buy', 10, '100')
+        stale.balance = Decimal('5000.00')
+        stale.save()
+        self.assertLedgerMatches()
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class UserDataETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='reader', password='secret')
+        self.url = f'/user/profile/{self.user.id}/'
+
+    def get(self, etag=None, url=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url or self.url, **headers)
+
+    def trade(self):
+        profile = UserProfile.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            execute_trade(profile, 'IBM', 'stock', 10, Decimal('100'), 'buy')
+
+    def test_matching_etag_gets_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        not_modified = self.get(etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertIn('Accept', not_modified['Vary'])
+
+    def test_etag_differs_per_representation(self):
+        self.assertNotEqual(self.get()['ETag'], self.get(url=f'/user/profile/{self.user.id}').get('ETag'))
+        self.assertNotEqual(self.get()['ETag'], self.get(url=f'{self.url}?format=json')['ETag'])
+
+    def test_committed_write_changes_etag(self):
+        response = self.get()
+        self.trade()
+
+        fresh = self.get(response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+        self.assertEqual(Decimal(fresh.data['balance']), Decimal(response.data['balance']) - 1000)
+
+    def test_uncommitted_write_keeps_etag(self):
+        etag = self.get()['ETag']
+        profile = UserProfile.objects.get(user=self.user)
+        execute_trade(profile, 'IBM', 'stock', 10, Decimal('100'), 'buy')  # Its on_commit bump never runs
+        self.assertEqual(self.get(etag).status_code, 304)
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='secret')
+
+    def test_cached_profile_is_served_without_queries(self):
+        data = get_profile_data(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile_data(self.user.id), data)
+
+    def test_committed_save_invalidates_cached_profile(self):
+        get_profile_data(self.user.id)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.balance = Decimal('1234.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(get_profile_data(self.user.id)['balance'], '1234.00')
+
+    @override_settings(PROFILE_LOCAL_CACHE_SECONDS=5, PROFILE_CACHE_SECONDS=3600)
+    def test_process_local_cache_expires_quickly(self):
+        self.assertEqual(_timeouts(), (5, 5))
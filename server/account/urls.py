@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import  UserProfileDetail, UserRegistrationView, UserLoginView, ProfileView, VirtualProfileView
+from .views import  UserProfileDetail, UserRegistrationView, UserLoginView, ProfileView, VirtualProfileView, DashboardView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('profile/<int:id>', ProfileView.as_view(), name='profile'),
     path('profile/<int:user_id>/', UserProfileDetail.as_view(), name='user-profile-detail'),
     path('virtualprofile/<int:id>/', VirtualProfileView.as_view(), name='virtual-profile'),
+    path('dashboard/<int:id>/', DashboardView.as_view(), name='dashboard'),
 ]
@@ -5,6 +5,9 @@ from rest_framework import status
 from rest_framework.views import APIView
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 from .models import UserProfile
+from .cache import etag_user_data, get_profile_data
+from server.db_router import read_from_replica
+from .dashboard import DEFAULT_LIMIT, MAX_LIMIT, DashboardError, build_dashboard, parse_fields
 
 class UserRegistrationView(APIView):
     def post(self, request):
@@ -25,13 +28,12 @@ class UserLoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class ProfileView(APIView):
+    @etag_user_data
     def get(self, request, id=None):
-        try:
-            profile = UserProfile.objects.get(user__id=id)
-            serializer = UserProfileSerializer(profile)
-            return Response(serializer.data)
-        except UserProfile.DoesNotExist:
+        data = get_profile_data(id)
+        if data is None:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
         
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -51,13 +53,12 @@ class UserProfileDetail(APIView):
     Retrieve or update a user's profile.
     """
 
+    @etag_user_data
     def get(self, request, user_id, format=None):
-        try:
-            profile = UserProfile.objects.get(user__id=user_id)
-            serializer = UserProfileSerializer(profile)
-            return Response(serializer.data)
-        except UserProfile.DoesNotExist:
+        data = get_profile_data(user_id)
+        if data is None:
             return Response({"error": "User profile not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
 
     def put(self, request, user_id, format=None):
         try:
@@ -75,13 +76,12 @@ class UserProfileDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class VirtualProfileView(APIView):
+    @etag_user_data
     def get(self, request, id=None):
-        try:
-            profile = UserProfile.objects.get(user__id=id)
-            serializer = UserProfileSerializer(profile)
-            return Response(serializer.data)
-        except UserProfile.DoesNotExist:
+        data = get_profile_data(id)
+        if data is None:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
 
     def put(self, request, id=None):
         try:
@@ -94,4 +94,30 @@ class VirtualProfileView(APIView):
         except UserProfile.DoesNotExist:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
+class DashboardView(APIView):
+    """
+    Profile, both portfolios with valuations and the latest transactions in one response.
+
+    Query parameters: `fields` selects sections or sub-fields (e.g.
+    "profile.balance,portfolio,transactions"); `limit` caps each transaction list.
+
+    Unlike the other user endpoints it has no ETag: its valuations follow
+    market prices and replay ticks, which the user's data version does not track.
+    """
 
+    @read_from_replica
+    def get(self, request, id=None):
+        try:
+            selected = parse_fields(request.query_params.get('fields'))
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except DashboardError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < limit <= MAX_LIMIT:
+            return Response({"error": f"limit must be between 1 and {MAX_LIMIT}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        dashboard = build_dashboard(id, selected, limit)
+        if dashboard is None:
+            return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(dashboard)
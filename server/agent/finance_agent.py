@@ -0,0 +1,107 @@
+"""
+The phi/Groq finance agent.
+
+Importing phi pulls in the whole agent stack, so this module is only imported
+when an agent run actually happens, not at URLconf load.
+"""
+from functools import wraps
+
+from dotenv import load_dotenv
+from groq.types.chat import ChatCompletion
+from phi.agent import Agent
+from phi.model.groq import Groq
+from phi.tools.yfinance import YFinanceTools
+
+from . import harness
+from .memory import ConversationMemory, portfolio_table
+from .parallel import run_parallel, ExecutedFunctionCall
+
+
+class FinanceGroq(Groq):
+    """
+    Groq model whose completions go through the record/replay harness and
+    whose tool calls from a single model turn run concurrently.
+    """
+
+    def run_function_calls(self, function_calls, function_call_results, tool_role="tool"):
+        if len(function_calls) > 1:
+            outcomes = run_parallel([fc.execute for fc in function_calls], return_exceptions=True)
+            # The base implementation then builds results in the original call order
+            function_calls = [ExecutedFunctionCall(fc, outcome) for fc, outcome in zip(function_calls, outcomes)]
+        yield from super().run_function_calls(function_calls, function_call_results, tool_role=tool_role)
+
+    def invoke(self, messages):
+        return harness.call(
+            'llm', self.id, super().invoke, args=(messages,),
+            key_data=[(m.role, m.content, m.tool_call_id) for m in messages],
+            encode=lambda completion: completion.model_dump(mode='json'),
+            decode=ChatCompletion.model_validate,
+        )
+
+
+def harness_tools(toolkit):
+    """Route every function of a phi toolkit through the record/replay harness."""
+    for name, function in toolkit.functions.items():
+        def traced(entrypoint, name):
+            @wraps(entrypoint)
+            def wrapper(**kwargs):
+                return harness.call('tool', name, entrypoint, kwargs=kwargs)
+            return wrapper
+        function.entrypoint = traced(function.entrypoint, name)
+    return toolkit
+
+
+def run_finance_agent(prompt, user_id=None):
+    """
+    Run the Groq finance agent on a prompt and return its markdown content.
+
+    With a user_id the prompt carries that user's bounded conversation history
+    and holdings, and the exchange is added to it afterwards.
+    """
+    load_dotenv()
+
+    # Initialize the finance agent
+    with harness.stage('prompt'):
+        finance_agent = build_finance_agent()
+        memory = ConversationMemory(user_id, 'finance') if user_id is not None else None
+        message = prompt
+        if memory is not None:
+            message = (
+                f"Current holdings (symbol|qty):\n{portfolio_table(user_id)}\n\n"
+                f"Conversation so far:\n{memory.context()}\n\n"
+                f"Request: {prompt}"
+            )
+
+    run = finance_agent.run(message)
+    with harness.stage('post'):
+        if memory is not None:
+            memory.add_exchange(prompt, run.content)
+        return run.content
+
+
+def build_finance_agent():
+    return Agent(
+        name="Finance Agent",
+        model=FinanceGroq(
+            id="llama-3.3-70b-versatile",
+            temperature=0.4,
+            max_tokens=2048,
+        ),
+        tools=[harness_tools(YFinanceTools(
+            stock_price=True,
+            analyst_recommendations=True,
+            company_info=True,
+            company_news=True,
+        ))],
+        instructions=[
+            "1. Collect financial data using available tools",
+            "2. Compare companies systematically",
+            "3. Present data in markdown tables",
+            "4. Include data sources and dates",
+            "5. Highlight key metrics",
+            "6. Show data in tabular format"
+        ],
+        show_tool_calls=False,
+        markdown=True,
+        debug=False,
+    )
@@ -0,0 +1,170 @@
+"""
+Record/replay harness for agent runs.
+
+Every LLM request and tool call made by an agent goes through `call()`. With no
+cassette active it just times the call. Inside `use_cassette(path, 'record')`
+the result is also written to a JSON cassette, and inside
+`use_cassette(path, 'replay')` the recorded result is served back without
+touching Gemini, Groq or Yahoo.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from server.instrumentation import timed
+
+_cassette = contextvars.ContextVar('agent_cassette', default=None)
+_timings = contextvars.ContextVar('agent_timings', default=None)
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+class Timings:
+    """
+    Per-stage durations (seconds) collected during one or more agent runs.
+
+    Stages record self time: a tool call made inside the 'post' stage is
+    counted under its own stage and subtracted from 'post'.
+    """
+
+    def __init__(self):
+        self.stages = defaultdict(list)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name].append(seconds)
+
+
+@contextmanager
+def collect_timings():
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time a block of work under `name` if timings are being collected."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    stack = timings._stack()
+    stack.append(0.0)  # Time spent in nested stages
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings.add(name, elapsed - stack.pop())
+        if stack:
+            stack[-1] += elapsed
+
+
+class Cassette:
+    def __init__(self, path, mode='replay', latency=None):
+        """
+        :param path: JSON file holding the recorded calls.
+        :param mode: 'record' to capture live calls, 'replay' to serve them back.
+        :param latency: None for no delay, 'recorded' to sleep for the recorded
+                        duration, or a number of seconds to sleep per call.
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.entries = defaultdict(list)
+        self._cursors = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            with open(path) as f:
+                for entry in json.load(f)['entries']:
+                    self.entries[entry['key']].append(entry)
+
+    @staticmethod
+    def make_key(kind, name, key_data):
+        digest = hashlib.sha1(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{kind}:{name}:{digest[:16]}"
+
+    def rewind(self):
+        self._cursors.clear()
+
+    def play(self, key):
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recording for {key}")
+            # Repeated identical calls are served in recorded order, then the last one repeats
+            index = min(self._cursors[key], len(recorded) - 1)
+            self._cursors[key] += 1
+        entry = recorded[index]
+        if self.latency == 'recorded':
+            time.sleep(entry['duration'])
+        elif self.latency:
+            time.sleep(float(self.latency))
+        return entry['result']
+
+    def record(self, key, kind, name, result, duration):
+        with self._lock:
+            self.entries[key].append({
+                'key': key, 'kind': kind, 'name': name, 'duration': duration, 'result': result,
+            })
+
+    def save(self):
+        entries = [entry for recorded in self.entries.values() for entry in recorded]
+        with open(self.path, 'w') as f:
+            json.dump({'version': 1, 'entries': entries}, f, indent=1, default=str)
+
+
+@contextmanager
+def use_cassette(path, mode='replay', latency=None):
+    cassette = Cassette(path, mode=mode, latency=latency)
+    token = _cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _cassette.reset(token)
+        if mode == 'record':
+            cassette.save()
+
+
+def call(kind, name, fn, args=(), kwargs=None, key_data=None, encode=None, decode=None):
+    """
+    Run an LLM request (kind='llm') or tool call (kind='tool') through the harness.
+
+    :param key_data: JSON-able data identifying the call; defaults to args/kwargs.
+    :param encode: Converts the live result to something JSON-serializable for the cassette.
+    :param decode: Rebuilds the live result type from a recorded value.
+    """
+    kwargs = kwargs or {}
+    cassette = _cassette.get()
+    # 'llm' time also shows up in the Server-Timing breakdown of a sampled request;
+    # tool time is already broken down there into its db and yfinance time
+    with stage('llm' if kind == 'llm' else f"{kind}:{name}"), timed('llm') if kind == 'llm' else nullcontext():
+        if cassette is None:
+            return fn(*args, **kwargs)
+        key = Cassette.make_key(kind, name, key_data if key_data is not None else [args, kwargs])
+        if cassette.mode == 'replay':
+            result = cassette.play(key)
+            return decode(result) if decode else result
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        cassette.record(key, kind, name, encode(result) if encode else result, time.perf_counter() - start)
+        return result
@@ -0,0 +1,145 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AgentJob
+
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BATCH = 0
+
+# Seconds between a worker pool's sweeps for jobs left running by dead workers
+RECLAIM_INTERVAL = 60
+
+
+class JobError(Exception):
+    pass
+
+
+def _run_finance(payload):
+    from .finance_agent import run_finance_agent
+    return {'content': run_finance_agent(payload['prompt'], payload.get('user_id'))}
+
+
+def _run_chat(payload):
+    from investments.views import run_agent_chat
+    data, status_code = run_agent_chat(payload['user_id'], payload['query'])
+    if status_code >= 400:
+        raise JobError(data.get('data') or f"Agent chat failed with status {status_code}")
+    return data
+
+
+JOB_RUNNERS = {
+    'finance': _run_finance,
+    'chat': _run_chat,
+}
+
+
+def submit_job(kind, payload, user_id=None, interactive=True):
+    """Queue an agent run and return the job without waiting for it."""
+    return AgentJob.objects.create(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        priority=PRIORITY_INTERACTIVE if interactive else PRIORITY_BATCH,
+    )
+
+
+def cancel_job(job):
+    """
+    Cancel a queued or running job.
+
+    A running job keeps executing in its worker, but its result is discarded.
+    Returns False if the job had already finished.
+    """
+    return AgentJob.objects.filter(id=job.id, status__in=['queued', 'running']).update(
+        status='cancelled', finished_at=timezone.now()
+    ) == 1
+
+
+def claim_next_job():
+    """
+    Atomically move the highest-priority queued job to running.
+
+    The conditional UPDATE makes this safe across several worker processes
+    without relying on SELECT ... FOR UPDATE, which SQLite does not support.
+    """
+    candidates = AgentJob.objects.filter(status='queued').order_by('-priority', 'created_at')
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        claimed = AgentJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return AgentJob.objects.get(id=job_id)
+    return None
+
+
+def reclaim_stale_jobs():
+    """
+    Requeue jobs left running longer than AGENT_JOB_STALE_SECONDS, presumably
+    by a worker that died; after AGENT_JOB_MAX_ATTEMPTS claims they fail instead.
+
+    :return: (requeued, failed) job counts.
+    """
+    stale = AgentJob.objects.filter(
+        status='running', started_at__lt=timezone.now() - timedelta(seconds=settings.AGENT_JOB_STALE_SECONDS)
+    )
+    failed = stale.filter(attempts__gte=settings.AGENT_JOB_MAX_ATTEMPTS).update(
+        status='failed', error="Worker stopped before the job finished", finished_at=timezone.now()
+    )
+    requeued = stale.update(status='queued', started_at=None)
+    return requeued, failed
+
+
+def run_job(job):
+    # Only the claim that is still current may finish the job: one that was
+    # cancelled, or reclaimed as stale and claimed again, stays as it is
+    current = AgentJob.objects.filter(id=job.id, status='running', started_at=job.started_at)
+    try:
+        result = JOB_RUNNERS[job.kind](job.payload)
+    except Exception as e:
+        current.update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    current.update(status='done', result=result, finished_at=timezone.now())
+
+
+class WorkerPool:
+    """Poll the job table and execute jobs on a bounded thread pool."""
+
+    def __init__(self, max_workers=None, poll_interval=1.0):
+        self.max_workers = max_workers or settings.AGENT_JOB_WORKERS
+        self.poll_interval = poll_interval
+        self._slots = threading.Semaphore(self.max_workers)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _execute(self, job):
+        try:
+            run_job(job)
+        finally:
+            close_old_connections()
+            self._slots.release()
+
+    def run_forever(self):
+        reclaimed_at = None
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='agent-job') as pool:
+            while not self._stop.is_set():
+                if reclaimed_at is None or time.monotonic() - reclaimed_at >= RECLAIM_INTERVAL:
+                    reclaim_stale_jobs()
+                    reclaimed_at = time.monotonic()
+                # Only claim a job once a worker is free to take it
+                self._slots.acquire()
+                job = claim_next_job()
+                if job is None:
+                    self._slots.release()
+                    self._stop.wait(self.poll_interval)
+                    continue
+                pool.submit(self._execute, job)
@@ -0,0 +1,85 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agent import harness
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Record an agent run to a cassette, or replay one offline and report per-stage timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('cassette', help="Cassette JSON file")
+        parser.add_argument('--agent', choices=['chat', 'finance'], default='chat')
+        parser.add_argument('--query', required=True, help="Query (chat) or prompt (finance agent)")
+        parser.add_argument('--user-id', type=int, default=1, help="User id for agent_chat runs")
+        parser.add_argument('--record', action='store_true', help="Run live once and write the cassette")
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--latency', default=None,
+                            help="Injected delay per replayed call: seconds, or 'recorded'")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def run_agent(self, options):
+        if options['agent'] == 'finance':
+            from agent.finance_agent import run_finance_agent
+            return run_finance_agent(options['query'])
+        from investments.views import run_agent_chat
+        return run_agent_chat(options['user_id'], options['query'])
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        if latency not in (None, 'recorded'):
+            try:
+                latency = float(latency)
+            except ValueError:
+                raise CommandError(f"Invalid --latency: '{latency}'")
+
+        mode = 'record' if options['record'] else 'replay'
+        iterations = 1 if options['record'] else options['iterations']
+        totals = []
+        with harness.use_cassette(options['cassette'], mode=mode, latency=latency) as cassette:
+            with harness.collect_timings() as timings:
+                for _ in range(iterations):
+                    cassette.rewind()
+                    # Roll back each run so conversation memory and trades do not
+                    # change the prompts of the next iteration
+                    with transaction.atomic():
+                        start = time.perf_counter()
+                        try:
+                            self.run_agent(options)
+                        except harness.CassetteMiss as e:
+                            raise CommandError(f"{e}; re-record the cassette with --record")
+                        totals.append(time.perf_counter() - start)
+                        transaction.set_rollback(True)
+
+        report = {
+            'agent': options['agent'],
+            'mode': mode,
+            'iterations': iterations,
+            'total': self.summarize(totals),
+            'stages': {name: self.summarize(values) for name, values in sorted(timings.stages.items())},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{'stage':<32}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, row in [('total', report['total'])] + list(report['stages'].items()):
+            self.stdout.write(f"{name:<32}{row['count']:>7}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+
+    @staticmethod
+    def summarize(values):
+        return {
+            'count': len(values),
+            'mean_ms': sum(values) / len(values) * 1000,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+        }
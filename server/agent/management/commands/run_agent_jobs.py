@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from agent.jobs import WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run a local worker pool that executes queued agent jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Concurrent jobs (default: AGENT_JOB_WORKERS)")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(max_workers=options['workers'], poll_interval=options['poll_interval'])
+        self.stdout.write(f"Running agent jobs with {pool.max_workers} workers")
+        try:
+            pool.run_forever()
+        except KeyboardInterrupt:
+            pool.stop()
@@ -0,0 +1,140 @@
+"""
+Bounded per-user conversation memory for the agents.
+
+Recent turns are kept verbatim while they fit AGENT_MEMORY_TOKEN_BUDGET. When
+the budget is exceeded the oldest turns are folded into a rolling summary
+capped at AGENT_MEMORY_SUMMARY_TOKENS, so the history sent with each prompt
+stays roughly constant in size however long the session runs.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.module_loading import import_string
+
+from account.models import UserProfile
+from investments.models import Portfolio
+from .models import ConversationTurn, ConversationSummary
+
+PORTFOLIO_ROWS = 15
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def truncate_tokens(text, max_tokens, keep='start'):
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    if keep == 'end':
+        return '…' + text[-max_chars:]
+    return text[:max_chars] + '…'
+
+
+def extractive_summary(summary, turns, max_tokens):
+    """
+    Default summarizer: keep the first sentence of every folded turn.
+
+    Older content is dropped from the front once the summary exceeds max_tokens.
+    """
+    lines = [summary] if summary else []
+    for turn in turns:
+        first_sentence = re.split(r'(?<=[.!?])\s|\n', turn.content.strip(), maxsplit=1)[0]
+        speaker = 'User' if turn.role == 'user' else 'Agent'
+        lines.append(f"{speaker}: {truncate_tokens(first_sentence, 40)}")
+    return truncate_tokens('\n'.join(lines), max_tokens, keep='end')
+
+
+def portfolio_table(user_id, max_rows=PORTFOLIO_ROWS):
+    """Compact symbol|qty table of a user's holdings for prompt context."""
+    try:
+        profile = UserProfile.objects.get(user__id=user_id)
+    except UserProfile.DoesNotExist:
+        return "(no profile)"
+    rows = list(
+        Portfolio.objects.filter(user_profile=profile)
+        .order_by('-quantity', 'asset_symbol')
+        .values_list('asset_symbol', 'quantity')[:max_rows + 1]
+    )
+    lines = [f"cash|{profile.balance}", "symbol|qty"]
+    lines += [f"{symbol}|{quantity}" for symbol, quantity in rows[:max_rows]]
+    if len(rows) > max_rows:
+        lines.append("…|more positions omitted")
+    return '\n'.join(lines)
+
+
+class ConversationMemory:
+    def __init__(self, user_id, agent):
+        self.user_id = int(user_id)
+        self.agent = agent
+
+    def _turns(self):
+        return ConversationTurn.objects.filter(user_id=self.user_id, agent=self.agent)
+
+    def context(self):
+        """Summary plus recent turns, ready to be placed in a prompt."""
+        summary = ConversationSummary.objects.filter(user_id=self.user_id, agent=self.agent).first()
+        lines = []
+        if summary and summary.summary:
+            lines.append(f"Summary of earlier conversation:\n{summary.summary}")
+
+        # Newest first until the budget is used; compaction keeps this short
+        recent, used = [], 0
+        for turn in self._turns().order_by('-id').only('role', 'content', 'tokens').iterator():
+            if used + turn.tokens > settings.AGENT_MEMORY_TOKEN_BUDGET:
+                break
+            recent.append(turn)
+            used += turn.tokens
+        for turn in reversed(recent):
+            lines.append(f"{'User' if turn.role == 'user' else 'Agent'}: {turn.content}")
+        return '\n'.join(lines) if lines else "(new conversation)"
+
+    def add_exchange(self, query, answer):
+        # A single long answer may use at most half the budget on its own
+        max_turn_tokens = settings.AGENT_MEMORY_TOKEN_BUDGET // 2
+        turns = []
+        for role, content in (('user', query), ('assistant', answer)):
+            content = truncate_tokens(content, max_turn_tokens)
+            turns.append(ConversationTurn(
+                user_id=self.user_id, agent=self.agent, role=role,
+                content=content, tokens=estimate_tokens(content),
+            ))
+        ConversationTurn.objects.bulk_create(turns)
+        self.compact()
+
+    def compact(self):
+        """
+        Fold the oldest turns into the summary once the token budget is exceeded.
+
+        The turns to fold are chosen with the summary row locked, so concurrent
+        compactions of one conversation fold each turn exactly once.
+        """
+        budget = settings.AGENT_MEMORY_TOKEN_BUDGET
+        if (self._turns().aggregate(total=Sum('tokens'))['total'] or 0) <= budget:
+            return
+
+        summarize = import_string(settings.AGENT_MEMORY_SUMMARIZER)
+        with transaction.atomic():
+            summary, _ = ConversationSummary.objects.select_for_update().get_or_create(
+                user_id=self.user_id, agent=self.agent
+            )
+            # Recounted under the lock: another compaction may have folded turns meanwhile
+            total = self._turns().aggregate(total=Sum('tokens'))['total'] or 0
+            if total <= budget:
+                return
+
+            # Compact down to half the budget so this does not run on every turn
+            folded, excess = [], total - budget // 2
+            for turn in self._turns().order_by('id').iterator():
+                if excess <= 0:
+                    break
+                folded.append(turn)
+                excess -= turn.tokens
+
+            summary.summary = summarize(summary.summary, folded, settings.AGENT_MEMORY_SUMMARY_TOKENS)
+            summary.tokens = estimate_tokens(summary.summary)
+            summary.save()
+            ConversationTurn.objects.filter(id__in=[turn.id for turn in folded]).delete()
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('agent', models.CharField(choices=[('finance', 'Finance Agent'), ('chat', 'Agent Chat')], max_length=16)),
+                ('summary', models.TextField(blank=True)),
+                ('tokens', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('user_id', 'agent')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ConversationTurn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('agent', models.CharField(choices=[('finance', 'Finance Agent'), ('chat', 'Agent Chat')], max_length=16)),
+                ('role', models.CharField(choices=[('user', 'User'), ('assistant', 'Assistant')], max_length=10)),
+                ('content', models.TextField()),
+                ('tokens', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'agent', 'id'], name='agent_conve_user_id_126906_idx')],
+            },
+        ),
+    ]
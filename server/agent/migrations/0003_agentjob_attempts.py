@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0002_conversationsummary_conversationturn'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentjob',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,3 +1,56 @@
 from django.db import models
 
-# Create your models here.
+
+class AgentJob(models.Model):
+    user_id = models.IntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=16, choices=[('finance', 'Finance Agent'), ('chat', 'Agent Chat')])
+    payload = models.JSONField(default=dict)
+    priority = models.IntegerField(default=0)  # Higher runs first
+    status = models.CharField(max_length=10, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], default='queued')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)  # Times a worker has claimed the job
+
+    class Meta:
+        indexes = [models.Index(fields=['status', '-priority', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
+class ConversationTurn(models.Model):
+    user_id = models.IntegerField()
+    agent = models.CharField(max_length=16, choices=[('finance', 'Finance Agent'), ('chat', 'Agent Chat')])
+    role = models.CharField(max_length=10, choices=[('user', 'User'), ('assistant', 'Assistant')])
+    content = models.TextField()
+    tokens = models.IntegerField()  # Estimated prompt tokens
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user_id', 'agent', 'id'])]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.agent} {self.role}"
+
+
+class ConversationSummary(models.Model):
+    user_id = models.IntegerField()
+    agent = models.CharField(max_length=16, choices=[('finance', 'Finance Agent'), ('chat', 'Agent Chat')])
+    summary = models.TextField(blank=True)  # Rolling summary of turns compacted out of ConversationTurn
+    tokens = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('user_id', 'agent')]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.agent} summary"
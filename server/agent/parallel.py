@@ -0,0 +1,73 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .harness import stage
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.AGENT_TOOL_WORKERS, thread_name_prefix='agent-tool')
+    return _executor
+
+
+def _run_task(context, task):
+    # Pool threads outlive requests, so apply CONN_MAX_AGE and drop broken
+    # connections around each task, as request handling would
+    close_old_connections()
+    try:
+        return context.run(task)
+    finally:
+        close_old_connections()
+
+
+def run_parallel(tasks, return_exceptions=False):
+    """
+    Run independent zero-argument callables concurrently on a shared bounded pool.
+
+    Results are returned in task order regardless of completion order. Each task
+    runs in a copy of the caller's context, so harness cassettes and timings apply.
+    With return_exceptions=True a failing task yields its exception instead of
+    raising it.
+    """
+    if len(tasks) <= 1:
+        return _collect(tasks, return_exceptions)
+
+    executor = _get_executor()
+    futures = [executor.submit(_run_task, contextvars.copy_context(), task) for task in tasks]
+    # Waiting is timed on its own so it is not counted as the caller's stage time
+    with stage('parallel_wait'):
+        return _collect([future.result for future in futures], return_exceptions)
+
+
+def _collect(getters, return_exceptions):
+    results = []
+    for get in getters:
+        try:
+            results.append(get())
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+class ExecutedFunctionCall:
+    """A phi FunctionCall that already ran; execute() replays its outcome."""
+
+    def __init__(self, function_call, outcome):
+        self._function_call = function_call
+        self._outcome = outcome
+
+    def __getattr__(self, name):
+        return getattr(self._function_call, name)
+
+    def execute(self):
+        if isinstance(self._outcome, Exception):
+            raise self._outcome
+        return self._outcome
@@ -1,8 +1,18 @@
 # serializers.py
 from rest_framework import serializers
+from .models import AgentJob
 
 class PromptSerializer(serializers.Serializer):
     prompt = serializers.CharField(max_length=1000)
+    user_id = serializers.IntegerField(required=False)  # Enables conversation memory
 
 class ResponseSerializer(serializers.Serializer):
-    content = serializers.CharField()
\ No newline at end of file
+    content = serializers.CharField()
+
+class FinanceAgentJobSerializer(PromptSerializer):
+    interactive = serializers.BooleanField(default=True)
+
+class AgentJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AgentJob
+        fields = ['id', 'kind', 'status', 'priority', 'result', 'error', 'created_at', 'started_at', 'finished_at']
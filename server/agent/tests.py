@@ -1,3 +1,119 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .jobs import JOB_RUNNERS, cancel_job, claim_next_job, reclaim_stale_jobs, run_job, submit_job
+from .memory import ConversationMemory
+from .models import AgentJob, ConversationSummary, ConversationTurn
+
+
+@override_settings(AGENT_JOB_STALE_SECONDS=900, AGENT_JOB_MAX_ATTEMPTS=2)
+class JobQueueTests(TestCase):
+    def make_stale(self, job):
+        AgentJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(seconds=901))
+
+    def test_claims_interactive_jobs_first_then_oldest(self):
+        batch = submit_job('finance', {'prompt': 'a'}, interactive=False)
+        first = submit_job('finance', {'prompt': 'b'})
+        second = submit_job('finance', {'prompt': 'c'})
+        self.assertEqual([claim_next_job().id for _ in range(3)], [first.id, second.id, batch.id])
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(AgentJob.objects.get(id=first.id).attempts, 1)
+
+    def test_stale_job_is_requeued_then_failed_after_max_attempts(self):
+        submit_job('finance', {'prompt': 'a'})
+        job = claim_next_job()
+        self.make_stale(job)
+        self.assertEqual(reclaim_stale_jobs(), (1, 0))
+        self.assertEqual(claim_next_job().id, job.id)
+        self.make_stale(job)
+        self.assertEqual(reclaim_stale_jobs(), (0, 1))
+        self.assertEqual(AgentJob.objects.get(id=job.id).status, 'failed')
+
+    def test_fresh_running_job_is_not_reclaimed(self):
+        submit_job('finance', {'prompt': 'a'})
+        claim_next_job()
+        self.assertEqual(reclaim_stale_jobs(), (0, 0))
+
+    def test_superseded_claim_does_not_finish_job(self):
+        submit_job('finance', {'prompt': 'a'})
+        stale_claim = claim_next_job()
+        self.make_stale(stale_claim)
+        reclaim_stale_jobs()
+        current_claim = claim_next_job()
+        with mock.patch.dict(JOB_RUNNERS, finance=lambda payload: {'content': 'late'}):
+            run_job(stale_claim)
+            self.assertEqual(AgentJob.objects.get(id=stale_claim.id).status, 'running')
+            run_job(current_claim)
+        job = AgentJob.objects.get(id=stale_claim.id)
+        self.assertEqual((job.status, job.result), ('done', {'content': 'late'}))
+
+    def test_cancelled_job_keeps_status_and_discards_result(self):
+        submit_job('finance', {'prompt': 'a'})
+        job = claim_next_job()
+        self.assertTrue(cancel_job(job))
+        with mock.patch.dict(JOB_RUNNERS, finance=lambda payload: {'content': 'ignored'}):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('cancelled', None))
+        self.assertFalse(cancel_job(job))
+
+    def test_runner_error_fails_job(self):
+        submit_job('finance', {'prompt': 'a'})
+        job = claim_next_job()
+        with mock.patch.dict(JOB_RUNNERS, finance=mock.Mock(side_effect=RuntimeError('boom'))):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'boom'))
+
+
+class AgentJobDetailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.job = submit_job('finance', {'prompt': 'Hi', 'user_id': 1}, user_id=1)
+
+    def url(self, user_id=None):
+        query = f'?user_id={user_id}' if user_id is not None else ''
+        return f'/api/agent-jobs/{self.job.id}/{query}'
+
+    def test_owner_sees_and_cancels_job(self):
+        self.assertEqual(self.client.get(self.url(1)).data['status'], 'queued')
+        self.assertEqual(self.client.delete(self.url(1)).data['status'], 'cancelled')
+        self.assertEqual(self.client.delete(self.url(1)).status_code, 409)
+
+    def test_other_users_get_not_found(self):
+        for user_id in (2, None, 'x'):
+            self.assertEqual(self.client.get(self.url(user_id)).status_code, 404)
+            self.assertEqual(self.client.delete(self.url(user_id)).status_code, 404)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'queued')
+
+    def test_anonymous_job_is_looked_up_without_user(self):
+        self.job = submit_job('finance', {'prompt': 'Hi'})
+        self.assertEqual(self.client.get(self.url()).status_code, 200)
+        self.assertEqual(self.client.get(self.url(1)).status_code, 404)
+
+
+@override_settings(AGENT_MEMORY_TOKEN_BUDGET=100, AGENT_MEMORY_SUMMARY_TOKENS=300,
+                   AGENT_MEMORY_SUMMARIZER='agent.memory.extractive_summary')
+class ConversationMemoryTests(TestCase):
+    def test_compaction_folds_each_turn_once(self):
+        memory = ConversationMemory(1, 'chat')
+        for i in range(6):
+            memory.add_exchange(f"Question {i}. " + 'x' * 80, f"Answer {i}. " + 'y' * 80)
+        turns = ConversationTurn.objects.filter(user_id=1, agent='chat')
+        self.assertLessEqual(turns.aggregate(total=Sum('tokens'))['total'], 100)
+
+        summary = ConversationSummary.objects.get(user_id=1, agent='chat').summary
+        kept = {turn.content.split('.')[0] for turn in turns}
+        for i in range(6):
+            for speaker, text in (('User', f"Question {i}"), ('Agent', f"Answer {i}")):
+                # Every turn is either still kept or folded into the summary, never both or twice
+                self.assertEqual(summary.count(f"{speaker}: {text}.") + (text in kept), 1)
+
+        memory.compact()
+        self.assertEqual(ConversationSummary.objects.get(user_id=1, agent='chat').summary, summary)
@@ -2,11 +2,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PromptSerializer, ResponseSerializer
-from phi.agent import Agent
-from phi.model.groq import Groq
-from phi.tools.yfinance import YFinanceTools
-from dotenv import load_dotenv
+from .serializers import PromptSerializer, ResponseSerializer, FinanceAgentJobSerializer, AgentJobSerializer
+from .models import AgentJob
+from .jobs import submit_job, cancel_job
+
 
 class FinanceAgentView(APIView):
     def post(self, request):
@@ -16,42 +15,63 @@ class FinanceAgentView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         prompt = serializer.validated_data['prompt']
-        load_dotenv()
-
-        # Initialize the finance agent
-        finance_agent = Agent(
-            name="Finance Agent",
-            model=Groq(
-                id="llama-3.3-70b-versatile",
-                temperature=0.4,
-                max_tokens=2048,
-            ),
-            tools=[YFinanceTools(
-                stock_price=True,
-                analyst_recommendations=True,
-                company_info=True,
-                company_news=True,
-            )],
-            instructions=[
-                "1. Collect financial data using available tools",
-                "2. Compare companies systematically",
-                "3. Present data in markdown tables",
-                "4. Include data sources and dates",
-                "5. Highlight key metrics",
-                "6. Show data in tabular format"
-            ],
-            show_tool_calls=False,
-            markdown=True,
-            debug=False,
-        )
 
         try:
+            from .finance_agent import run_finance_agent
+
             # Run the agent and get markdown response
-            run = finance_agent.run(prompt)
-            content = run.content
+            content = run_finance_agent(prompt, serializer.validated_data.get('user_id'))
             # Serialize the response
             response_serializer = ResponseSerializer({'content': content})
             return Response(response_serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
             # Handle errors gracefully
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class FinanceAgentJobView(APIView):
+    def post(self, request):
+        serializer = FinanceAgentJobSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        job = submit_job(
+            'finance', {'prompt': data['prompt'], 'user_id': data.get('user_id')},
+            user_id=data.get('user_id'), interactive=data['interactive'],
+        )
+        return Response({'job_id': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
+
+class AgentJobDetailView(APIView):
+    """
+    Status of a queued agent job, or cancel it with DELETE.
+
+    Jobs are only visible to the user that submitted them, identified by the
+    `user_id` query parameter; jobs submitted without a user_id are looked up
+    without one. Anyone else gets a 404, as if the job did not exist.
+    """
+
+    def get_job(self, request, id):
+        user_id = request.query_params.get('user_id') or None
+        if user_id is not None and not user_id.isdigit():
+            return None
+        try:
+            return AgentJob.objects.get(id=id, user_id=user_id)
+        except AgentJob.DoesNotExist:
+            return None
+
+    def get(self, request, id):
+        job = self.get_job(request, id)
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(AgentJobSerializer(job).data)
+
+    def delete(self, request, id):
+        job = self.get_job(request, id)
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not cancel_job(job):
+            return Response({"error": f"Job already {job.status}"}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(AgentJobSerializer(job).data)
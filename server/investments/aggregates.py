@@ -0,0 +1,194 @@
+"""
+Recomputing the asset-class aggregates of user profiles from their positions.
+
+Trades move a profile's `stocks`, `bonds` and `insurance` totals (and
+`boughtsum`, their sum) by the trade amount, so a sell at a gain takes out more
+than the cost of what was sold and the clamp at zero hides the difference; over
+time the aggregates drift away from what the user holds. Here they are set to
+the cost basis of the open positions instead: the buy lots of the position's
+current cycle (the trades since it was last flat) that are left after its
+sells are matched against them first in, first out, each under its own asset
+class. Lots of closed cycles cost nothing, so the result is the same whether
+or not those cycles have been archived yet.
+
+Profiles are walked in id batches. Per market, a batch reads its open
+positions with one query, and streams the trades of just those positions in
+position order with another, so only one position's trades are in memory at a
+time. It writes only the profiles that changed, with bulk_update.
+"""
+from collections import defaultdict, deque
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from account.cache import invalidate_user_data
+from account.models import BalanceLedgerEntry, UserProfile
+from virtual_market.models import VirtualPortfolio, VirtualTransaction
+from .models import Portfolio, Transaction
+
+ZERO = Decimal('0.00')
+
+# UserProfile aggregate of each asset class, without the market's prefix
+AGGREGATES = {'stock': 'stocks', 'bond': 'bonds', 'insurance': 'insurance'}
+
+
+class Market:
+    """Field names of one market's position and transaction models and profile aggregates."""
+
+    def __init__(self, name, portfolio, model, prefix='', profile_prefix=''):
+        self.name = name
+        self.portfolio = portfolio
+        self.model = model
+        self.symbol = f"{prefix}asset_symbol"
+        self.quantity = f"{prefix}quantity"
+        self.price = f"{prefix}price"
+        self.created_at = f"{prefix}created_at"
+        self.asset_type = f"{prefix}asset_type"
+        self.transaction_type = f"{prefix}transaction_type"
+        self.aggregates = {kind: f"{profile_prefix}{field}" for kind, field in AGGREGATES.items()}
+        self.total = f"{profile_prefix}boughtsum"
+        self.fields = [*self.aggregates.values(), self.total]
+
+
+MARKETS = {
+    'real': Market('real', Portfolio, Transaction),
+    'virtual': Market('virtual', VirtualPortfolio, VirtualTransaction, prefix='virtual_', profile_prefix='virtual'),
+}
+
+
+def open_lots(trades):
+    """
+    Buy lots left in a position after FIFO matching, since it was last flat.
+
+    :param trades: (transaction_type, quantity, price, asset_type) in trade order.
+    :return: deque of [quantity, price, asset_type], oldest first.
+    """
+    lots = deque()
+    held = 0
+    for transaction_type, quantity, price, kind in trades:
+        if transaction_type == 'buy':
+            held += quantity
+            lots.append([quantity, price, kind])
+            continue
+        held -= quantity
+        if held <= 0:
+            held = 0
+            lots.clear()  # Flat (or oversold): earlier lots belong to a closed cycle
+            continue
+        while quantity > 0:
+            used = min(quantity, lots[0][0])
+            lots[0][0] -= used
+            quantity -= used
+            if not lots[0][0]:
+                lots.popleft()
+    return lots
+
+
+def open_costs(market, profile_ids):
+    """
+    Cost basis of the open positions of profiles, per asset class.
+
+    A position is costed at the newest `held` units of its open lots; when the
+    lots cover fewer units than are held, the rest is priced at their average.
+
+    :return: {profile_id: {field: Decimal}} over the market's aggregate fields,
+        including its total; profiles without positions are left out.
+    """
+    open_positions = market.portfolio.objects.filter(user_profile_id__in=profile_ids, **{f"{market.quantity}__gt": 0})
+    held = {(profile_id, symbol): quantity for profile_id, symbol, quantity in open_positions.values_list(
+        'user_profile_id', market.symbol, market.quantity
+    )}
+    trades = market.model.objects.filter(user_profile_id__in=profile_ids).filter(Exists(open_positions.filter(
+        user_profile_id=OuterRef('user_profile_id'), **{market.symbol: OuterRef(market.symbol)}
+    ))).order_by('user_profile_id', market.symbol, market.created_at, 'id').values_list(
+        'user_profile_id', market.symbol, market.transaction_type, market.quantity, market.price, market.asset_type
+    )
+
+    costs = {}
+    for position, rows in groupby(trades.iterator(chunk_size=2000), key=itemgetter(0, 1)):
+        lots = open_lots(row[2:] for row in rows)
+        lot_quantity = sum(lot[0] for lot in lots)
+        if not lot_quantity:
+            continue  # No lots left to price it with
+        average = sum(lot[0] * lot[1] for lot in lots) / lot_quantity
+        profile_costs = costs.setdefault(position[0], dict.fromkeys(AGGREGATES, ZERO))
+        remaining = held[position]
+        for units, price, kind in reversed(lots):
+            used = min(remaining, units)
+            profile_costs[kind if kind in AGGREGATES else 'insurance'] += used * price
+            remaining -= used
+            if not remaining:
+                break
+        else:
+            profile_costs[kind if kind in AGGREGATES else 'insurance'] += remaining * average
+
+    result = {}
+    for profile_id, profile_costs in costs.items():
+        values = {market.aggregates[kind]: cost.quantize(ZERO) for kind, cost in profile_costs.items()}
+        result[profile_id] = {**values, market.total: sum(values.values())}
+    return result
+
+
+def recompute_batch(profile_ids, markets, dry_run=False):
+    """
+    Recompute the aggregates of a batch of profiles, with their rows locked.
+
+    Each corrected profile gets a 'recompute' ledger entry with its changes, as
+    bulk_update bypasses UserProfile.save.
+
+    :return: A {field: absolute change} dict for each profile that changed.
+    """
+    fields = [field for market in markets for field in market.fields]
+    with transaction.atomic():
+        profiles = list(UserProfile.objects.select_for_update().filter(id__in=profile_ids).only('id', 'user_id', *fields))
+        costs = [open_costs(market, profile_ids) for market in markets]
+        changed, entries, changes = [], [], []
+        for profile in profiles:
+            expected = {}
+            for market, market_costs in zip(markets, costs):
+                expected.update(market_costs.get(profile.id) or dict.fromkeys(market.fields, ZERO))
+            deltas = {field: value - getattr(profile, field) for field, value in expected.items()}
+            if not any(deltas.values()):
+                continue
+            for field, value in expected.items():
+                setattr(profile, field, value)
+            changed.append(profile)
+            entries.append(BalanceLedgerEntry(user_profile_id=profile.id, reason='recompute', **deltas))
+            changes.append({field: abs(delta) for field, delta in deltas.items()})
+        if changed and not dry_run:
+            UserProfile.objects.bulk_update(changed, fields)
+            BalanceLedgerEntry.objects.bulk_create(entries)
+            for profile in changed:
+                invalidate_user_data(profile.user_id)
+    return changes
+
+
+def recompute_aggregates(markets=None, batch_size=1000, dry_run=False, progress=None):
+    """
+    Recompute the asset-class aggregates of every profile.
+
+    :param markets: Markets (values of MARKETS) to recompute; all by default.
+    :param progress: Called with the number of profiles done after each batch.
+    :return: (profiles, changed, {field: total absolute change}).
+    """
+    markets = list(MARKETS.values()) if markets is None else list(markets)
+    drift = defaultdict(lambda: ZERO)
+    profiles = changed = 0
+    last_id = 0
+    while True:
+        ids = list(UserProfile.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        changes = recompute_batch(ids, markets, dry_run)
+        profiles += len(ids)
+        changed += len(changes)
+        for change in changes:
+            for field, amount in change.items():
+                drift[field] += amount
+        if progress:
+            progress(profiles)
+    return profiles, changed, dict(drift)
@@ -0,0 +1,183 @@
+"""
+Archival of closed-out positions from the live transaction tables.
+
+A position cycle is the run of a user's trades in one symbol from holding
+nothing back to holding nothing. Once a cycle's last trade is older than the
+cutoff, its trades are moved to the archive table (keeping their ids) and its
+totals are added to the user's per-symbol position summary. The realized P&L
+of a closed cycle is simply sold minus bought amount, whatever lots each sell
+was matched against, so summaries reconcile exactly with the archived trades.
+
+Only whole cycles are archived, oldest first, so the live rows of a position
+always start from a flat position: the live tables keep open positions and
+recent activity, and the buy history a sell scans for its P&L stays short.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from account.cache import invalidate_user_data
+from account.models import UserProfile
+from virtual_market.models import ArchivedVirtualTransaction, VirtualPositionSummary, VirtualTransaction
+from .models import ArchivedTransaction, PositionSummary, Transaction
+
+# Ids per DELETE statement, within SQLite's bound parameter limit
+DELETE_CHUNK = 500
+
+# PositionSummary fields (prefixed like the market's other fields) that add up across batches
+SUMMED = ('closed_positions', 'trade_count', 'closed_quantity', 'bought_amount', 'sold_amount')
+
+Trade = namedtuple('Trade', ['id', 'user_profile_id', 'symbol', 'quantity', 'transaction_type', 'price', 'amount', 'created_at',
+                             'asset_type'])
+
+
+class Market:
+    """Field names of one market's transaction, archive and summary models."""
+
+    def __init__(self, name, model, archive, summary, prefix=''):
+        self.name = name
+        self.model = model
+        self.archive = archive
+        self.summary = summary
+        self.prefix = prefix
+        self.symbol = f"{prefix}asset_symbol"
+        self.created_at = f"{prefix}created_at"
+        self.columns = ['id', 'user_profile_id', self.symbol, f"{prefix}quantity", f"{prefix}transaction_type",
+                        f"{prefix}price", f"{prefix}amount", self.created_at, f"{prefix}asset_type"]
+
+    def archived(self, trade):
+        return self.archive(**dict(zip(self.columns, trade)))
+
+
+MARKETS = {
+    'real': Market('real', Transaction, ArchivedTransaction, PositionSummary),
+    'virtual': Market('virtual', VirtualTransaction, ArchivedVirtualTransaction, VirtualPositionSummary, prefix='virtual_'),
+}
+
+
+def closed_cycles(trades, cutoff):
+    """
+    Closed position cycles ending before the cutoff.
+
+    :param trades: Trades ordered by user profile, symbol, time and id, starting
+        from a flat position for every (user profile, symbol).
+    :return: Generator of lists of the Trades of one cycle.
+    """
+    for _, position in groupby(trades, key=attrgetter('user_profile_id', 'symbol')):
+        held, cycle = 0, []
+        for trade in position:
+            if trade.created_at >= cutoff:
+                break
+            held += trade.quantity if trade.transaction_type == 'buy' else -trade.quantity
+            if held < 0:
+                break  # Sold more than was held; leave an inconsistent history alone
+            cycle.append(trade)
+            if held == 0:
+                yield cycle
+                cycle = []
+
+
+class Archiver:
+    def __init__(self, market, days, batch_size=200, dry_run=False):
+        """
+        :param days: Archive cycles whose last trade is older than this many days.
+        :param batch_size: User profiles handled per database transaction.
+        """
+        self.market = market
+        self.cutoff = timezone.now() - timedelta(days=days)
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.trades = 0
+        self.cycles = 0
+
+    def old_trades(self, profile_ids):
+        market = self.market
+        return [Trade(*row) for row in market.model.objects.filter(
+            user_profile_id__in=profile_ids, **{f"{market.created_at}__lt": self.cutoff}
+        ).order_by('user_profile_id', market.symbol, market.created_at, 'id').values_list(*market.columns)]
+
+    def run(self):
+        """
+        Archive every closed cycle older than the cutoff.
+
+        :return: (cycles, trades) archived, or that would be with dry_run.
+        """
+        profile_ids = list(UserProfile.objects.order_by('id').values_list('id', flat=True))
+        for first in range(0, len(profile_ids), self.batch_size):
+            cycles = list(closed_cycles(self.old_trades(profile_ids[first:first + self.batch_size]), self.cutoff))
+            if cycles:
+                self.flush(cycles)
+        return self.cycles, self.trades
+
+    def flush(self, cycles):
+        self.cycles += len(cycles)
+        self.trades += sum(map(len, cycles))
+        if self.dry_run:
+            return
+        market = self.market
+        trades = [trade for cycle in cycles for trade in cycle]
+        with transaction.atomic():
+            market.archive.objects.bulk_create([market.archived(trade) for trade in trades])
+            # A plain DELETE: the per-row delete signals would only invalidate the same users again
+            self.delete([trade.id for trade in trades])
+            self.summarize(cycles)
+            user_ids = UserProfile.objects.filter(
+                id__in={trade.user_profile_id for trade in trades}
+            ).values_list('user_id', flat=True)
+            for user_id in user_ids:
+                invalidate_user_data(user_id)  # Their histories changed
+
+    def delete(self, ids):
+        table = connection.ops.quote_name(self.market.model._meta.db_table)
+        with connection.cursor() as cursor:
+            for first in range(0, len(ids), DELETE_CHUNK):
+                chunk = ids[first:first + DELETE_CHUNK]
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+    def summarize(self, cycles):
+        market, p = self.market, self.market.prefix
+        totals = {}
+        for cycle in cycles:
+            total = totals.setdefault((cycle[0].user_profile_id, cycle[0].symbol), {
+                **dict.fromkeys(SUMMED, 0), 'first_trade_at': cycle[0].created_at,
+            })
+            total['closed_positions'] += 1
+            total['trade_count'] += len(cycle)
+            for trade in cycle:
+                if trade.transaction_type == 'buy':
+                    total['closed_quantity'] += trade.quantity
+                    total['bought_amount'] += trade.amount
+                else:
+                    total['sold_amount'] += trade.amount
+            total['last_trade_at'] = cycle[-1].created_at
+
+        existing = {
+            (summary.user_profile_id, getattr(summary, market.symbol)): summary
+            for summary in market.summary.objects.select_for_update().filter(
+                user_profile_id__in={key[0] for key in totals}, **{f"{market.symbol}__in": {key[1] for key in totals}}
+            )
+        }
+        created, updated = [], []
+        for (profile_id, symbol), total in totals.items():
+            summary = existing.get((profile_id, symbol))
+            if summary is None:
+                summary = market.summary(user_profile_id=profile_id, **{
+                    market.symbol: symbol, f"{p}first_trade_at": total['first_trade_at'],
+                })
+                created.append(summary)
+            else:
+                updated.append(summary)
+            for field in SUMMED:
+                setattr(summary, f"{p}{field}", getattr(summary, f"{p}{field}") + total[field])
+            setattr(summary, f"{p}realized_profit_loss",
+                    getattr(summary, f"{p}sold_amount") - getattr(summary, f"{p}bought_amount"))
+            setattr(summary, f"{p}last_trade_at", total['last_trade_at'])
+
+        market.summary.objects.bulk_create(created)
+        market.summary.objects.bulk_update(updated, [
+            f"{p}{field}" for field in SUMMED + ('realized_profit_loss', 'last_trade_at')
+        ])
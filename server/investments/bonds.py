@@ -0,0 +1,327 @@
+"""
+Vectorized bond analytics.
+
+The yield curve is interpolated linearly (flat beyond its ends) between the
+latest closes of the treasury yield indices in TREASURY_TENORS, read through
+`get_price_history`, with BOND_FALLBACK_CURVE filling in when none of them
+has data; the curve itself is cached like prices. A catalog bond is priced
+off the curve at its term plus the credit spread of its risk level;
+government bonds carry no spread.
+
+`analyze` works on whole arrays of bonds at once: every bond's remaining
+coupons are laid out on a (bonds x coupons) grid, masked past each bond's last
+coupon, so prices, durations and convexities are a few NumPy reductions, and
+yields from prices are solved for all bonds together by Newton's method.
+Terms are years to maturity; a term that is not a whole number of coupon
+periods puts the bond part-way through a period, with the accrued coupon
+making up the difference between its dirty and clean price.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .prices import get_price_history
+
+# CBOE treasury yield indices, quoted in percent, and their tenors in years
+TREASURY_TENORS = {'^IRX': 0.25, '^FVX': 5.0, '^TNX': 10.0, '^TYX': 30.0}
+
+# Spread over the curve of non-government bonds, by catalog risk level
+CREDIT_SPREADS = {'low': 0.004, 'medium': 0.012, 'high': 0.028}
+
+FREQUENCIES = {'annually': 1, 'semi-annually': 2, 'quarterly': 4, 'monthly': 12}
+
+# Bounds of priced instruments, which also bound the (bonds x coupons) grid
+MAX_YEARS = 100
+MAX_FREQUENCY = 12
+
+CURVE_CACHE_KEY = 'bonds:curve'
+
+YTM_ITERATIONS = 50
+YTM_TOLERANCE = 1e-10
+
+
+class YieldCurve:
+    """Yields (decimal fractions) at tenors (years), linearly interpolated."""
+
+    def __init__(self, tenors, yields, source):
+        import numpy as np
+
+        order = np.argsort(tenors)
+        self.tenors = np.asarray(tenors, dtype=np.float64)[order]
+        self.yields = np.asarray(yields, dtype=np.float64)[order]
+        self.source = source
+
+    def __call__(self, years):
+        import numpy as np
+        return np.interp(years, self.tenors, self.yields)
+
+    def points(self):
+        return [{'tenor_years': float(tenor), 'yield': round(float(rate), 6)}
+                for tenor, rate in zip(self.tenors, self.yields)]
+
+
+def get_yield_curve():
+    """
+    The yield curve from the latest treasury closes, or BOND_FALLBACK_CURVE,
+    cached for PRICE_CACHE_SECONDS.
+    """
+    cached = cache.get(CURVE_CACHE_KEY)
+    if cached is not None:
+        return YieldCurve(*cached)
+    tenors, yields = [], []
+    for symbol, tenor in TREASURY_TENORS.items():
+        bars = get_price_history(symbol, '5d', '1d')
+        if bars:
+            tenors.append(tenor)
+            yields.append(float(bars[-1]['close']) / 100)
+    if tenors:
+        source = 'treasury'
+    else:
+        tenors = list(settings.BOND_FALLBACK_CURVE)
+        yields = [rate / 100 for rate in settings.BOND_FALLBACK_CURVE.values()]
+        source = 'fallback'
+    cache.set(CURVE_CACHE_KEY, (tenors, yields, source), settings.PRICE_CACHE_SECONDS)
+    return YieldCurve(tenors, yields, source)
+
+
+def analyze(face_value, coupon_rate, frequency, years, yields=None, clean_prices=None):
+    """
+    Price and risk measures of many bonds at once.
+
+    :param face_value: Array-likes of one value per bond, like `coupon_rate`
+        (a decimal fraction), `frequency` (coupons per year) and `years` to
+        maturity.
+    :param yields: Yield to maturity per bond, compounded `frequency` times a
+        year; prices are computed from it. Exactly one of `yields` and
+        `clean_prices` is given.
+    :param clean_prices: Clean price per bond; yields are solved from it.
+    :return: Dict of float arrays: clean_price, dirty_price, accrued_interest,
+        ytm, macaulay_duration and modified_duration (years), convexity.
+    """
+    import numpy as np
+
+    if (yields is None) == (clean_prices is None):
+        raise ValueError("Pass exactly one of yields and clean_prices")
+    face = np.asarray(face_value, dtype=np.float64)
+    rate = np.asarray(coupon_rate, dtype=np.float64)
+    m = np.asarray(frequency, dtype=np.float64)
+    periods = np.asarray(years, dtype=np.float64) * m
+    if np.any(periods <= 0) or np.any(m <= 0):
+        raise ValueError("Years to maturity and coupon frequency must be positive")
+
+    remaining = np.maximum(np.ceil(periods - 1e-9), 1.0)  # Coupons still to be paid
+    elapsed = remaining - periods  # Fraction of the current period already accrued
+    coupon = face * rate / m
+    accrued = coupon * elapsed
+
+    # Periods from now until each remaining coupon, NaN past a bond's last one
+    grid = np.arange(1, int(remaining.max()) + 1, dtype=np.float64)
+    times = np.where(grid <= remaining[:, None], grid - elapsed[:, None], np.nan)
+    flows = np.where(np.isnan(times), 0.0, coupon[:, None])
+    flows[np.arange(len(face)), remaining.astype(np.intp) - 1] += face
+    times = np.nan_to_num(times)
+    curvature = times * (times + 1.0)
+
+    def measures(y, with_convexity=True):
+        base = 1.0 + y / m
+        discounted = flows * np.exp(times * -np.log(base)[:, None])
+        dirty = discounted.sum(axis=1)
+        macaulay = np.einsum('ij,ij->i', discounted, times) / dirty / m
+        convexity = np.einsum('ij,ij->i', discounted, curvature) / (dirty * base ** 2 * m ** 2) if with_convexity else None
+        return dirty, macaulay, macaulay / base, convexity
+
+    if yields is not None:
+        y = np.broadcast_to(np.asarray(yields, dtype=np.float64), face.shape).copy()
+    else:
+        target = np.asarray(clean_prices, dtype=np.float64) + accrued
+        y = np.where(face > 0, rate + (face - target) / (face * np.maximum(periods / m, 1.0)), rate)
+        for _ in range(YTM_ITERATIONS):
+            dirty, _, modified, _ = measures(y, with_convexity=False)
+            step = (dirty - target) / (dirty * modified)
+            # Keep 1 + y/m positive, however far off the first guess was
+            y = np.maximum(y + step, (y - m) / 2)
+            if np.all(np.abs(step) < YTM_TOLERANCE):
+                break
+
+    dirty, macaulay, modified, convexity = measures(y)
+    return {
+        'clean_price': dirty - accrued,
+        'dirty_price': dirty,
+        'accrued_interest': accrued,
+        'ytm': y,
+        'macaulay_duration': macaulay,
+        'modified_duration': modified,
+        'convexity': convexity,
+    }
+
+
+def catalog_yields(bonds, curve):
+    """Curve yield at each catalog bond's term plus its credit spread."""
+    import numpy as np
+
+    spreads = np.array([
+        0.0 if bond.get('category') == 'government' else CREDIT_SPREADS.get(bond.get('risk_level'), CREDIT_SPREADS['high'])
+        for bond in bonds
+    ])
+    return curve(np.array([float(bond['term_years']) for bond in bonds])) + spreads
+
+
+def catalog_arrays(bonds):
+    """(face_value, coupon_rate, frequency, years) arrays of catalog bond dicts."""
+    import numpy as np
+
+    return (
+        np.array([float(bond['face_value']) for bond in bonds]),
+        np.array([float(bond['coupon_rate']) for bond in bonds]),
+        np.array([FREQUENCIES[bond['coupon_frequency']] for bond in bonds], dtype=np.float64),
+        np.array([float(bond['term_years']) for bond in bonds]),
+    )
+
+
+def price_catalog_bonds(bonds, curve=None):
+    """
+    Model prices of catalog bonds off the yield curve, with the yield of each
+    at its listed catalog price.
+
+    :return: (curve, [per-bond dict of analytics rounded for display])
+    """
+    import numpy as np
+
+    curve = curve or get_yield_curve()
+    if not bonds:
+        return curve, []
+    arrays = catalog_arrays(bonds)
+    model = analyze(*arrays, yields=catalog_yields(bonds, curve))
+    listed = analyze(*arrays, clean_prices=np.array([float(bond['price']) for bond in bonds]))
+    results = []
+    for index, bond in enumerate(bonds):
+        results.append({
+            'id': bond['id'],
+            'name': bond['name'],
+            'listed_price': bond['price'],
+            'listed_ytm': round(float(listed['ytm'][index]), 6),
+            'model_yield': round(float(model['ytm'][index]), 6),
+            'clean_price': _money(model['clean_price'][index]),
+            'dirty_price': _money(model['dirty_price'][index]),
+            'accrued_interest': _money(model['accrued_interest'][index]),
+            'macaulay_duration': round(float(model['macaulay_duration'][index]), 4),
+            'modified_duration': round(float(model['modified_duration'][index]), 4),
+            'convexity': round(float(model['convexity'][index]), 4),
+        })
+    return curve, results
+
+
+ANALYTICS = ('clean_price', 'dirty_price', 'accrued_interest', 'ytm', 'macaulay_duration', 'modified_duration', 'convexity')
+
+
+def price_instruments(instruments, curve=None):
+    """
+    Analytics of arbitrary bonds, given as dicts of face_value, coupon_rate
+    (decimal fraction), coupon_frequency (a FREQUENCIES name or coupons per
+    year) and years to maturity. A bond with a clean `price` gets the yield at
+    that price; one with a `yield` gets the price at that yield; any other is
+    priced at the curve yield at its maturity plus its `spread`, if any.
+    Maturities run from one coupon period to MAX_YEARS, frequencies from 1 to
+    MAX_FREQUENCY a year, and prices must be positive.
+
+    :return: One dict of ANALYTICS per instrument, in order.
+    :raises ValueError: If an instrument is missing a field or has a bad value.
+    """
+    import numpy as np
+
+    count = len(instruments)
+    face, rate, frequency, years = np.empty(count), np.empty(count), np.empty(count), np.empty(count)
+    prices, yields, spreads = np.full(count, np.nan), np.full(count, np.nan), np.zeros(count)
+    has_price, has_yield = np.zeros(count, dtype=bool), np.zeros(count, dtype=bool)
+    for index, item in enumerate(instruments):
+        try:
+            coupons = item.get('coupon_frequency', 2)
+            face[index] = float(item.get('face_value', 1000))
+            rate[index] = float(item['coupon_rate'])
+            frequency[index] = FREQUENCIES[coupons] if coupons in FREQUENCIES else float(coupons)
+            years[index] = float(item['years'])
+            if item.get('price') is not None:
+                prices[index] = float(item['price'])
+                has_price[index] = True
+            elif item.get('yield') is not None:
+                yields[index] = float(item['yield'])
+                has_yield[index] = True
+            spreads[index] = float(item.get('spread') or 0)
+        except KeyError as e:
+            raise ValueError(f"Instrument {index} is missing {e}")
+        except (TypeError, ValueError, AttributeError):
+            raise ValueError(f"Instrument {index} has a non-numeric field")
+
+    checks = (
+        (np.isfinite(face) & (face > 0), "face_value must be a positive number"),
+        (np.isfinite(rate) & (rate >= 0), "coupon_rate must be a non-negative number"),
+        ((frequency >= 1) & (frequency <= MAX_FREQUENCY), f"coupon_frequency must be between 1 and {MAX_FREQUENCY} a year"),
+        (np.isfinite(years) & (years <= MAX_YEARS), f"years must be at most {MAX_YEARS}"),
+        # At least one whole coupon period, so every bond has a coupon left to pay
+        (years * frequency >= 1, "years must cover at least one coupon period"),
+        (~has_price | (np.isfinite(prices) & (prices > 0)), "price must be a positive number"),
+        (~has_yield | (np.isfinite(yields) & (yields > -frequency)), "yield must be a number above -coupon_frequency"),
+        (np.isfinite(spreads), "spread must be a number"),
+    )
+    for valid, message in checks:
+        if not valid.all():
+            raise ValueError(f"Instrument {int(np.argmin(valid))}: {message}")
+
+    from_curve = ~has_price & ~has_yield
+    if from_curve.any():
+        curve = curve or get_yield_curve()
+        yields[from_curve] = curve(years[from_curve]) + spreads[from_curve]
+
+    columns = {name: np.empty(count) for name in ANALYTICS}
+    priced = has_price
+    for group, keyword, values in ((priced, 'clean_prices', prices), (~priced, 'yields', yields)):
+        if group.any():
+            result = analyze(face[group], rate[group], frequency[group], years[group], **{keyword: values[group]})
+            for name in ANALYTICS:
+                columns[name][group] = result[name]
+    rounded = {name: np.round(values, 6 if name == 'ytm' else 4).tolist() for name, values in columns.items()}
+    return [dict(zip(ANALYTICS, row)) for row in zip(*(rounded[name] for name in ANALYTICS))]
+
+
+def model_price(bond, curve=None):
+    """Model clean price of one catalog bond as a Decimal."""
+    curve = curve or get_yield_curve()
+    return Decimal(_money(analyze(*catalog_arrays([bond]), yields=catalog_yields([bond], curve))['clean_price'][0]))
+
+
+def rate_risk(bonds, quantities, curve=None, shift_bps=100):
+    """
+    Interest-rate risk of holdings in catalog bonds.
+
+    :param quantities: Units held of each bond.
+    :return: Market value, value-weighted modified duration and convexity,
+        DV01 (value change for a 1bp fall in yields) and the estimated value
+        change for a parallel shift of +/- shift_bps.
+    """
+    import numpy as np
+
+    curve = curve or get_yield_curve()
+    if not bonds:
+        return {'market_value': '0.00', 'modified_duration': 0.0, 'convexity': 0.0, 'dv01': '0.00',
+                'shift_bps': shift_bps, 'value_change_up': '0.00', 'value_change_down': '0.00'}
+    model = analyze(*catalog_arrays(bonds), yields=catalog_yields(bonds, curve))
+    values = model['dirty_price'] * np.asarray(quantities, dtype=np.float64)
+    total = values.sum()
+    weights = values / total if total else np.zeros_like(values)
+    duration = float(weights @ model['modified_duration'])
+    convexity = float(weights @ model['convexity'])
+    shift = shift_bps / 10000
+    return {
+        'market_value': _money(total),
+        'modified_duration': round(duration, 4),
+        'convexity': round(convexity, 4),
+        'dv01': _money(total * duration / 10000),
+        'shift_bps': shift_bps,
+        'value_change_up': _money(total * (-duration * shift + convexity * shift ** 2 / 2)),
+        'value_change_down': _money(total * (duration * shift + convexity * shift ** 2 / 2)),
+    }
+
+
+def _money(value):
+    return str(Decimal(repr(float(value))).quantize(Decimal('0.01')))
@@ -0,0 +1,174 @@
+"""
+In-memory catalog of the insurance and bond products users can buy.
+
+Products are loaded from the CATALOG_FILES JSON lists into a compact index:
+the product dicts sorted by price, their prices in cents in a parallel list
+for bisecting price ranges, and for each filterable field a map from value to
+the sorted positions of the products having it. A query intersects the
+position sets of its filters, bisects the result to the price range and
+orders the matches by precomputed ranks, so the product dicts are only
+touched for the page that is returned.
+
+The files are stat'ed at most every CATALOG_RELOAD_SECONDS; when one changes,
+a new index is built and swapped in whole, so readers never see a half-built
+index and a file caught mid-write just keeps the previous one.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from heapq import nlargest, nsmallest
+from itertools import islice
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Fields a query can filter on, each with one or more comma-separated values
+FILTERS = ('type', 'category', 'risk_level', 'term_years')
+
+SORTS = ('price', 'term_years', 'name', 'id')
+
+
+def _cents(value):
+    return int(Decimal(str(value)) * 100)
+
+
+def _key(field, value):
+    return int(value) if field == 'term_years' else str(value).lower()
+
+
+class CatalogIndex:
+    def __init__(self, products):
+        products = sorted(products, key=lambda product: (_cents(product['price']), product['id']))
+        self.products = tuple(products)
+        self.prices = [_cents(product['price']) for product in products]
+        self.by_id = {product['id']: product for product in products}
+        self.by_name = {product['name']: product for product in products}
+        self.postings = {field: {} for field in FILTERS}
+        for position, product in enumerate(products):
+            for field in FILTERS:
+                if field in product:
+                    self.postings[field].setdefault(_key(field, product[field]), []).append(position)
+        self.sets = {field: {value: frozenset(posting) for value, posting in postings.items()}
+                     for field, postings in self.postings.items()}
+        self.terms = sorted(self.postings['term_years'])
+        # Positions in every sort order and the rank of each position in it; price order is the position itself
+        self.orders, self.ranks = {}, {}
+        for field in SORTS[1:]:
+            order = sorted(range(len(products)), key=lambda position: (products[position][field], position))
+            ranks = [0] * len(products)
+            for rank, position in enumerate(order):
+                ranks[position] = rank
+            self.orders[field], self.ranks[field] = order, ranks
+
+    def _posting(self, field, values):
+        """
+        Positions of the products whose field is any of the values, as a
+        set, and as a sorted list when that is already at hand (else None).
+        """
+        keys = [_key(field, value) for value in values]
+        if len(keys) == 1:
+            return self.sets[field].get(keys[0], frozenset()), self.postings[field].get(keys[0], [])
+        return frozenset().union(*(self.sets[field].get(key, ()) for key in keys)), None
+
+    def query(self, filters=None, price_min=None, price_max=None, term_min=None, term_max=None,
+              sort='price', descending=False, offset=0, limit=20):
+        """
+        Filter, sort and page the catalog.
+
+        :param filters: {field: [values]} over FILTERS; a product matches a
+            field when it has any of the values.
+        :param price_min: Lowest price (inclusive) as a Decimal, like price_max.
+        :param term_min: Shortest term in years (inclusive), like term_max.
+        :return: (number of matching products, the product dicts of the page)
+        """
+        low = bisect_left(self.prices, _cents(price_min)) if price_min is not None else 0
+        high = bisect_right(self.prices, _cents(price_max)) if price_max is not None else len(self.prices)
+        postings = [self._posting(field, values) for field, values in (filters or {}).items() if values]
+        if term_min is not None or term_max is not None:
+            terms = self.terms[bisect_left(self.terms, term_min if term_min is not None else 0):
+                               bisect_right(self.terms, term_max) if term_max is not None else len(self.terms)]
+            postings.append(self._posting('term_years', terms) if terms else (frozenset(), []))
+
+        if not postings:
+            positions = range(low, high)
+        else:
+            postings.sort(key=lambda posting: len(posting[0]))
+            positions = postings[0][1]
+            if len(postings) > 1 or positions is None:
+                positions = sorted(postings[0][0].intersection(*(posting[0] for posting in postings[1:])))
+            positions = positions[bisect_left(positions, low):bisect_left(positions, high)]
+        end = offset + limit
+        if sort != 'price' and len(positions) > max(16 * end, len(self.products) // 4):
+            # A large share of the products match: walk the sort order until the page is full
+            sets = [posting[0] for posting in postings]
+            order = reversed(self.orders[sort]) if descending else self.orders[sort]
+            page = list(islice((
+                position for position in order if low <= position < high and all(position in other for other in sets)
+            ), offset, end))
+        elif sort != 'price':
+            # Only the positions up to the end of the page need ordering
+            page = (nlargest if descending else nsmallest)(end, positions, key=self.ranks[sort].__getitem__)[offset:]
+        elif descending:
+            page = positions[max(len(positions) - end, 0):max(len(positions) - offset, 0)][::-1]
+        else:
+            page = positions[offset:end]
+        return len(positions), [self.products[position] for position in page]
+
+
+def load_index(paths):
+    products = []
+    for path in paths:
+        with open(path) as f:
+            products.extend(json.load(f))
+    return CatalogIndex(products)
+
+
+class Catalog:
+    """The current CatalogIndex of a set of files, rebuilt when they change."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._index = None
+        self._stamps = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        stamps = []
+        for path in self.paths:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        return stamps
+
+    def index(self):
+        if self._index is not None and time.monotonic() - self._checked < settings.CATALOG_RELOAD_SECONDS:
+            return self._index
+        with self._lock:
+            if self._index is None or time.monotonic() - self._checked >= settings.CATALOG_RELOAD_SECONDS:
+                self._checked = time.monotonic()
+                try:
+                    stamps = self._stat()
+                    if stamps != self._stamps:
+                        self._index = load_index(self.paths)
+                        self._stamps = stamps
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.warning("Error loading product catalog: %s", e)
+                    if self._index is None:
+                        self._index = CatalogIndex([])
+        return self._index
+
+
+_catalog = None
+
+
+def get_catalog():
+    """The process-wide catalog of CATALOG_FILES."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(settings.CATALOG_FILES)
+    return _catalog.index()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+
+from .prices import get_cached_prices
+from .streaming import hub, price_group
+
+MAX_SYMBOLS_PER_CONNECTION = 50
+
+
+class PriceStreamConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live prices over a WebSocket.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]} and
+    receive {"type": "ticks", "ticks": [{"symbol", "price", "ts"}, ...]}.
+    Newly subscribed symbols get their latest known price right away, as ticks
+    are only published when a price changes. Ticks arriving faster than
+    PRICE_STREAM_MAX_RATE per second are coalesced, keeping only the latest
+    price per symbol.
+    """
+    feed = 'prices'
+    polled = True  # Start upstream pollers for subscribed symbols
+
+    async def connect(self):
+        self.symbols = set()
+        self.pending = {}
+        self.last_flush = 0.0
+        self.flush_handle = None
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        for symbol in self.symbols:
+            await self.unsubscribe(symbol)
+        self.symbols = set()
+
+    async def receive_json(self, content, **kwargs):
+        action = content.get('action')
+        symbols = content.get('symbols')
+        if action not in ('subscribe', 'unsubscribe') or not isinstance(symbols, list):
+            await self.send_json({'type': 'error', 'error': "Expected {'action': 'subscribe'|'unsubscribe', 'symbols': [...]}"})
+            return
+
+        symbols = {str(symbol).upper() for symbol in symbols if symbol}
+        if action == 'subscribe':
+            new = symbols - self.symbols
+            if len(self.symbols) + len(new) > MAX_SYMBOLS_PER_CONNECTION:
+                await self.send_json({'type': 'error', 'error': f"At most {MAX_SYMBOLS_PER_CONNECTION} symbols per connection"})
+                return
+            for symbol in new:
+                await self.subscribe(symbol)
+            self.symbols |= new
+            snapshot = await self.latest_ticks(new) if new else []
+        else:
+            snapshot = []
+            for symbol in symbols & self.symbols:
+                await self.unsubscribe(symbol)
+                self.pending.pop(symbol, None)
+            self.symbols -= symbols
+        await self.send_json({'type': 'subscribed', 'symbols': sorted(self.symbols)})
+        if snapshot:
+            await self.send_json({'type': 'ticks', 'ticks': snapshot})
+
+    async def latest_ticks(self, symbols):
+        """Ticks of the cached last prices of the symbols that have one."""
+        prices = await sync_to_async(get_cached_prices, thread_sensitive=False)(sorted(symbols))
+        now = time.time()
+        return [{'symbol': symbol, 'price': str(price), 'ts': now} for symbol, price in prices.items()]
+
+    async def subscribe(self, symbol):
+        await self.channel_layer.group_add(price_group(symbol, self.feed), self.channel_name)
+        if self.polled:
+            hub.acquire(symbol)
+
+    async def unsubscribe(self, symbol):
+        await self.channel_layer.group_discard(price_group(symbol, self.feed), self.channel_name)
+        if self.polled:
+            hub.release(symbol)
+
+    async def price_tick(self, event):
+        if event['symbol'] not in self.symbols:
+            return
+        self.pending[event['symbol']] = {'symbol': event['symbol'], 'price': event['price'], 'ts': event['ts']}
+        if self.flush_handle is None:
+            delay = max(0.0, self.last_flush + 1.0 / settings.PRICE_STREAM_MAX_RATE - time.monotonic())
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                delay, lambda: asyncio.ensure_future(self.flush())
+            )
+
+    async def flush(self):
+        self.flush_handle = None
+        if not self.pending:
+            return
+        ticks, self.pending = list(self.pending.values()), {}
+        self.last_flush = time.monotonic()
+        await self.send_json({'type': 'ticks', 'ticks': ticks})
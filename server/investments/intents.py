@@ -0,0 +1,158 @@
+"""
+Deterministic parser for simple agent chat commands.
+
+Queries like "buy 5 AAPL", "sell 2 of tesla", "buy $500 of apple" or
+"show my portfolio" are recognized here and executed directly, so only
+ambiguous or advisory queries need to go to the LLM. Their price lookups
+and trades go through the agent harness like the LLM path's tool calls, so
+they are timed as stages and recorded in or replayed from cassettes.
+"""
+import re
+from collections import namedtuple
+from decimal import Decimal, ROUND_DOWN
+
+from account.models import UserProfile
+from agent import harness
+from .models import Portfolio
+from .prices import get_last_price
+from .trading import execute_trade, TradeError
+
+Intent = namedtuple('Intent', ['action', 'symbol', 'quantity', 'amount'])
+
+# Company names and common aliases mapped to ticker symbols
+SYMBOLS = {
+    'apple': 'AAPL', 'aapl': 'AAPL',
+    'microsoft': 'MSFT', 'msft': 'MSFT',
+    'google': 'GOOGL', 'alphabet': 'GOOGL', 'googl': 'GOOGL',
+    'amazon': 'AMZN', 'amzn': 'AMZN',
+    'meta': 'META', 'facebook': 'META',
+    'tesla': 'TSLA', 'tsla': 'TSLA',
+    'johnson & johnson': 'JNJ', 'johnson and johnson': 'JNJ', 'j&j': 'JNJ', 'jnj': 'JNJ',
+    'visa': 'V',
+    'walmart': 'WMT', 'wmt': 'WMT',
+    'nvidia': 'NVDA', 'nvda': 'NVDA',
+    'netflix': 'NFLX', 'nflx': 'NFLX',
+    'ibm': 'IBM',
+}
+
+TICKER = re.compile(r'^[A-Z]{1,5}(?:[.-][A-Z]{1,2})?$')
+NUMBER = r'\d[\d,]*(?:\.\d+)?'
+
+QUANTITY_TRADE = re.compile(
+    r'^(?:please\s+)?(?P<action>buy|purchase|sell)\s+(?P<quantity>\d+)\s+'
+    r'(?:(?:shares?|units?|stocks?)\s+)?(?:of\s+)?(?P<asset>.+?)(?:\s+(?:shares?|stocks?))?$',
+    re.IGNORECASE,
+)
+AMOUNT_TRADE = re.compile(
+    rf'^(?:please\s+)?(?P<action>buy|purchase|sell)\s+'
+    rf'(?:[$₹]\s*(?P<amount>{NUMBER})|(?P<amount_word>{NUMBER})\s*(?:dollars|usd|rupees|rs\.?|inr))\s+'
+    r'(?:worth\s+)?of\s+(?P<asset>.+?)(?:\s+(?:shares?|stocks?))?$',
+    re.IGNORECASE,
+)
+PORTFOLIO = re.compile(
+    r'^(?:(?:please\s+)?(?:show|view|list|display|get|check)(?:\s+me)?\s+|what(?:\'s| is)\s+in\s+)?'
+    r'my\s+(?:portfolio|holdings|positions)$',
+    re.IGNORECASE,
+)
+BALANCE = re.compile(
+    r'^(?:(?:please\s+)?(?:show|view|get|check)(?:\s+me)?\s+|what(?:\'s| is)\s+)?my\s+(?:balance|cash)$',
+    re.IGNORECASE,
+)
+
+
+def resolve_symbol(text):
+    """Map a company name, alias or explicit uppercase ticker to a symbol."""
+    text = text.strip()
+    symbol = SYMBOLS.get(text.lower())
+    if symbol:
+        return symbol
+    # Unknown names are only trusted when written as a ticker, e.g. "IBM"
+    if TICKER.match(text):
+        return text.upper()
+    return None
+
+
+def parse_intent(query):
+    """Return an Intent for a recognized command, or None to fall through to the LLM."""
+    text = ' '.join(query.split()).rstrip('.!?')
+    if PORTFOLIO.match(text):
+        return Intent('portfolio', None, None, None)
+    if BALANCE.match(text):
+        return Intent('balance', None, None, None)
+
+    # Amounts first, so "buy 100 dollars of AAPL" is not read as 100 shares
+    match = AMOUNT_TRADE.match(text)
+    if match:
+        symbol = resolve_symbol(match.group('asset'))
+        amount = Decimal((match.group('amount') or match.group('amount_word')).replace(',', ''))
+        if symbol and amount > 0:
+            return Intent(_action(match), symbol, None, amount)
+        return None
+
+    match = QUANTITY_TRADE.match(text)
+    if match:
+        symbol = resolve_symbol(match.group('asset'))
+        quantity = int(match.group('quantity'))
+        if symbol and quantity > 0:
+            return Intent(_action(match), symbol, quantity, None)
+    return None
+
+
+def _action(match):
+    action = match.group('action').lower()
+    return 'buy' if action == 'purchase' else action
+
+
+def _encode_price(price):
+    return None if price is None else str(price)
+
+
+def _decode_price(value):
+    return None if value is None else Decimal(value)
+
+
+def _trade(profile, symbol, quantity, price, action):
+    """execute_trade with a JSON-able result, TradeErrors included, for the harness to record."""
+    try:
+        transaction, profit_loss = execute_trade(profile, symbol, 'stock', quantity, price, action)
+    except TradeError as e:
+        return {'error': e.message, 'status': e.status_code}
+    return {'amount': str(transaction.amount), 'profit_loss': None if profit_loss is None else str(profit_loss)}
+
+
+def execute_intent(user_id, intent):
+    """Run a parsed intent for a user, returning the agent_chat payload and HTTP status."""
+    try:
+        profile = UserProfile.objects.get(user__id=user_id)
+    except (UserProfile.DoesNotExist, ValueError):
+        return {'type': 'error', 'data': 'User profile not found'}, 404
+
+    if intent.action == 'portfolio':
+        holdings = Portfolio.objects.filter(user_profile=profile).order_by('asset_symbol')
+        if not holdings:
+            return {'type': 'response', 'data': "Your portfolio is empty."}, 200
+        return {'type': 'response', 'data': "\n".join(f"{item.asset_symbol}: {item.quantity} shares" for item in holdings)}, 200
+
+    if intent.action == 'balance':
+        return {'type': 'response', 'data': f"Your balance is ${profile.balance}."}, 200
+
+    price = harness.call('tool', 'get_last_price', get_last_price, args=(intent.symbol,),
+                         encode=_encode_price, decode=_decode_price)
+    if price is None:
+        return {'type': 'error', 'data': f"Could not get a price for {intent.symbol}."}, 502
+
+    quantity = intent.quantity
+    if quantity is None:
+        quantity = int((intent.amount / price).to_integral_value(rounding=ROUND_DOWN))
+        if quantity <= 0:
+            return {'type': 'error', 'data': f"${intent.amount} is less than one share of {intent.symbol} at ${price}."}, 400
+
+    result = harness.call('tool', 'execute_trade', _trade, args=(profile, intent.symbol, quantity, price, intent.action),
+                          key_data=[user_id, intent.symbol, quantity, str(price), intent.action])
+    if 'error' in result:
+        return {'type': 'error', 'data': f"Could not {intent.action} {intent.symbol}: {result['error']}"}, result['status']
+
+    text = f"Action: {'Bought' if intent.action == 'buy' else 'Sold'} {quantity} {intent.symbol} at ${price} for ${result['amount']}."
+    if result['profit_loss'] is not None:
+        text += f" Profit/Loss: ${result['profit_loss']}."
+    return {'type': 'response', 'data': text}, 200
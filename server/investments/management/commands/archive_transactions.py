@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.archive import MARKETS, Archiver
+
+
+class Command(BaseCommand):
+    help = ("Move the trades of fully closed-out positions older than a cutoff from the live transaction "
+            "tables into archive tables, adding their realized P&L to per-symbol position summaries.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Archive positions closed more than this many days ago")
+        parser.add_argument('--market', choices=['real', 'virtual', 'both'], default='both')
+        parser.add_argument('--batch-size', type=int, default=200, help="User profiles per database transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days must be at least 0 and --batch-size at least 1")
+        markets = list(MARKETS) if options['market'] == 'both' else [options['market']]
+        for name in markets:
+            archiver = Archiver(MARKETS[name], options['days'], options['batch_size'], options['dry_run'])
+            cycles, trades = archiver.run()
+            verb = "Would archive" if options['dry_run'] else "Archived"
+            self.stdout.write(f"{name}: {verb} {trades} trades from {cycles} closed positions "
+                              f"(last trade before {archiver.cutoff:%Y-%m-%d})")
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = "Measure cold start: 'manage.py check' wall time and first-request latency in fresh processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--url', default='/user/profile/1/', help="Path requested as the first request")
+        parser.add_argument('--imports', type=int, default=0,
+                            help="Also list the N slowest top-level imports of the URLconf")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+        parser.add_argument('--first-request', metavar='URL', help=argparse.SUPPRESS)
+
+    def manage(self, *args, **kwargs):
+        return subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            capture_output=True, text=True, env=os.environ.copy(), **kwargs,
+        )
+
+    def handle(self, *args, **options):
+        if options['first_request']:
+            return self.first_request(options['first_request'])
+
+        check_ms, process_ms, request_ms = [], [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = self.manage('check')
+            check_ms.append((time.perf_counter() - start) * 1000)
+            if result.returncode:
+                raise CommandError(f"manage.py check failed:\n{result.stderr}")
+
+            start = time.perf_counter()
+            result = self.manage('bench_startup', '--first-request', options['url'])
+            process_ms.append((time.perf_counter() - start) * 1000)
+            if result.returncode:
+                raise CommandError(f"First request failed:\n{result.stderr}")
+            request_ms.append(json.loads(result.stdout.strip().splitlines()[-1])['first_request_ms'])
+
+        report = {
+            'runs': options['runs'],
+            'check_ms': self.summarize(check_ms),
+            'first_request_ms': self.summarize(request_ms),
+            'process_to_first_response_ms': self.summarize(process_ms),
+        }
+        if options['imports']:
+            report['slowest_imports_ms'] = self.slowest_imports(options['imports'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for name in ('check_ms', 'first_request_ms', 'process_to_first_response_ms'):
+            row = report[name]
+            self.stdout.write(f"{name:<32} median {row['median']:>9.1f}  min {row['min']:>9.1f}  max {row['max']:>9.1f}")
+        for module, ms in report.get('slowest_imports_ms', {}).items():
+            self.stdout.write(f"  import {module:<40} {ms:>9.1f}")
+
+    def first_request(self, url):
+        """Child mode: time URLconf loading plus one request through the test client."""
+        from django.test import Client
+
+        start = time.perf_counter()
+        Client(raise_request_exception=False).get(url)
+        self.stdout.write(json.dumps({'first_request_ms': (time.perf_counter() - start) * 1000}))
+
+    def slowest_imports(self, count):
+        code = (
+            "import django; django.setup(); "
+            "from django.urls import get_resolver; get_resolver().url_patterns"
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=os.environ.copy(),
+        )
+        # Keep only the outermost package of each import chain
+        totals = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match and len(match.group(2)) == 1:
+                totals[match.group(3)] = int(match.group(1)) / 1000
+        slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+        return dict(slowest)
+
+    @staticmethod
+    def summarize(values):
+        return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
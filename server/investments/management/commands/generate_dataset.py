@@ -0,0 +1,194 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import BALANCE_FIELDS, BalanceLedgerEntry, UserProfile
+from investments.intents import SYMBOLS
+from investments.models import Portfolio, Transaction
+from virtual_market.models import VirtualPortfolio, VirtualTransaction
+
+STARTING_BALANCE_CENTS = 10000_00
+
+
+def _money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def simulate_history(rng, count, start, span_seconds, prices):
+    """
+    Random buy/sell history that follows `execute_trade`'s bookkeeping.
+
+    Prices are in cents. Sells never exceed the held quantity and buys never
+    exceed the balance, so positions and balances always agree with the trades.
+
+    :return: (trades, positions, totals) where trades are
+        (created_at, symbol, quantity, 'buy'|'sell', price_cents, amount_cents)
+        in time order, positions maps symbol to quantity and totals holds the
+        final balance, boughtsum and stocks in cents.
+    """
+    balance, boughtsum, stocks = STARTING_BALANCE_CENTS, 0, 0
+    positions = {}
+    trades = []
+    symbols = list(prices)
+    offsets = sorted(rng.random() * span_seconds for _ in range(count))
+    for offset in offsets:
+        symbol = rng.choice(symbols)
+        price = max(1, round(prices[symbol] * rng.lognormvariate(0, 0.05)))
+        held = positions.get(symbol, 0)
+        if held and (rng.random() < 0.4 or balance < price):
+            quantity = rng.randint(1, held)
+            kind = 'sell'
+        elif balance >= price:
+            quantity = rng.randint(1, min(50, balance // price))
+            kind = 'buy'
+        else:
+            continue
+
+        amount = price * quantity
+        if kind == 'buy':
+            balance -= amount
+            boughtsum += amount
+            stocks += amount
+            positions[symbol] = held + quantity
+        else:
+            balance += amount
+            boughtsum -= amount
+            stocks -= amount
+            if held == quantity:
+                del positions[symbol]
+            else:
+                positions[symbol] = held - quantity
+        boughtsum = max(boughtsum, 0)
+        stocks = max(stocks, 0)
+        trades.append((start + timedelta(seconds=offset), symbol, quantity, kind, price, amount))
+    return trades, positions, {'balance': balance, 'boughtsum': boughtsum, 'stocks': stocks}
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep generated created_at values instead of auto_now_add's 'now'."""
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+class Command(BaseCommand):
+    help = "Generate users with consistent real and virtual trade histories for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--transactions', type=int, default=50, help="Real trades per user (upper bound)")
+        parser.add_argument('--virtual-transactions', type=int, default=50, help="Virtual trades per user (upper bound)")
+        parser.add_argument('--days', type=int, default=365, help="History spans this many days back from now")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk_create batch")
+        parser.add_argument('--prefix', default='loadtest_', help="Username prefix of generated users")
+        parser.add_argument('--password', default='loadtest', help="Password shared by all generated users")
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated users first")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=prefix)
+        if options['clear']:
+            deleted, _ = existing.delete()
+            self.stdout.write(f"Deleted {deleted} rows from a previous run")
+        elif existing.exists():
+            raise CommandError(f"Users named '{prefix}*' already exist; pass --clear or another --prefix")
+
+        rng = random.Random(options['seed'])
+        symbols = sorted(set(SYMBOLS.values()))
+        prices = {symbol: rng.randint(20_00, 600_00) for symbol in symbols}
+        password = make_password(options['password'])  # Hashing once keeps generation fast
+        now = timezone.now()
+        span = options['days'] * 86400
+        start = now - timedelta(seconds=span)
+
+        self.chunk_size = options['chunk_size']
+        self.counts = dict.fromkeys(['users', 'transactions', 'virtual_transactions', 'portfolios', 'virtual_portfolios'], 0)
+        began = time.perf_counter()
+        # Users are generated in chunks so memory stays flat however many are requested
+        users_per_chunk = max(1, self.chunk_size // max(1, options['transactions'] + options['virtual_transactions']))
+        with explicit_timestamps(Transaction._meta.get_field('created_at'),
+                                 VirtualTransaction._meta.get_field('virtual_created_at')):
+            for first in range(0, options['users'], users_per_chunk):
+                names = [f"{prefix}{index}" for index in range(first, min(first + users_per_chunk, options['users']))]
+                with transaction.atomic():
+                    self.generate_users(rng, names, password, options, start, span, prices)
+                self.stdout.write(f"{first + len(names)}/{options['users']} users", ending='\r')
+
+        elapsed = time.perf_counter() - began
+        rows = sum(self.counts.values()) + self.counts['users']  # Each user also has a profile
+        self.stdout.write('')
+        self.stdout.write(', '.join(f"{count} {name}" for name, count in self.counts.items()))
+        self.stdout.write(f"{rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+    def generate_users(self, rng, names, password, options, start, span, prices):
+        User.objects.bulk_create([User(username=name, password=password) for name in names], batch_size=self.chunk_size)
+        # bulk_create skips post_save, so profiles are created here with their final balances
+        users = list(User.objects.filter(username__in=names).order_by('id'))
+        profiles, histories = [], []
+        for user in users:
+            real = simulate_history(rng, options['transactions'], start, span, prices)
+            virtual = simulate_history(rng, options['virtual_transactions'], start, span, prices)
+            profiles.append(UserProfile(
+                user=user,
+                balance=_money(real[2]['balance']),
+                boughtsum=_money(real[2]['boughtsum']),
+                stocks=_money(real[2]['stocks']),
+                virtualbalance=_money(virtual[2]['balance']),
+                virtualboughtsum=_money(virtual[2]['boughtsum']),
+                virtualstocks=_money(virtual[2]['stocks']),
+            ))
+            histories.append((real, virtual))
+        UserProfile.objects.bulk_create(profiles, batch_size=self.chunk_size)
+        profiles = UserProfile.objects.filter(user__in=users).order_by('user_id')
+        # bulk_create skips UserProfile.save as well, so each ledger opens with the final balances
+        BalanceLedgerEntry.objects.bulk_create([
+            BalanceLedgerEntry(user_profile=profile, reason='open', **{name: getattr(profile, name) for name in BALANCE_FIELDS})
+            for profile in profiles
+        ], batch_size=self.chunk_size)
+
+        transactions, virtual_transactions, portfolios, virtual_portfolios = [], [], [], []
+        for profile, ((trades, positions, _), (virtual_trades, virtual_positions, _)) in zip(profiles, histories):
+            transactions.extend(
+                Transaction(user_profile=profile, asset_symbol=symbol, quantity=quantity, transaction_type=kind,
+                            price=_money(price), amount=_money(amount), created_at=created_at)
+                for created_at, symbol, quantity, kind, price, amount in trades
+            )
+            virtual_transactions.extend(
+                VirtualTransaction(user_profile=profile, virtual_asset_symbol=symbol, virtual_quantity=quantity,
+                                   virtual_transaction_type=kind, virtual_price=_money(price),
+                                   virtual_amount=_money(amount), virtual_created_at=created_at)
+                for created_at, symbol, quantity, kind, price, amount in virtual_trades
+            )
+            portfolios.extend(
+                Portfolio(user_profile=profile, asset_symbol=symbol, quantity=quantity)
+                for symbol, quantity in positions.items()
+            )
+            virtual_portfolios.extend(
+                VirtualPortfolio(user_profile=profile, virtual_asset_symbol=symbol, virtual_quantity=quantity)
+                for symbol, quantity in virtual_positions.items()
+            )
+
+        for model, objects, name in [
+            (Transaction, transactions, 'transactions'),
+            (VirtualTransaction, virtual_transactions, 'virtual_transactions'),
+            (Portfolio, portfolios, 'portfolios'),
+            (VirtualPortfolio, virtual_portfolios, 'virtual_portfolios'),
+        ]:
+            model.objects.bulk_create(objects, batch_size=self.chunk_size)
+            self.counts[name] += len(objects)
+        self.counts['users'] += len(users)
@@ -0,0 +1,350 @@
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+import types
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+from agent.management.commands.bench_agent import percentile
+from investments.intents import SYMBOLS
+
+READS = ['login', 'profile', 'portfolio', 'virtual_portfolio', 'history', 'virtual_history', 'price_history', 'agent']
+WRITES = ['register', 'trade', 'virtual_trade']
+AGENT_QUERIES = ['show my portfolio', "what's my balance", 'should i diversify into bonds?', 'explain index funds']
+
+
+def synthetic_price(symbol):
+    """Stable made-up price for a symbol, the same in every run."""
+    return round(random.Random(symbol).uniform(20, 500), 2)
+
+
+HistoryRow = namedtuple('HistoryRow', ['Open', 'High', 'Low', 'Close', 'Volume'])
+
+
+class SyntheticStamp:
+    def __init__(self, ts):
+        self.ts = ts
+
+    def to_pydatetime(self):
+        return self.ts
+
+
+class SyntheticHistory:
+    """The parts of a yfinance history DataFrame that get_price_history reads."""
+
+    def __init__(self, stamps, rows):
+        self.index = stamps
+        self.rows = rows
+
+    def itertuples(self):
+        return iter(self.rows)
+
+
+class SyntheticTicker:
+    """Stands in for yfinance.Ticker so no request leaves the machine."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.price = synthetic_price(symbol)
+
+    @property
+    def fast_info(self):
+        return {'last_price': self.price}
+
+    @property
+    def info(self):
+        return {'symbol': self.symbol, 'currentPrice': self.price}
+
+    def history(self, period='5d', interval='60m'):
+        rng = random.Random(f"{self.symbol}:{period}:{interval}")
+        start = datetime(2025, 1, 6, 14, 30, tzinfo=timezone.utc)
+        stamps, rows, price = [], [], self.price
+        for i in range(120):
+            close = max(0.01, price * rng.lognormvariate(0, 0.01))
+            stamps.append(SyntheticStamp(start + timedelta(hours=i)))
+            rows.append(HistoryRow(price, max(price, close) * 1.002, min(price, close) * 0.998, close, rng.randint(1000, 100000)))
+            price = close
+        return SyntheticHistory(stamps, rows)
+
+
+class SyntheticResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SyntheticLLM:
+    """Stands in for the Gemini model, answering after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return SyntheticResponse("Spreading your money across asset classes lowers risk. Consider index funds.")
+
+
+def stub_market_data_and_llm(llm_latency):
+    """Route this process's yfinance and Gemini calls to the synthetic stand-ins."""
+    from investments import views
+
+    sys.modules['yfinance'] = types.SimpleNamespace(Ticker=SyntheticTicker)
+    views.get_gemini_model = lambda: SyntheticLLM(llm_latency)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Worker(threading.Thread):
+    def __init__(self, index, host, port, users, ops, weights, options, measure_from, deadline):
+        super().__init__(name=f"loadtest-{index}", daemon=True)
+        self.index = index
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.users = users
+        self.ops = ops
+        self.weights = weights
+        self.options = options
+        self.measure_from = measure_from
+        self.deadline = deadline
+        self.rng = random.Random(f"{options['seed']}:{index}")
+        self.symbols = sorted(set(SYMBOLS.values()))
+        self.holdings = defaultdict(int)  # Bought during this run, so sells can succeed
+        self.registered = 0
+        self.results = defaultdict(list)  # op: [(seconds, status)]
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.connection.close()  # Reconnects on the next request
+                if attempt:
+                    return 0
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            op = self.rng.choices(self.ops, self.weights)[0]
+            start = time.monotonic()
+            status = getattr(self, f"op_{op}")(self.rng.choice(self.users))
+            if start >= self.measure_from:
+                self.results[op].append((time.monotonic() - start, status))
+        self.connection.close()
+
+    def trade(self, market, user_id, path, body):
+        """Buy or sell one unit of a random symbol; sells only sell what this run bought."""
+        symbol = self.rng.choice(self.symbols)
+        position = (market, user_id, symbol)
+        kind = 'sell' if self.holdings[position] and self.rng.random() < 0.5 else 'buy'
+        status = self.request('POST', path, body(symbol, kind))
+        if 200 <= status < 300:
+            self.holdings[position] += 1 if kind == 'buy' else -1
+        return status
+
+    def op_register(self, user):
+        self.registered += 1
+        username = f"{self.options['run_prefix']}{self.index}_{self.registered}"
+        return self.request('POST', '/user/register/', {'username': username, 'password': self.options['password']})
+
+    def op_login(self, user):
+        return self.request('POST', '/user/login/', {'username': user[1], 'password': self.options['password']})
+
+    def op_profile(self, user):
+        return self.request('GET', f"/user/profile/{user[0]}/")
+
+    def op_portfolio(self, user):
+        return self.request('GET', f"/investment/portfolio/{user[0]}/")
+
+    def op_virtual_portfolio(self, user):
+        return self.request('GET', f"/virtual/portfolio/{user[0]}/")
+
+    def op_history(self, user):
+        return self.request('GET', f"/investment/transactions/{user[0]}/")
+
+    def op_virtual_history(self, user):
+        return self.request('GET', f"/virtual/transactions/{user[0]}/")
+
+    def op_price_history(self, user):
+        return self.request('GET', f"/investment/prices/{self.rng.choice(self.symbols)}/history/")
+
+    def op_agent(self, user):
+        return self.request('POST', '/investment/agent/', {'user_id': user[0], 'query': self.rng.choice(AGENT_QUERIES)})
+
+    def op_trade(self, user):
+        return self.trade('real', user[0], '/investment/transactions/', lambda symbol, kind: {
+            'user_id': user[0], 'asset_symbol': symbol, 'asset_type': 'stock', 'quantity': 1,
+            'price': str(synthetic_price(symbol)), 'transaction_type': kind,
+        })
+
+    def op_virtual_trade(self, user):
+        return self.trade('virtual', user[0], '/virtual/transactions/', lambda symbol, kind: {
+            'user_id': user[0], 'virtual_asset_symbol': symbol, 'virtual_asset_type': 'stock', 'virtual_quantity': 1,
+            'virtual_price': str(synthetic_price(symbol)), 'virtual_transaction_type': kind,
+        })
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a concurrent read/write mix against the REST API and report throughput and latency "
+        "percentiles per endpoint, optionally compared with a stored baseline. Writes trades and users, "
+        "so point DATABASE_URL at a dedicated database seeded with generate_dataset (or pass --generate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Target a running server instead of booting the app in this process "
+                                          "(market data and LLM are only stubbed in-process)")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+        parser.add_argument('--warmup', type=float, default=3, help="Unmeasured seconds before measuring")
+        parser.add_argument('--write-ratio', type=float, default=0.2, help="Fraction of operations that write")
+        parser.add_argument('--ops', default=','.join(READS + WRITES), help="Comma-separated operations to run")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='loadtest_', help="Username prefix of the seeded users")
+        parser.add_argument('--password', default='loadtest', help="Password of the seeded users")
+        parser.add_argument('--generate', type=int, metavar='USERS',
+                            help="Seed this many users with generate_dataset first (replacing earlier ones)")
+        parser.add_argument('--llm-latency', type=float, default=0.2, help="Seconds the stub LLM takes per call")
+        parser.add_argument('--output', help="Write the JSON report here, e.g. to keep as a baseline")
+        parser.add_argument('--baseline', help="JSON report to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Relative p95 increase or throughput drop counted as a regression")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error on regressions")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        ops = [op for op in options['ops'].split(',') if op]
+        unknown = set(ops) - set(READS + WRITES)
+        if unknown:
+            raise CommandError(f"Unknown operations: {', '.join(sorted(unknown))}. Valid: {', '.join(READS + WRITES)}")
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError("--write-ratio must be between 0 and 1")
+        reads, writes = [op for op in ops if op in READS], [op for op in ops if op in WRITES]
+        if not reads or not writes:
+            weights = [1] * len(ops)  # Only one kind selected; the ratio does not apply
+        else:
+            weights = [(options['write_ratio'] / len(writes)) if op in WRITES else ((1 - options['write_ratio']) / len(reads))
+                       for op in ops]
+
+        if options['generate']:
+            call_command('generate_dataset', users=options['generate'], seed=options['seed'], prefix=options['prefix'],
+                         password=options['password'], clear=True, stdout=self.stderr)
+        users = list(User.objects.filter(username__startswith=options['prefix']).order_by('id').values_list('id', 'username'))
+        if not users:
+            raise CommandError(f"No '{options['prefix']}' users; seed some with --generate or generate_dataset")
+        options['run_prefix'] = f"{options['prefix']}reg{int(time.time())}_"
+
+        server = None
+        if options['url']:
+            target = urlsplit(options['url'])
+            host, port = target.hostname, target.port or 80
+        else:
+            stub_market_data_and_llm(options['llm_latency'])
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            host, port = server.server_address[:2]
+
+        try:
+            now = time.monotonic()
+            measure_from = now + options['warmup']
+            deadline = measure_from + options['duration']
+            workers = [
+                Worker(i, host, port, users[i::options['concurrency']] or users, ops, weights, options, measure_from, deadline)
+                for i in range(options['concurrency'])
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            User.objects.filter(username__startswith=options['run_prefix']).delete()
+
+        report = self.report(workers, ops, options)
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                report['comparison'] = self.compare(json.load(f), report, options['tolerance'])
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+        regressions = report.get('comparison', {}).get('regressions', [])
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Performance regressions: {', '.join(regressions)}")
+
+    @staticmethod
+    def summarize(samples, duration):
+        seconds = [elapsed for elapsed, _ in samples]
+        statuses = [status for _, status in samples]
+        summary = {
+            'count': len(samples),
+            'errors': sum(1 for status in statuses if status == 0 or status >= 500),
+            'rejected': sum(1 for status in statuses if 400 <= status < 500),
+            'throughput_rps': round(len(samples) / duration, 2),
+        }
+        if seconds:
+            summary.update({
+                'mean_ms': round(sum(seconds) / len(seconds) * 1000, 2),
+                'p50_ms': round(percentile(seconds, 50) * 1000, 2),
+                'p95_ms': round(percentile(seconds, 95) * 1000, 2),
+                'p99_ms': round(percentile(seconds, 99) * 1000, 2),
+            })
+        return summary
+
+    def report(self, workers, ops, options):
+        samples = defaultdict(list)
+        for worker in workers:
+            for op, results in worker.results.items():
+                samples[op] += results
+        return {
+            'config': {key: options[key] for key in ('url', 'concurrency', 'duration', 'warmup', 'write_ratio', 'seed', 'llm_latency')},
+            'ops': ops,
+            'total': self.summarize([sample for results in samples.values() for sample in results], options['duration']),
+            'endpoints': {op: self.summarize(samples[op], options['duration']) for op in ops if samples[op]},
+        }
+
+    @staticmethod
+    def compare(baseline, report, tolerance):
+        changes, regressions = {}, []
+        for op, current in [('total', report['total'])] + list(report['endpoints'].items()):
+            before = baseline['total'] if op == 'total' else baseline.get('endpoints', {}).get(op)
+            if not before or 'p95_ms' not in before or 'p95_ms' not in current:
+                continue
+            p95 = current['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0.0
+            throughput = current['throughput_rps'] / before['throughput_rps'] - 1 if before['throughput_rps'] else 0.0
+            changes[op] = {'p95_change': round(p95, 3), 'throughput_change': round(throughput, 3)}
+            if p95 > tolerance or throughput < -tolerance:
+                regressions.append(op)
+        return {'tolerance': tolerance, 'changes': changes, 'regressions': regressions}
+
+    def print_report(self, report):
+        self.stdout.write(f"{'endpoint':<20}{'count':>8}{'errors':>8}{'4xx':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for op, row in [('total', report['total'])] + list(report['endpoints'].items()):
+            self.stdout.write(f"{op:<20}{row['count']:>8}{row['errors']:>8}{row['rejected']:>6}{row['throughput_rps']:>9.1f}"
+                              f"{row.get('p50_ms', 0):>10.2f}{row.get('p95_ms', 0):>10.2f}{row.get('p99_ms', 0):>10.2f}")
+        comparison = report.get('comparison')
+        if comparison:
+            for op, change in comparison['changes'].items():
+                marker = '  REGRESSION' if op in comparison['regressions'] else ''
+                self.stdout.write(f"{op:<20} p95 {change['p95_change']:+.1%}  throughput {change['throughput_change']:+.1%}{marker}")
@@ -0,0 +1,83 @@
+import glob
+import io
+import os
+import pstats
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from server.profiling import get_runtime_rate, set_runtime_rate
+
+
+class Command(BaseCommand):
+    help = "Switch request profiling on or off at runtime and merge the profiles it wrote."
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+
+        enable = actions.add_parser('enable', help="Profile a fraction of requests to PROFILING_URL_NAMES")
+        enable.add_argument('rate', type=float, help="Fraction of requests to profile, 0-1")
+        enable.add_argument('--minutes', type=float, default=30, help="Switch off again after this long (0: never)")
+        actions.add_parser('disable', help="Stop runtime profiling (the settings sample rate still applies)")
+        actions.add_parser('status')
+
+        merge = actions.add_parser('merge', help="Merge profiles into one flame-graph-ready report")
+        merge.add_argument('--match', default='', help="Only files whose name contains this, e.g. 'agent-chat'")
+        merge.add_argument('--since', default='', help="Only files written at or after this time, as YYYYmmddTHHMMSS")
+        merge.add_argument('--output', '-o', help="Report path (default: merged.collapsed / merged.prof in PROFILING_DIR)")
+        merge.add_argument('--top', type=int, default=25, help="Functions listed from cProfile profiles")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'enable':
+            if not 0 < options['rate'] <= 1:
+                raise CommandError("rate must be between 0 and 1")
+            set_runtime_rate(options['rate'], options['minutes'] * 60 or None)
+            self.stdout.write(f"Profiling {options['rate']:.0%} of requests to {', '.join(settings.PROFILING_URL_NAMES)}")
+        elif action == 'disable':
+            set_runtime_rate(0)
+            self.stdout.write("Runtime profiling disabled")
+        elif action == 'status':
+            self.stdout.write(f"Runtime rate: {get_runtime_rate()}, settings rate: {settings.PROFILING_SAMPLE_RATE}, "
+                              f"mode: {settings.PROFILING_MODE}, directory: {settings.PROFILING_DIR}")
+        else:
+            self.merge(options)
+
+    def profiles(self, suffix, options):
+        paths = []
+        for path in sorted(glob.glob(os.path.join(settings.PROFILING_DIR, f"*.{suffix}"))):
+            name = os.path.basename(path)
+            if name.startswith('merged') or options['match'] not in name or name[:15] < options['since']:
+                continue
+            paths.append(path)
+        return paths
+
+    def merge(self, options):
+        collapsed, prof = self.profiles('collapsed', options), self.profiles('prof', options)
+        if not collapsed and not prof:
+            raise CommandError(f"No matching profiles in {settings.PROFILING_DIR}")
+
+        if collapsed:
+            stacks = Counter()
+            for path in collapsed:
+                with open(path) as f:
+                    for line in f:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack:
+                            stacks[stack] += int(count)
+            output = options['output'] if options['output'] and not prof else os.path.join(settings.PROFILING_DIR, 'merged.collapsed')
+            with open(output, 'w') as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            self.stdout.write(f"Merged {len(collapsed)} sampled profiles ({sum(stacks.values())} samples) into {output}")
+            self.stdout.write(f"Render with: flamegraph.pl {output} > flame.svg (or open it in speedscope)")
+
+        if prof:
+            report = io.StringIO()
+            stats = pstats.Stats(*prof, stream=report)
+            output = options['output'] if options['output'] and not collapsed else os.path.join(settings.PROFILING_DIR, 'merged.prof')
+            stats.dump_stats(output)
+            self.stdout.write(f"Merged {len(prof)} cProfile profiles into {output}")
+            stats.sort_stats('cumulative').print_stats(options['top'])
+            self.stdout.write(report.getvalue())
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from investments.aggregates import MARKETS, recompute_aggregates
+
+
+class Command(BaseCommand):
+    help = ("Recompute every profile's stocks/bonds/insurance aggregates and boughtsum from the cost basis "
+            "of its open positions, in one batched pass that repairs drift across all users.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--market', choices=['real', 'virtual', 'both'], default='both')
+        parser.add_argument('--batch-size', type=int, default=1000, help="User profiles per database transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the drift that would be corrected")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        markets = list(MARKETS.values()) if options['market'] == 'both' else [MARKETS[options['market']]]
+        start = time.perf_counter()
+        profiles, changed, drift = recompute_aggregates(
+            markets, options['batch_size'], options['dry_run'],
+            progress=lambda done: self.stdout.write(f"{done} profiles", ending='\r'),
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write('')
+        verb = "Would correct" if options['dry_run'] else "Corrected"
+        self.stdout.write(f"{verb} {changed} of {profiles} profiles in {elapsed:.1f}s")
+        for market in markets:
+            details = ', '.join(f"{field} {drift.get(field, 0):.2f}" for field in market.fields)
+            self.stdout.write(f"  {market.name} drift: {details}")
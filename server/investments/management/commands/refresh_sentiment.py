@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from investments.intents import SYMBOLS
+from investments.models import Portfolio
+from investments.sentiment import refresh_symbol_sentiment
+from virtual_market.models import VirtualPortfolio
+
+
+class Command(BaseCommand):
+    help = "Fetch news headlines, score them and update per-symbol sentiment aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to refresh (default: all held or known symbols)")
+
+    def handle(self, *args, **options):
+        from yfinance_module_2 import fetch_financial_news
+
+        symbols = options['symbols'] or sorted(
+            set(SYMBOLS.values())
+            | set(Portfolio.objects.values_list('asset_symbol', flat=True).distinct())
+            | set(VirtualPortfolio.objects.values_list('virtual_asset_symbol', flat=True).distinct())
+        )
+        for symbol in symbols:
+            news = fetch_financial_news(symbol)
+            if news is None:
+                self.stderr.write(f"{symbol}: no news fetched")
+                continue
+            aggregate = refresh_symbol_sentiment(symbol, news)
+            self.stdout.write(f"{symbol}: {aggregate.score:.3f} from {aggregate.article_count} articles")
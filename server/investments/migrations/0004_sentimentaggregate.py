@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0003_alter_portfolio_asset_symbol_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_symbol', models.CharField(max_length=100, unique=True)),
+                ('score', models.FloatField(default=0.5)),
+                ('weighted_sum', models.FloatField(default=0.0)),
+                ('weight', models.FloatField(default=0.0)),
+                ('article_count', models.IntegerField(default=0)),
+                ('seen_articles', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
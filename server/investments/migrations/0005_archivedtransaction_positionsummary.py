@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_alter_userprofile_virtualboughtsum'),
+        ('investments', '0004_sentimentaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('asset_symbol', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField()),
+                ('transaction_type', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PositionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_symbol', models.CharField(max_length=100)),
+                ('closed_positions', models.IntegerField(default=0)),
+                ('trade_count', models.IntegerField(default=0)),
+                ('closed_quantity', models.IntegerField(default=0)),
+                ('bought_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('sold_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('realized_profit_loss', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('first_trade_at', models.DateTimeField()),
+                ('last_trade_at', models.DateTimeField()),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_profile', 'asset_symbol'), name='unique_position_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0005_archivedtransaction_positionsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='asset_type',
+            field=models.CharField(choices=[('stock', 'Stock'), ('bond', 'Bond'), ('insurance', 'Insurance')], default='stock', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='asset_type',
+            field=models.CharField(choices=[('stock', 'Stock'), ('bond', 'Bond'), ('insurance', 'Insurance')], default='stock', max_length=10),
+        ),
+    ]
@@ -2,6 +2,14 @@ from django.db import models
 from account.models import UserProfile
 from django.contrib.auth.models import User
 
+# Asset classes a trade is booked under, i.e. which UserProfile aggregate it moves
+ASSET_TYPES = [('stock', 'Stock'), ('bond', 'Bond'), ('insurance', 'Insurance')]
+
+
+def asset_class(asset_type):
+    """The asset class `execute_trade` books a requested asset_type under: anything else is insurance."""
+    return asset_type if asset_type in ('stock', 'bond') else 'insurance'
+
 class Portfolio(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
     asset_symbol = models.CharField(max_length=100)  # e.g., "IBM"
@@ -17,7 +25,55 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=4, choices=[('buy', 'Buy'), ('sell', 'Sell')])
     price = models.DecimalField(max_digits=15, decimal_places=2)  # Price at transaction time
     amount = models.DecimalField(max_digits=15, decimal_places=2)  # Total cost/value
+    asset_type = models.CharField(max_length=10, choices=ASSET_TYPES, default='stock')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user_profile} - {self.transaction_type} {self.quantity} of {self.asset_symbol} at {self.price}"
\ No newline at end of file
+        return f"{self.user_profile} - {self.transaction_type} {self.quantity} of {self.asset_symbol} at {self.price}"
+
+class ArchivedTransaction(models.Model):
+    """A Transaction of a closed-out position, moved out of the live table with its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    asset_symbol = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    transaction_type = models.CharField(max_length=4, choices=[('buy', 'Buy'), ('sell', 'Sell')])
+    price = models.DecimalField(max_digits=15, decimal_places=2)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    asset_type = models.CharField(max_length=10, choices=ASSET_TYPES, default='stock')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_profile} - archived {self.transaction_type} {self.quantity} of {self.asset_symbol} at {self.price}"
+
+class PositionSummary(models.Model):
+    """Realized totals of a user's archived positions in one symbol, each bought and sold down to zero."""
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    asset_symbol = models.CharField(max_length=100)
+    closed_positions = models.IntegerField(default=0)
+    trade_count = models.IntegerField(default=0)
+    closed_quantity = models.IntegerField(default=0)  # Units bought, and so also sold
+    bought_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    sold_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    realized_profit_loss = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    first_trade_at = models.DateTimeField()
+    last_trade_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user_profile', 'asset_symbol'], name='unique_position_summary')]
+
+    def __str__(self):
+        return f"{self.user_profile} - {self.asset_symbol} realized {self.realized_profit_loss}"
+
+class SentimentAggregate(models.Model):
+    asset_symbol = models.CharField(max_length=100, unique=True)
+    score = models.FloatField(default=0.5)  # 0 = very negative, 1 = very positive
+    weighted_sum = models.FloatField(default=0.0)  # Time-decayed sum of article scores
+    weight = models.FloatField(default=0.0)  # Time-decayed sum of article weights
+    article_count = models.IntegerField(default=0)
+    seen_articles = models.JSONField(default=list)  # Recent article ids, to skip re-scoring
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.asset_symbol} sentiment {self.score:.2f}"
@@ -0,0 +1,88 @@
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from server.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(symbol):
+    return f"price:last:{symbol}"
+
+
+def get_last_price(symbol):
+    """
+    Latest traded price for a symbol, cached for PRICE_CACHE_SECONDS.
+
+    :return: Decimal price, or None if yfinance has no price for the symbol.
+    """
+    price = cache.get(_cache_key(symbol))
+    if price is not None:
+        return price
+    return fetch_last_price(symbol)
+
+
+def fetch_last_price(symbol):
+    """Ask yfinance for the latest price, bypassing and then refreshing the cache."""
+    import yfinance as yf
+
+    try:
+        with timed('yfinance'):
+            last = yf.Ticker(symbol).fast_info['last_price']
+    except Exception as e:
+        logger.warning("Error fetching price for %s: %s", symbol, e)
+        return None
+    if not last or last != last:  # Missing or NaN
+        return None
+    price = _to_price(last)
+    cache.set(_cache_key(symbol), price, settings.PRICE_CACHE_SECONDS)
+    return price
+
+
+def get_cached_prices(symbols):
+    """Cached last prices for the symbols that have one, without calling yfinance."""
+    keys = {_cache_key(symbol): symbol for symbol in symbols}
+    return {keys[key]: price for key, price in cache.get_many(keys).items()}
+
+
+HISTORY_PERIODS = {'1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max'}
+HISTORY_INTERVALS = {'1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo'}
+
+
+def get_price_history(symbol, period='5d', interval='60m'):
+    """
+    OHLCV bars from yfinance, cached for PRICE_CACHE_SECONDS.
+
+    :return: List of {'ts', 'open', 'high', 'low', 'close', 'volume'} in time
+        order with Decimal prices; empty if yfinance has no history.
+    """
+    key = f"price:history:{symbol}:{period}:{interval}"
+    bars = cache.get(key)
+    if bars is not None:
+        return bars
+
+    import yfinance as yf
+
+    try:
+        with timed('yfinance'):
+            history = yf.Ticker(symbol).history(period=period, interval=interval)
+    except Exception as e:
+        logger.warning("Error fetching price history for %s: %s", symbol, e)
+        return []
+    bars = [{
+        'ts': ts.to_pydatetime(),
+        'open': _to_price(row.Open),
+        'high': _to_price(row.High),
+        'low': _to_price(row.Low),
+        'close': _to_price(row.Close),
+        'volume': int(row.Volume),
+    } for ts, row in zip(history.index, history.itertuples()) if row.Close == row.Close]  # Skip NaN rows
+    cache.set(key, bars, settings.PRICE_CACHE_SECONDS)
+    return bars
+
+
+def _to_price(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
@@ -0,0 +1,200 @@
+"""
+Monte Carlo projections of SIP, lump-sum and step-up SIP investments.
+
+A return model is a table of equally likely monthly growth factors. By
+default it holds the months of a benchmark's history in the price cache, so
+paths resample real months with replacement, optionally shifted to an
+expected annual return. Without enough history, or with an explicit
+volatility, it holds 65536 quantiles of a lognormal month, which raw 16-bit
+random draws index directly; that is several times faster than drawing
+normals and exponentiating them. Returns are quoted as compound annual rates:
+the median path grows at the expected return, like the client's fixed-rate
+SIP calculator, whose start-of-month contributions are used here too.
+
+All paths advance together, one NumPy vector per month, with a year of
+draws made at a time and only the year-end values kept, so memory is
+(years x paths) rather than (months x paths). From PROJECTION_POOL_MIN_PATHS
+paths on, they are split across a pool of PROJECTION_WORKERS processes, each
+with its own spawned seed.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from statistics import NormalDist
+
+from django.conf import settings
+
+from .prices import get_price_history
+
+MODES = ('sip', 'lumpsum', 'stepup')
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Fewest months of benchmark history to resample from
+MIN_HISTORY_MONTHS = 24
+
+# Entries of a lognormal growth table, indexed by one 16-bit random draw
+QUANTILES = 1 << 16
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PROJECTION_WORKERS)
+    return _pool
+
+
+@lru_cache(maxsize=1)
+def _normal_quantiles():
+    import numpy as np
+
+    inverse = NormalDist().inv_cdf
+    return np.array([inverse((k + 0.5) / QUANTILES) for k in range(QUANTILES)])
+
+
+class ReturnModel:
+    """Equally likely monthly growth factors, with monthly log mean `mu` and volatility `sigma`."""
+
+    def __init__(self, source, growth, symbol=None):
+        import numpy as np
+
+        self.source = source
+        self.growth = np.asarray(growth, dtype=np.float64)
+        self.symbol = symbol
+        log_returns = np.log(self.growth)
+        self.mu = float(log_returns.mean())
+        self.sigma = float(log_returns.std())
+
+    @classmethod
+    def lognormal(cls, annual_return, annual_volatility):
+        import numpy as np
+
+        sigma = annual_volatility / math.sqrt(12)
+        return cls('assumed', np.exp(math.log1p(annual_return) / 12 + sigma * _normal_quantiles()))
+
+    def describe(self):
+        return {
+            'source': self.source,
+            'symbol': self.symbol,
+            'months': len(self.growth) if self.source == 'history' else None,
+            'compound_annual_return': round(math.exp(12 * self.mu) - 1, 6),
+            'annual_volatility': round(self.sigma * math.sqrt(12), 6),
+        }
+
+
+def return_model(symbol=None, expected_return=None, volatility=None):
+    """
+    The return model of a benchmark's monthly history.
+
+    :param expected_return: Compound annual return (decimal fraction) to shift
+        the history to; its own mean is used otherwise.
+    :param volatility: Annual volatility; giving one uses a lognormal model
+        instead of the history.
+    """
+    import numpy as np
+
+    symbol = symbol or settings.PROJECTION_BENCHMARK
+    if volatility is None:
+        bars = get_price_history(symbol, '10y', '1mo')
+        closes = np.array([float(bar['close']) for bar in bars if bar['close'] > 0])
+        if len(closes) > MIN_HISTORY_MONTHS:
+            history = np.diff(np.log(closes))
+            if expected_return is not None:
+                history += math.log1p(expected_return) / 12 - history.mean()
+            return ReturnModel('history', np.exp(history), symbol)
+
+    return ReturnModel.lognormal(
+        settings.PROJECTION_ASSUMED_RETURN / 100 if expected_return is None else expected_return,
+        settings.PROJECTION_ASSUMED_VOLATILITY / 100 if volatility is None else volatility,
+    )
+
+
+def monthly_contributions(mode, amount, years, step_up=0):
+    """(initial investment, contribution at the start of each month) for a mode."""
+    import numpy as np
+
+    months = years * 12
+    if mode == 'lumpsum':
+        return amount, np.zeros(months)
+    if mode == 'stepup':
+        return 0.0, amount + step_up * (np.arange(months) // 12)
+    return 0.0, np.full(months, float(amount))
+
+
+def simulate(paths, initial, contributions, growth, seed):
+    """
+    Year-end values of `paths` simulated portfolios.
+
+    Module-level so process pool workers can run it.
+
+    :param growth: Equally likely monthly growth factors.
+    :return: (years, paths) float32 array.
+    """
+    import numpy as np
+
+    rng = np.random.Generator(np.random.SFC64(seed))
+    years = len(contributions) // 12
+    values = np.full(paths, float(initial))
+    year_ends = np.empty((years, paths), dtype=np.float32)
+    for year in range(years):
+        if len(growth) == QUANTILES:
+            # Every 16-bit value is an index, so raw generator output needs no range reduction
+            raw = rng.bit_generator.random_raw((12 * paths + 3) // 4)
+            draws = raw.view(np.uint16)[:12 * paths].reshape(12, paths)
+        else:
+            draws = rng.integers(0, len(growth), size=(12, paths), dtype=np.uint16 if len(growth) < QUANTILES else np.intp)
+        for month in range(12):
+            contribution = contributions[year * 12 + month]
+            if contribution:
+                values += contribution
+            values *= growth.take(draws[month])
+        year_ends[year] = values
+    return year_ends
+
+
+def project(mode, amount, years, step_up=0, paths=10000, model=None, percentiles=DEFAULT_PERCENTILES,
+            goal=None, seed=None):
+    """
+    Percentile bands of a projected investment.
+
+    :param mode: One of MODES; `amount` is the monthly SIP amount, or the lump sum.
+    :param step_up: Yearly increase of the monthly amount in 'stepup' mode.
+    :param model: ReturnModel; the benchmark's history by default.
+    :param goal: Target value whose probability of being reached is reported.
+    :return: Dict with per-year `invested` and `bands` ({'p<q>': [values]}),
+        the final-year percentiles, mean and goal probability.
+    """
+    import numpy as np
+
+    model = model or return_model()
+    initial, contributions = monthly_contributions(mode, amount, years, step_up)
+    seeds = np.random.SeedSequence(seed)
+    args = (initial, contributions, model.growth)
+    if settings.PROJECTION_WORKERS and paths >= settings.PROJECTION_POOL_MIN_PATHS:
+        chunks = np.array_split(np.arange(paths), settings.PROJECTION_WORKERS)
+        futures = [_get_pool().submit(simulate, len(chunk), *args, child)
+                   for chunk, child in zip(chunks, seeds.spawn(len(chunks)))]
+        year_ends = np.concatenate([future.result() for future in futures], axis=1)
+    else:
+        year_ends = simulate(paths, *args, seeds)
+
+    bands = np.percentile(year_ends, percentiles, axis=1)
+    invested = initial + np.cumsum(contributions)[11::12]
+    result = {
+        'mode': mode,
+        'years': years,
+        'paths': paths,
+        'returns': model.describe(),
+        'invested': [round(float(value), 2) for value in invested],
+        'bands': {f"p{q:g}": [round(float(value), 2) for value in band] for q, band in zip(percentiles, bands)},
+        'mean': [round(float(value), 2) for value in year_ends.mean(axis=1, dtype=np.float64)],
+        'final': {f"p{q:g}": round(float(band[-1]), 2) for q, band in zip(percentiles, bands)},
+    }
+    if goal is not None:
+        result['goal'] = {
+            'amount': goal,
+            'probability': [round(float(value), 4) for value in (year_ends >= goal).mean(axis=1)],
+        }
+    return result
@@ -0,0 +1,66 @@
+"""
+Response renderers for large list endpoints.
+
+FastJSONRenderer is the default JSON renderer; it uses orjson when installed
+and otherwise falls back to DRF's encoder. History and price endpoints also
+offer MessagePack (`Accept: application/msgpack` or `?format=msgpack`) and a
+columnar JSON layout with one array per field (`?format=columns`), which
+charting code can use directly and which avoids repeating every key per row.
+"""
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+_encode_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
+
+
+def to_columns(rows):
+    """[{'a': 1, 'b': 2}, {'a': 3, 'b': 4}] -> {'count': 2, 'columns': {'a': [1, 3], 'b': [2, 4]}}"""
+    fields = list(rows[0]) if rows else []
+    return {'count': len(rows), 'columns': {field: [row.get(field) for row in rows] for field in fields}}
+
+
+def _is_rows(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """JSON with lists of objects, at the top level or one level down, turned into columns."""
+    media_type = 'application/vnd.columns+json'
+    format = 'columns'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if _is_rows(data):
+            data = to_columns(data)
+        elif isinstance(data, dict):
+            data = {key: to_columns(value) if _is_rows(value) else value for key, value in data.items()}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+# For list views: fast JSON by default, plus the compact formats on request
+LIST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer, ColumnarJSONRenderer, MessagePackRenderer]
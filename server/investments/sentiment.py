@@ -0,0 +1,158 @@
+"""
+Local, CPU-only news sentiment.
+
+Headlines are scored in batches against a small financial lexicon with NumPy,
+per-article scores are cached, and each symbol keeps a time-decayed aggregate
+in SentimentAggregate. Requests only read the stored aggregate; all scoring
+happens in `refresh_symbol_sentiment`, run by `manage.py refresh_sentiment`.
+"""
+import hashlib
+import math
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import SentimentAggregate
+
+ARTICLE_CACHE_SECONDS = 7 * 24 * 3600
+SEEN_ARTICLES_KEPT = 200
+
+# Word weights in the spirit of the Loughran-McDonald financial sentiment lists
+LEXICON = {
+    # Positive
+    'beat': 1.0, 'beats': 1.0, 'surge': 1.2, 'surges': 1.2, 'soar': 1.3, 'soars': 1.3, 'rally': 1.0,
+    'rallies': 1.0, 'gain': 0.8, 'gains': 0.8, 'jump': 0.9, 'jumps': 0.9, 'rise': 0.6, 'rises': 0.6,
+    'record': 0.6, 'growth': 0.8, 'grow': 0.6, 'grows': 0.6, 'profit': 0.8, 'profits': 0.8,
+    'profitable': 0.9, 'upgrade': 1.2, 'upgrades': 1.2, 'upgraded': 1.2, 'outperform': 1.0,
+    'outperforms': 1.0, 'bullish': 1.2, 'strong': 0.7, 'stronger': 0.7, 'boost': 0.8, 'boosts': 0.8,
+    'buy': 0.5, 'optimistic': 0.9, 'optimism': 0.9, 'win': 0.7, 'wins': 0.7, 'approval': 0.8,
+    'approved': 0.8, 'expands': 0.6, 'expansion': 0.6, 'dividend': 0.4, 'innovative': 0.6,
+    'breakthrough': 1.0, 'tops': 0.8, 'exceeds': 0.9, 'raises': 0.5, 'recovery': 0.7, 'rebound': 0.8,
+    # Negative
+    'miss': -1.0, 'misses': -1.0, 'plunge': -1.3, 'plunges': -1.3, 'crash': -1.5, 'crashes': -1.5,
+    'fall': -0.7, 'falls': -0.7, 'drop': -0.8, 'drops': -0.8, 'decline': -0.8, 'declines': -0.8,
+    'slump': -1.1, 'slumps': -1.1, 'loss': -0.9, 'losses': -0.9, 'downgrade': -1.2,
+    'downgrades': -1.2, 'downgraded': -1.2, 'underperform': -1.0, 'bearish': -1.2, 'weak': -0.7,
+    'weaker': -0.7, 'cut': -0.6, 'cuts': -0.6, 'layoffs': -1.0, 'lawsuit': -1.0, 'probe': -0.9,
+    'investigation': -1.0, 'fraud': -1.5, 'recall': -0.9, 'warning': -0.8, 'warns': -0.8,
+    'sell': -0.5, 'selloff': -1.1, 'fears': -0.9, 'fear': -0.9, 'risk': -0.4, 'risks': -0.4,
+    'bankruptcy': -1.6, 'default': -1.2, 'tumble': -1.2, 'tumbles': -1.2, 'sinks': -1.1,
+    'lawsuits': -1.0, 'fine': -0.6, 'fined': -0.9, 'delay': -0.6, 'delays': -0.6, 'volatile': -0.4,
+}
+NEGATIONS = {'not', 'no', "n't", 'never', 'without', 'fails', 'fail'}
+
+VOCABULARY = {word: index for index, word in enumerate(LEXICON)}
+TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|n't")
+
+
+def _weights():
+    import numpy as np
+    return np.fromiter(LEXICON.values(), dtype=np.float64, count=len(LEXICON))
+
+
+def score_headlines(headlines):
+    """
+    Score a batch of headlines in one pass.
+
+    Each headline becomes a row of lexicon hit counts (a word preceded by a
+    negation counts negatively); the batch is scored with a single matrix-vector
+    product and squashed into [0, 1], where 0.5 is neutral.
+    """
+    import numpy as np
+
+    rows, cols, signs = [], [], []
+    for row, headline in enumerate(headlines):
+        negate = False
+        for token in TOKEN.findall(headline.lower()):
+            index = VOCABULARY.get(token)
+            if index is not None:
+                rows.append(row)
+                cols.append(index)
+                signs.append(-1.0 if negate else 1.0)
+            negate = token in NEGATIONS or token.endswith("n't")
+
+    counts = np.zeros((len(headlines), len(VOCABULARY)))
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), np.array(signs))
+    hits = np.abs(counts).sum(axis=1)
+    raw = counts @ _weights() / np.sqrt(np.maximum(hits, 1.0))
+    return (np.tanh(raw) + 1.0) / 2.0
+
+
+def parse_article(item):
+    """Extract (id, headline, published datetime) from a yfinance news item."""
+    # yfinance >= 0.2.51 nests the article under 'content'
+    content = item.get('content') or item
+    title = content.get('title') or ''
+    article_id = item.get('id') or item.get('uuid') or hashlib.sha1(title.encode()).hexdigest()
+    if content.get('pubDate'):
+        published = datetime.fromisoformat(content['pubDate'].replace('Z', '+00:00'))
+    elif item.get('providerPublishTime'):
+        published = datetime.fromtimestamp(item['providerPublishTime'], tz=dt_timezone.utc)
+    else:
+        published = timezone.now()
+    return article_id, title, published
+
+
+def score_articles(articles):
+    """Per-article scores keyed by article id, reusing cached scores."""
+    keys = {article_id: f"sentiment:article:{article_id}" for article_id, _, _ in articles}
+    cached = cache.get_many(keys.values())
+    scores = {article_id: cached[key] for article_id, key in keys.items() if key in cached}
+
+    missing = [(article_id, title) for article_id, title, _ in articles if article_id not in scores]
+    if missing:
+        fresh = score_headlines([title for _, title in missing])
+        new_scores = {article_id: float(score) for (article_id, _), score in zip(missing, fresh)}
+        cache.set_many({keys[article_id]: score for article_id, score in new_scores.items()}, ARTICLE_CACHE_SECONDS)
+        scores.update(new_scores)
+    return scores
+
+
+def refresh_symbol_sentiment(symbol, news_items, now=None):
+    """Fold newly seen articles into a symbol's time-decayed aggregate."""
+    now = now or timezone.now()
+    decay = math.log(2) / (settings.SENTIMENT_HALF_LIFE_HOURS * 3600)
+
+    aggregate = SentimentAggregate.objects.filter(asset_symbol=symbol).first()
+    if aggregate is None:
+        aggregate = SentimentAggregate(asset_symbol=symbol, updated_at=now)
+    else:
+        # Age the existing aggregate to the present before adding new articles
+        factor = math.exp(-decay * max((now - aggregate.updated_at).total_seconds(), 0))
+        aggregate.weighted_sum *= factor
+        aggregate.weight *= factor
+
+    seen = set(aggregate.seen_articles)
+    articles = [article for article in map(parse_article, news_items) if article[1] and article[0] not in seen]
+    scores = score_articles(articles)
+    for article_id, _, published in articles:
+        weight = math.exp(-decay * max((now - published).total_seconds(), 0))
+        aggregate.weighted_sum += weight * scores[article_id]
+        aggregate.weight += weight
+
+    aggregate.article_count += len(articles)
+    aggregate.seen_articles = (aggregate.seen_articles + [article[0] for article in articles])[-SEEN_ARTICLES_KEPT:]
+    if aggregate.weight > 1e-9:
+        aggregate.score = aggregate.weighted_sum / aggregate.weight
+    aggregate.updated_at = now
+    aggregate.save()
+    return aggregate
+
+
+def sentiment_label(score):
+    if score >= 0.6:
+        return 'positive'
+    if score <= 0.4:
+        return 'negative'
+    return 'neutral'
+
+
+def get_sentiment(symbol):
+    """Stored sentiment for a symbol as {'score', 'sentiment'}, or None if never refreshed."""
+    aggregate = SentimentAggregate.objects.filter(asset_symbol=symbol).only('score').first()
+    if aggregate is None:
+        return None
+    return {'score': round(aggregate.score, 3), 'sentiment': sentiment_label(aggregate.score)}
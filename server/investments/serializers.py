@@ -1,17 +1,89 @@
+from django.db.models import QuerySet
 from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
 
 from account.serializers import UserProfileSerializer
 from .models import  Portfolio, Transaction
 from .models import UserProfile
 
+class FlatListSerializer(serializers.ListSerializer):
+    """
+    List serializer for long histories of flat rows.
+
+    Given a queryset, it reads the columns with values_list and formats them
+    directly instead of building a model instance and running every field per
+    row; the output is the same as the regular path, which is used whenever a
+    field is not one of the simple kinds handled here.
+    """
+
+    def _converters(self):
+        def datetime_iso(value, tz):
+            value = value.astimezone(tz).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+        columns, converters = [], []
+        for name, field in self.child.fields.items():
+            if isinstance(field, serializers.SerializerMethodField) and name in self.child.context:
+                columns.append(None)  # Value supplied by the context, the same for every row
+                converters.append(lambda _, value=self.child.context[name]: value)
+                continue
+            if field.source == '*' or '.' in field.source:
+                return None, None
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                columns.append(f"{field.source}_id")
+                converters.append(None)
+            elif (isinstance(field, serializers.DecimalField) and not field.localize and not field.normalize_output
+                  and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)):
+                columns.append(field.source)
+                converters.append(str)  # Decimal columns come back quantized to decimal_places
+            elif (isinstance(field, serializers.DateTimeField) and field.default_timezone() is not None
+                  and not hasattr(field, 'timezone') and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601):
+                columns.append(field.source)
+                converters.append(lambda value, tz=field.default_timezone(): datetime_iso(value, tz))
+            elif type(field) in (serializers.IntegerField, serializers.CharField, serializers.ChoiceField):
+                columns.append(field.source)
+                converters.append(None)
+            else:
+                return None, None
+        return columns, converters
+
+    def to_representation(self, data):
+        if not isinstance(data, QuerySet):
+            return super().to_representation(data)
+        columns, converters = self._converters()
+        if columns is None:
+            return super().to_representation(data)
+
+        names = list(self.child.fields)
+        fetched = [column for column in columns if column is not None]
+        rows = []
+        for values in data.values_list(*fetched):
+            values = iter(values)
+            row = {}
+            for name, column, convert in zip(names, columns, converters):
+                value = next(values) if column is not None else None
+                if convert is not None and (value is not None or column is None):
+                    value = convert(value)
+                row[name] = value
+            rows.append(row)
+        return rows
+
+
 class PortfolioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Portfolio
         fields = ['asset_symbol', 'quantity']
 
 class TransactionSerializer(serializers.ModelSerializer):
-    user_profile = UserProfileSerializer(read_only=True)
+    user_profile = serializers.SerializerMethodField()
+
+    def get_user_profile(self, obj):
+        # History lists pass their owner's profile in the context, serialized once for all rows
+        if 'user_profile' in self.context:
+            return self.context['user_profile']
+        return UserProfileSerializer(obj.user_profile).data
 
     class Meta:
         model = Transaction
         fields = ['id', 'user_profile', 'asset_symbol', 'quantity', 'transaction_type', 'price', 'amount', 'created_at']
+        list_serializer_class = FlatListSerializer
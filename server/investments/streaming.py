@@ -0,0 +1,76 @@
+"""
+Upstream price polling for the live price WebSocket.
+
+Each process keeps one polling task per subscribed symbol, shared by all of
+its connections, and publishes ticks to the symbol's channel-layer group. A
+short lease in the cache lets only one process poll a symbol when the cache
+is shared (e.g. Redis); with the local-memory cache each process polls.
+"""
+import asyncio
+import re
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from .prices import fetch_last_price
+
+PROCESS_ID = uuid.uuid4().hex
+
+
+def price_group(symbol, feed='prices'):
+    # Group names only allow ASCII alphanumerics, hyphens, underscores and periods
+    return f"{feed}.{re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)}"
+
+
+class PriceHub:
+    def __init__(self):
+        self._pollers = {}  # symbol -> (task, subscriber count)
+
+    def acquire(self, symbol):
+        task, count = self._pollers.get(symbol, (None, 0))
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._poll(symbol))
+        self._pollers[symbol] = (task, count + 1)
+
+    def release(self, symbol):
+        task, count = self._pollers.get(symbol, (None, 0))
+        if count <= 1:
+            self._pollers.pop(symbol, None)
+            if task is not None:
+                task.cancel()
+        else:
+            self._pollers[symbol] = (task, count - 1)
+
+    async def _poll(self, symbol):
+        interval = settings.PRICE_STREAM_INTERVAL
+        lease_key = f"price:poller:{symbol}"
+        layer = get_channel_layer()
+        fetch = sync_to_async(fetch_last_price, thread_sensitive=False)
+        last_price = None
+        while True:
+            owner = await sync_to_async(cache.get_or_set, thread_sensitive=False)(lease_key, PROCESS_ID, interval * 3)
+            if owner == PROCESS_ID:
+                await sync_to_async(cache.touch, thread_sensitive=False)(lease_key, interval * 3)
+                price = await fetch(symbol)
+                if price is not None and price != last_price:
+                    last_price = price
+                    await publish_tick(symbol, price, layer=layer)
+            await asyncio.sleep(interval)
+
+
+async def publish_tick(symbol, price, ts=None, layer=None, feed='prices'):
+    """Send one price tick to every connection subscribed to the symbol on a feed."""
+    layer = layer or get_channel_layer()
+    await layer.group_send(price_group(symbol, feed), {
+        'type': 'price.tick',
+        'symbol': symbol,
+        'price': str(price),
+        'ts': ts if ts is not None else time.time(),
+    })
+
+
+hub = PriceHub()
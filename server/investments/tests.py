@@ -1,3 +1,248 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from account.models import UserProfile
+from . import archive
+from .bonds import analyze, price_instruments
+from .projections import ReturnModel, project
+from .aggregates import MARKETS, recompute_batch
+from .consumers import PriceStreamConsumer
+from .models import ArchivedTransaction, PositionSummary, Transaction
+from .prices import _cache_key
+from .streaming import hub, publish_tick
+from .trading import execute_trade
+
+
+class RecomputeAggregatesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='trader', password='secret')
+        self.profile = UserProfile.objects.get(user=user)
+        self.profile.balance = Decimal('100000.00')
+        self.profile.save()
+
+    def trade(self, transaction_type, quantity, price, symbol='IBM', asset_type='stock'):
+        self.profile.refresh_from_db()
+        execute_trade(self.profile, symbol, asset_type, quantity, Decimal(price), transaction_type)
+
+    def recompute(self):
+        changes = recompute_batch([self.profile.id], [MARKETS['real']])
+        self.profile.refresh_from_db()
+        return changes
+
+    def test_closed_cycle_lots_are_not_costed(self):
+        self.trade('buy', 10, '100')
+        self.trade('sell', 10, '150')
+        self.trade('buy', 10, '200')
+        self.assertEqual(self.recompute(), [])
+        self.assertEqual(self.profile.stocks, Decimal('2000.00'))
+        self.assertEqual(self.profile.boughtsum, Decimal('2000.00'))
+
+    def test_partial_sell_costs_remaining_lots_first_in_first_out(self):
+        self.trade('buy', 10, '100')
+        self.trade('buy', 10, '200', asset_type='bond')
+        self.trade('sell', 15, '300')
+        self.recompute()
+        self.assertEqual(self.profile.stocks, Decimal('0.00'))
+        self.assertEqual(self.profile.bonds, Decimal('1000.00'))
+        self.assertEqual(self.profile.boughtsum, Decimal('1000.00'))
+
+
+class BondAnalyticsTests(TestCase):
+    def test_bond_priced_at_its_coupon_yield_is_at_par(self):
+        faces = [1000, 1000, 500]
+        result = analyze(faces, [0.05, 0.08, 0.03], [1, 2, 12], [10, 7, 3], yields=[0.05, 0.08, 0.03])
+        for face, price in zip(faces, result['clean_price']):
+            self.assertAlmostEqual(price, face, places=8)
+        self.assertEqual(list(result['accrued_interest']), [0.0, 0.0, 0.0])
+
+    def test_zero_coupon_bond_matches_closed_form(self):
+        result = analyze([1000], [0.0], [2], [5], yields=[0.06])
+        self.assertAlmostEqual(result['clean_price'][0], 1000 / 1.03 ** 10, places=8)
+        self.assertAlmostEqual(result['macaulay_duration'][0], 5.0, places=10)
+        self.assertAlmostEqual(result['modified_duration'][0], 5.0 / 1.03, places=10)
+        self.assertAlmostEqual(result['convexity'][0], 10 * 11 / (1.03 ** 2 * 4), places=8)
+
+    def test_yield_solved_from_price_reprices_it(self):
+        priced = analyze([1000, 1000], [0.04, 0.07], [2, 4], [9.3, 2.6], yields=[0.065, 0.03])
+        solved = analyze([1000, 1000], [0.04, 0.07], [2, 4], [9.3, 2.6], clean_prices=priced['clean_price'])
+        for expected, ytm in zip((0.065, 0.03), solved['ytm']):
+            self.assertAlmostEqual(ytm, expected, places=9)
+
+    def test_mid_period_accrued_interest(self):
+        result = analyze([1000], [0.06], [2], [4.75], yields=[0.05])
+        self.assertAlmostEqual(result['accrued_interest'][0], 30 * 0.5, places=10)
+        self.assertAlmostEqual(result['dirty_price'][0] - result['clean_price'][0], 15.0, places=10)
+
+    def test_invalid_instruments_are_rejected(self):
+        for instrument, message in (
+            ({'coupon_rate': 0.05, 'years': 101, 'yield': 0.05}, 'years must be at most'),
+            ({'coupon_rate': 0.05, 'years': 0.25, 'yield': 0.05}, 'at least one coupon period'),
+            ({'coupon_rate': 0.05, 'years': 5, 'coupon_frequency': 365, 'yield': 0.05}, 'coupon_frequency'),
+            ({'coupon_rate': 0.05, 'years': 5, 'price': 0}, 'price must be'),
+            ({'years': 5, 'yield': 0.05}, 'missing'),
+        ):
+            with self.assertRaisesMessage(ValueError, message):
+                price_instruments([{'yield': 0.04, 'coupon_rate': 0.04, 'years': 2}, instrument])
+
+
+class ProjectionTests(TestCase):
+    def test_zero_volatility_sip_matches_annuity_due(self):
+        monthly = 1.12 ** (1 / 12) - 1
+        expected = 1000 * ((1 + monthly) ** 120 - 1) / monthly * (1 + monthly)
+        self.assertAlmostEqual(expected, 224035.89, places=2)
+
+        result = project('sip', 1000, 10, paths=100, model=ReturnModel.lognormal(0.12, 0.0), seed=1)
+        for band in result['final'].values():
+            self.assertAlmostEqual(band, expected, delta=0.05)  # Year-end values are float32
+        self.assertEqual(result['invested'][-1], 120000.0)
+
+    def test_zero_volatility_lumpsum_compounds_yearly(self):
+        result = project('lumpsum', 10000, 5, paths=10, model=ReturnModel.lognormal(0.08, 0.0), seed=1)
+        for year, value in enumerate(result['mean'], start=1):
+            self.assertAlmostEqual(value, 10000 * 1.08 ** year, delta=0.01)
+
+    def test_step_up_invests_more_each_year(self):
+        result = project('stepup', 1000, 3, step_up=500, paths=10, model=ReturnModel.lognormal(0.0, 0.0), seed=1)
+        self.assertEqual(result['invested'], [12000.0, 30000.0, 54000.0])
+        self.assertEqual(result['final']['p50'], 54000.0)
+
+    def test_bands_are_ordered_and_reproducible(self):
+        model = ReturnModel.lognormal(0.12, 0.18)
+        result = project('sip', 1000, 10, paths=2000, model=model, goal=250000, seed=7)
+        final = [result['final'][f"p{q}"] for q in (5, 25, 50, 75, 95)]
+        self.assertEqual(final, sorted(final))
+        self.assertEqual(project('sip', 1000, 10, paths=2000, model=model, goal=250000, seed=7), result)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='archiver', password='secret')
+        self.profile = UserProfile.objects.get(user=user)
+        self.profile.balance = Decimal('100000.00')
+        self.profile.save()
+
+    def trade(self, symbol, transaction_type, quantity, price, days_ago):
+        self.profile.refresh_from_db()
+        transaction, _ = execute_trade(self.profile, symbol, 'stock', quantity, Decimal(price), transaction_type)
+        Transaction.objects.filter(id=transaction.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return transaction.id
+
+    def archive(self, **kwargs):
+        return archive.Archiver(archive.MARKETS['real'], days=30, **kwargs).run()
+
+    def test_only_old_closed_cycles_are_archived(self):
+        closed = [self.trade('IBM', 'buy', 10, '100', 90), self.trade('IBM', 'buy', 5, '110', 80),
+                  self.trade('IBM', 'sell', 15, '120', 70), self.trade('AAPL', 'buy', 2, '50', 60),
+                  self.trade('AAPL', 'sell', 2, '40', 50)]
+        still_open = [self.trade('IBM', 'buy', 4, '130', 40)]
+        recent = [self.trade('MSFT', 'buy', 1, '300', 40), self.trade('MSFT', 'sell', 1, '310', 1)]
+
+        self.assertEqual(self.archive(), (2, 5))
+        self.assertCountEqual(ArchivedTransaction.objects.values_list('id', flat=True), closed)
+        self.assertCountEqual(Transaction.objects.values_list('id', flat=True), still_open + recent)
+
+        ibm = PositionSummary.objects.get(user_profile=self.profile, asset_symbol='IBM')
+        self.assertEqual((ibm.closed_positions, ibm.trade_count, ibm.closed_quantity), (1, 3, 15))
+        self.assertEqual((ibm.bought_amount, ibm.sold_amount, ibm.realized_profit_loss),
+                         (Decimal('1550.00'), Decimal('1800.00'), Decimal('250.00')))
+        aapl = PositionSummary.objects.get(user_profile=self.profile, asset_symbol='AAPL')
+        self.assertEqual(aapl.realized_profit_loss, Decimal('-20.00'))
+
+        self.assertEqual(self.archive(), (0, 0))
+
+    def test_dry_run_moves_nothing(self):
+        ids = [self.trade('IBM', 'buy', 10, '100', 90), self.trade('IBM', 'sell', 10, '100', 80)]
+        self.assertEqual(self.archive(dry_run=True), (1, 2))
+        self.assertCountEqual(Transaction.objects.values_list('id', flat=True), ids)
+        self.assertFalse(ArchivedTransaction.objects.exists())
+
+    def test_deletes_span_chunks(self):
+        ids = []
+        for days_ago in range(90, 80, -1):
+            ids += [self.trade('IBM', 'buy', 1, '100', days_ago), self.trade('IBM', 'sell', 1, '100', days_ago)]
+        with mock.patch.object(archive, 'DELETE_CHUNK', 3):
+            self.assertEqual(self.archive(), (10, 20))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(ArchivedTransaction.objects.count(), 20)
+        self.assertEqual(PositionSummary.objects.get(asset_symbol='IBM').trade_count, 20)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    PRICE_STREAM_INTERVAL=60,
+    PRICE_STREAM_MAX_RATE=10,
+)
+@mock.patch('investments.streaming.fetch_last_price', return_value=None)
+class PriceStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(PriceStreamConsumer.as_asgi(), '/ws/prices/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def subscribe(self, communicator, action, symbols):
+        await communicator.send_json_to({'action': action, 'symbols': symbols})
+        return await communicator.receive_json_from()
+
+    async def test_subscribe_sends_cached_price_and_unsubscribe_stops_ticks(self, fetch):
+        cache.set(_cache_key('IBM'), Decimal('150.25'))
+        client = await self.connect()
+        self.assertEqual(await self.subscribe(client, 'subscribe', ['ibm', 'aapl']),
+                         {'type': 'subscribed', 'symbols': ['AAPL', 'IBM']})
+        snapshot = await client.receive_json_from()
+        self.assertEqual([(tick['symbol'], tick['price']) for tick in snapshot['ticks']], [('IBM', '150.25')])
+
+        self.assertEqual(await self.subscribe(client, 'unsubscribe', ['IBM']),
+                         {'type': 'subscribed', 'symbols': ['AAPL']})
+        await publish_tick('IBM', Decimal('151'))
+        self.assertTrue(await client.receive_nothing(timeout=0.3))
+        await client.disconnect()
+
+    async def test_tick_fans_out_to_every_subscriber(self, fetch):
+        clients = [await self.connect() for _ in range(2)]
+        for client in clients:
+            await self.subscribe(client, 'subscribe', ['IBM'])
+        await publish_tick('IBM', Decimal('150'), ts=1.0)
+        for client in clients:
+            self.assertEqual(await client.receive_json_from(),
+                             {'type': 'ticks', 'ticks': [{'symbol': 'IBM', 'price': '150', 'ts': 1.0}]})
+            await client.disconnect()
+
+    async def test_burst_is_coalesced_to_latest_price_per_symbol(self, fetch):
+        client = await self.connect()
+        await self.subscribe(client, 'subscribe', ['IBM', 'AAPL'])
+        await publish_tick('IBM', Decimal('150'), ts=1.0)
+        await client.receive_json_from()  # Opens the rate limit window
+        for price in ('151', '152', '153'):
+            await publish_tick('IBM', Decimal(price), ts=2.0)
+        await publish_tick('AAPL', Decimal('200'), ts=2.0)
+        message = await client.receive_json_from()
+        self.assertEqual(sorted((tick['symbol'], tick['price']) for tick in message['ticks']),
+                         [('AAPL', '200'), ('IBM', '153')])
+        self.assertTrue(await client.receive_nothing(timeout=0.3))
+        await client.disconnect()
+
+    async def test_disconnect_releases_shared_poller(self, fetch):
+        clients = [await self.connect() for _ in range(2)]
+        for client in clients:
+            await self.subscribe(client, 'subscribe', ['IBM'])
+        task, count = hub._pollers['IBM']
+        self.assertEqual(count, 2)
+
+        await clients[0].disconnect()
+        self.assertEqual(hub._pollers['IBM'], (task, 1))
+        await clients[1].disconnect()
+        self.assertNotIn('IBM', hub._pollers)
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
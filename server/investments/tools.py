@@ -58,16 +58,15 @@ class InvestmentPortalTools:
             return f"Error fetching portfolio: {str(e)}"
 
     def get_sentiment(self, asset_name: str) -> dict:
-        """Fetch sentiment for an asset."""
-        try:
-            response = requests.get(
-                f"{self.BASE_URL}/investment/sentiment/",
-                params={"asset": asset_name}
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException:
+        """Fetch sentiment for an asset from the precomputed aggregates."""
+        from .intents import resolve_symbol
+        from .sentiment import get_sentiment
+
+        symbol = resolve_symbol(asset_name) or asset_name.upper()
+        sentiment = get_sentiment(symbol)
+        if sentiment is None:
             return {"sentiment": {"score": 0.5, "sentiment": "neutral"}}  # Fallback
+        return {"asset": symbol, "sentiment": sentiment}
 
     def get_asset_id(self, asset_name: str) -> str:
         """Helper to map asset name to ID."""
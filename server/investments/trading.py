@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.db import models, transaction as db_transaction
+from rest_framework import status
+
+from account.events import publish_user_event, trade_event
+from account.models import ledger_reason
+from .models import Portfolio, Transaction, asset_class
+
+
+class TradeError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+@db_transaction.atomic
+def execute_trade(profile, asset_symbol, asset_type, quantity, price, transaction_type):
+    """
+    Apply a validated buy or sell to a user's balance and portfolio and record it.
+
+    Runs in one database transaction; once it commits, the balances, position
+    and new transaction are pushed to the user's `ws/user/<id>/` connections.
+
+    :param price: Positive Decimal price per unit.
+    :param quantity: Positive integer quantity.
+    :return: (Transaction, profit_loss); profit_loss is None for buys.
+    :raises TradeError: If the trade cannot be executed.
+    """
+    amount = price * quantity
+    profit_loss = None
+
+    if transaction_type == 'buy':
+        if profile.balance < amount:
+            raise TradeError("Insufficient balance")
+        profile.balance -= amount
+        profile.boughtsum += amount
+        if asset_type == 'stock':
+            profile.stocks += amount
+        elif asset_type == 'bond':
+            profile.bonds += amount
+        else:
+            profile.insurance += amount
+
+        # Check if Portfolio exists, create or update accordingly
+        try:
+            portfolio = Portfolio.objects.get(user_profile=profile, asset_symbol=asset_symbol)
+            portfolio.quantity = models.F('quantity') + quantity
+            portfolio.save()
+            portfolio.refresh_from_db(fields=['quantity'])
+        except Portfolio.DoesNotExist:
+            portfolio = Portfolio.objects.create(
+                user_profile=profile,
+                asset_symbol=asset_symbol,
+                quantity=quantity
+            )
+
+    elif transaction_type == 'sell':
+        try:
+            portfolio = Portfolio.objects.get(user_profile=profile, asset_symbol=asset_symbol)
+        except Portfolio.DoesNotExist:
+            raise TradeError("Portfolio entry not found", status.HTTP_404_NOT_FOUND)
+        if portfolio.quantity < quantity:
+            raise TradeError("Not enough assets to sell")
+
+        # Calculate profit/loss
+        buy_transactions = Transaction.objects.filter(
+            user_profile=profile, asset_symbol=asset_symbol, transaction_type='buy'
+        ).order_by('created_at')
+        remaining_quantity = quantity
+        total_buy_cost = Decimal('0.00')
+
+        for buy in buy_transactions:
+            if remaining_quantity <= 0:
+                break
+            qty_to_use = min(remaining_quantity, buy.quantity)
+            total_buy_cost += qty_to_use * buy.price
+            remaining_quantity -= qty_to_use
+
+        profit_loss = (amount - total_buy_cost).quantize(Decimal('0.01'))
+
+        profile.balance += amount
+        profile.boughtsum -= amount
+        if asset_type == 'stock':
+            profile.stocks -= amount
+        elif asset_type == 'bond':
+            profile.bonds -= amount
+        else:
+            profile.insurance -= amount
+
+        portfolio.quantity -= quantity
+        if portfolio.quantity == 0:
+            portfolio.delete()
+        else:
+            portfolio.save()
+    else:
+        raise TradeError("Invalid transaction_type")
+
+    if profile.boughtsum < 0:
+        profile.boughtsum = 0
+    if profile.stocks < 0:
+        profile.stocks = 0
+
+    with ledger_reason('trade'):
+        profile.save()
+
+    transaction = Transaction.objects.create(
+        user_profile=profile, asset_symbol=asset_symbol, quantity=quantity,
+        transaction_type=transaction_type, price=price, amount=amount, asset_type=asset_class(asset_type)
+    )
+    publish_user_event(profile.user_id, trade_event(profile, 'real', asset_symbol, portfolio.quantity, {
+        'id': transaction.id,
+        'asset_symbol': asset_symbol,
+        'quantity': quantity,
+        'transaction_type': transaction_type,
+        'price': str(transaction.price.quantize(Decimal('0.01'))),
+        'amount': str(transaction.amount.quantize(Decimal('0.01'))),
+        'created_at': transaction.created_at.isoformat(),
+    }, profit_loss))
+    return transaction, profit_loss
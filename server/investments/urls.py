@@ -1,10 +1,17 @@
 from django.urls import path
-from .views import  PortfolioView, TransactionView, agent_chat, SentimentAnalysisView
+from .views import  PortfolioView, TransactionView, agent_chat, SentimentAnalysisView, AgentChatJobView, PriceHistoryView, CatalogView, InsurancePlanView, BondPricingView, BondRiskView, ProjectionView
 
 urlpatterns = [
     path('portfolio/<int:id>/', PortfolioView.as_view(), name='portfolio'),
     path('transactions/', TransactionView.as_view(), name='transactions-create'),
     path('transactions/<int:id>/', TransactionView.as_view(), name='transactions'),
     path('sentiment/', SentimentAnalysisView.as_view(), name='sentiment-analysis'),
+    path('prices/<str:symbol>/history/', PriceHistoryView.as_view(), name='price-history'),
+    path('catalog/', CatalogView.as_view(), name='catalog'),
+    path('bonds/pricing/', BondPricingView.as_view(), name='bond-pricing'),
+    path('portfolio/<int:id>/bond-risk/', BondRiskView.as_view(), name='bond-risk'),
+    path('projections/', ProjectionView.as_view(), name='projections'),
+    path('mock-insurance/', InsurancePlanView.as_view(), name='mock-insurance'),
     path('agent/', agent_chat, name='agent-chat'),
+    path('agent/jobs/', AgentChatJobView.as_view(), name='agent-chat-jobs'),
 ]
\ No newline at end of file
@@ -4,4 +4,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+# Set up Django before importing consumers, which import models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from account.routing import websocket_urlpatterns as account_websockets  # noqa: E402
+from investments.routing import websocket_urlpatterns as investment_websockets  # noqa: E402
+from virtual_market.routing import websocket_urlpatterns as virtual_websockets  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': URLRouter(investment_websockets + account_websockets + virtual_websockets),
+})
@@ -0,0 +1,103 @@
+"""
+Read-replica routing for heavy read endpoints.
+
+Only views wrapped with `replica_reads` read from the REPLICA_DATABASE_ALIAS
+connection (configured through REPLICA_DATABASE_URL); every other read and all
+writes stay on `default`. Users read their own writes: once a write for a user
+commits, `pin_to_primary` keeps that user's replica reads on the primary for
+REPLICA_STICKY_SECONDS, which should exceed the worst expected replication lag,
+and a replica-routed view that writes reads from the primary for the rest of
+the request. Pins live in the default cache, so every process must share it;
+the system check below fails otherwise. Replica reads may lag the user's data
+version, so nothing read from the replica is stored or tagged under it.
+"""
+import contextvars
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.utils.decorators import method_decorator
+
+_reads = contextvars.ContextVar('replica_reads', default=None)
+
+
+class _ReplicaReads:
+    def __init__(self):
+        self.wrote = False
+
+
+def replica_enabled():
+    return settings.REPLICA_DATABASE_ALIAS in settings.DATABASES
+
+
+def process_local(alias):
+    """Whether a cache is private to each process, so other workers never see its entries."""
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+@register(Tags.caches, Tags.database)
+def check_shared_cache(app_configs, **kwargs):
+    if replica_enabled() and process_local('default'):
+        return [Error(
+            "REPLICA_DATABASE_URL requires a cache shared by all processes.",
+            hint="Set CACHE_BACKEND (and CACHE_LOCATION) to e.g. Redis or Memcached, so read-your-writes "
+                 "pins set by one worker are seen by the others.",
+            id='server.E001',
+        )]
+    return []
+
+
+def in_replica_reads():
+    """Whether the current reads go to the replica."""
+    reads = _reads.get()
+    return reads is not None and not reads.wrote
+
+
+def _pin_key(user_id):
+    return f"db:pinned:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Keep a user's replica-routed reads on the primary for REPLICA_STICKY_SECONDS."""
+    if replica_enabled():
+        cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def replica_reads(view_func):
+    """
+    Route the reads of a view to the replica, unless the user the view reads
+    (its `id` or `user_id` argument) wrote recently.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user_id = kwargs.get('id', kwargs.get('user_id'))
+        if not replica_enabled() or (user_id is not None and cache.get(_pin_key(user_id))):
+            return view_func(request, *args, **kwargs)
+        token = _reads.set(_ReplicaReads())
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _reads.reset(token)
+
+    return wrapper
+
+
+# For APIView methods; put it outside etag_user_data, which leaves replica reads untagged
+read_from_replica = method_decorator(replica_reads)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return settings.REPLICA_DATABASE_ALIAS if in_replica_reads() else None
+
+    def db_for_write(self, model, **hints):
+        reads = _reads.get()
+        if reads is not None:
+            reads.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # The replica holds the same data as the primary
@@ -0,0 +1,220 @@
+"""
+Per-request instrumentation and Prometheus metrics.
+
+InstrumentationMiddleware times every request into per-endpoint latency
+histograms. A sampled fraction of requests (INSTRUMENTATION_SAMPLE_RATE) also
+gets a breakdown of where the time went: database queries, through a
+connection execute wrapper, and the blocks wrapped in `timed()` — yfinance
+calls, LLM calls, serializer `.data` and Monte Carlo projections, the
+COMPONENTS that are reported. The breakdown is returned in a
+`Server-Timing` header and aggregated per endpoint. Unsampled requests only pay
+for two clock reads and a histogram update.
+
+`metrics_view` serves everything in the Prometheus text format. Metrics are
+kept per process, so each worker is scraped on its own.
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMPONENTS = ['db', 'yfinance', 'llm', 'serializer', 'projection']
+
+_breakdown = contextvars.ContextVar('request_breakdown', default=None)
+_active = contextvars.ContextVar('timed_active', default=frozenset())
+
+
+class Breakdown:
+    """Seconds and call counts per component for one sampled request."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()  # Agent tools run on a pool in copies of the request context
+
+    def add(self, component, seconds):
+        with self._lock:
+            self.seconds[component] += seconds
+            self.counts[component] += 1
+
+
+@contextmanager
+def timed(component):
+    """
+    Count a block of work under `component` if the current request is sampled.
+
+    Nested blocks of the same component (e.g. a serializer used inside another
+    serializer) are only counted once, by the outermost block.
+    """
+    breakdown = _breakdown.get()
+    active = _active.get()
+    if breakdown is None or component in active:
+        yield
+        return
+    token = _active.set(active | {component})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        breakdown.add(component, time.perf_counter() - start)
+        _active.reset(token)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+_serializers_timed = False
+
+
+def _time_serializers():
+    """Time DRF serializer `.data`, which Serializer and ListSerializer both reach through super()."""
+    global _serializers_timed
+    if _serializers_timed:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data.fget
+
+    def timed_data(self):
+        with timed('serializer'):
+            return data(self)
+
+    BaseSerializer.data = property(timed_data)
+    _serializers_timed = True
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.latency = defaultdict(Histogram)  # (method, endpoint)
+        self.requests = defaultdict(int)  # (method, endpoint, status)
+        self.components = defaultdict(Histogram)  # (endpoint, component)
+        self.db_queries = defaultdict(int)  # endpoint
+        self.sampled = defaultdict(int)  # endpoint
+        self._lock = threading.Lock()
+
+    def observe(self, method, endpoint, status, seconds, breakdown=None):
+        with self._lock:
+            self.latency[method, endpoint].observe(seconds)
+            self.requests[method, endpoint, status] += 1
+            if breakdown is not None:
+                self.sampled[endpoint] += 1
+                self.db_queries[endpoint] += breakdown.counts['db']
+                for component in COMPONENTS:
+                    self.components[endpoint, component].observe(breakdown.seconds[component])
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            _histograms(lines, 'http_request_duration_seconds', "Request latency by endpoint.",
+                        ('method', 'endpoint'), self.latency)
+            lines += ['# HELP http_requests_total Requests by endpoint and status.',
+                      '# TYPE http_requests_total counter']
+            for (method, endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+            _histograms(lines, 'http_request_component_seconds', "Time per sampled request spent in a component.",
+                        ('endpoint', 'component'), self.components)
+            lines += ['# HELP http_request_db_queries_total Database queries made by sampled requests.',
+                      '# TYPE http_request_db_queries_total counter']
+            for endpoint, count in sorted(self.db_queries.items()):
+                lines.append(f"http_request_db_queries_total{_labels(endpoint=endpoint)} {count}")
+            lines += ['# HELP http_requests_sampled_total Requests with a component breakdown.',
+                      '# TYPE http_requests_sampled_total counter']
+            for endpoint, count in sorted(self.sampled.items()):
+                lines.append(f"http_requests_sampled_total{_labels(endpoint=endpoint)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histograms(lines, name, help_text, label_names, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+registry = Registry()
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"/{match.route}" if match is not None else 'unmatched'
+
+
+def _server_timing(breakdown, total):
+    entries = [f'db;dur={breakdown.seconds["db"] * 1000:.1f};desc="{breakdown.counts["db"]} queries"']
+    for component in COMPONENTS[1:]:
+        if breakdown.counts[component]:
+            entries.append(f"{component};dur={breakdown.seconds[component] * 1000:.1f}")
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        _time_serializers()
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            registry.observe(request.method, _endpoint(request), f"{response.status_code // 100}xx",
+                             time.perf_counter() - start)
+            return response
+
+        breakdown = Breakdown()
+        token = _breakdown.set(breakdown)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _breakdown.reset(token)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = _server_timing(breakdown, total)
+        registry.observe(request.method, _endpoint(request), f"{response.status_code // 100}xx", total, breakdown)
+        return response
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,186 @@
+"""
+Opt-in profiling of selected endpoints, switchable at runtime.
+
+ProfilingMiddleware profiles a request to one of PROFILING_URL_NAMES when:
+- it carries an `X-Profile` header matching PROFILING_TOKEN (any value with DEBUG on),
+- it falls in the PROFILING_SAMPLE_RATE fraction, or
+- it falls in the rate set at runtime with `manage.py profiles enable`, which is
+  stored in the cache and so reaches every worker sharing a CACHE_BACKEND
+  without a redeploy.
+
+The default 'sample' profiler is statistical: a helper thread records the view
+thread's stack every PROFILING_INTERVAL_MS and writes the samples as collapsed
+stacks (`frame;frame;frame count`, the input format of flamegraph.pl and
+speedscope). PROFILING_MODE=cprofile writes pstats files instead. Either way one
+file per profiled request goes to PROFILING_DIR, keeping the newest
+PROFILING_MAX_FILES, and `manage.py profiles merge` combines them into a report.
+"""
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+from django.conf import settings
+from django.core.cache import cache
+
+TOGGLE_KEY = 'profiling:rate'
+TOGGLE_CHECK_SECONDS = 5  # How long a worker reuses the runtime rate it read from the cache
+
+logger = logging.getLogger(__name__)
+
+_sequence = count()  # Keeps file names unique within a process
+
+
+def get_runtime_rate():
+    """Sample rate set with `manage.py profiles enable`, or 0."""
+    return cache.get(TOGGLE_KEY) or 0.0
+
+
+def set_runtime_rate(rate, seconds=None):
+    if rate:
+        cache.set(TOGGLE_KEY, float(rate), seconds)
+    else:
+        cache.delete(TOGGLE_KEY)
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        filename = os.path.relpath(filename, base)
+    else:
+        # Shorten library paths to the part after site-packages or the stdlib directory
+        for path in sorted(sys.path, key=len, reverse=True):
+            if path and filename.startswith(path):
+                filename = os.path.relpath(filename, path)
+                break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack from a helper thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        names = {}  # Code objects repeat across samples; name each once
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code not in names:
+                    names[code] = _frame_name(code)
+                stack.append(names[code])
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, samples in self.stacks.items():
+                f.write(f"{stack} {samples}\n")
+
+
+class CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def _rotate(directory, keep):
+    files = [entry for entry in os.scandir(directory)
+             if entry.name.endswith(('.collapsed', '.prof')) and not entry.name.startswith('merged')]
+    if len(files) <= keep:
+        return
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:len(files) - keep]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # Another worker rotated it first
+
+
+class ProfilingMiddleware:
+    """
+    Must come last in MIDDLEWARE: a profiled view is called from process_view,
+    so the process_view hooks of any middleware after it would be skipped.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.url_names = set(settings.PROFILING_URL_NAMES)
+        self._runtime_rate = 0.0
+        self._runtime_checked = 0.0
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def runtime_rate(self):
+        now = time.monotonic()
+        if now - self._runtime_checked > TOGGLE_CHECK_SECONDS:
+            self._runtime_rate = get_runtime_rate()
+            self._runtime_checked = now
+        return self._runtime_rate
+
+    def wants_profile(self, request):
+        header = request.headers.get('X-Profile')
+        if header and (settings.DEBUG or (settings.PROFILING_TOKEN and header == settings.PROFILING_TOKEN)):
+            return True
+        rate = max(settings.PROFILING_SAMPLE_RATE, self.runtime_rate())
+        return rate > 0 and random.random() < rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.url_name not in self.url_names or not self.wants_profile(request):
+            return None
+
+        if settings.PROFILING_MODE == 'cprofile':
+            profiler, suffix = CProfiler(), 'prof'
+        else:
+            profiler, suffix = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000), 'collapsed'
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()  # Rendering is part of the cost worth seeing
+        finally:
+            profiler.stop()
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+
+        directory = settings.PROFILING_DIR
+        name = (f"{time.strftime('%Y%m%dT%H%M%S')}-{request.resolver_match.url_name}-{request.method}"
+                f"-{elapsed_ms}ms-{os.getpid()}-{next(_sequence)}.{suffix}")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.write(os.path.join(directory, name))
+            _rotate(directory, settings.PROFILING_MAX_FILES)
+            response['X-Profile-File'] = name
+        except OSError as e:
+            logger.warning("Error writing profile %s: %s", name, e)
+        return response
@@ -39,6 +39,7 @@ APPEND_SLASH = False
 # Application definition
 
 INSTALLED_APPS = [
+    "daphne",  # ASGI runserver, so the WebSocket routes work in development
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -61,8 +62,12 @@ CHANNEL_LAYERS = {
         },
     },
 }
+# Single-process development without Redis: CHANNEL_LAYER=memory
+if os.getenv('CHANNEL_LAYER') == 'memory':
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
 
 MIDDLEWARE = [
+    'server.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.security.SecurityMiddleware",
     # 'whitenoise.middleware.WhiteNoiseMiddleware', 
@@ -72,6 +77,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    'server.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = "server.urls"
@@ -128,6 +134,16 @@ DATABASES = {
     'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
 }
 
+# Optional read replica for history and reporting endpoints (see server/db_router.py).
+# Reads of a user stay on the primary for REPLICA_STICKY_SECONDS after they write,
+# which needs a CACHE_BACKEND shared by all processes (a system check enforces it).
+REPLICA_DATABASE_ALIAS = 'replica'
+if os.getenv('REPLICA_DATABASE_URL'):
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(os.getenv('REPLICA_DATABASE_URL'))
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['server.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -169,3 +185,122 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Concurrent agent runs per `manage.py run_agent_jobs` worker process
+AGENT_JOB_WORKERS = int(os.getenv('AGENT_JOB_WORKERS', 4))
+# Jobs still running after AGENT_JOB_STALE_SECONDS are taken to have lost their
+# worker and are requeued, up to AGENT_JOB_MAX_ATTEMPTS claims in all
+AGENT_JOB_STALE_SECONDS = int(os.getenv('AGENT_JOB_STALE_SECONDS', 900))
+AGENT_JOB_MAX_ATTEMPTS = int(os.getenv('AGENT_JOB_MAX_ATTEMPTS', 3))
+
+# Shared thread pool for running independent agent tool calls concurrently
+AGENT_TOOL_WORKERS = int(os.getenv('AGENT_TOOL_WORKERS', 8))
+
+# Conversation memory per user and agent: recent turns are kept verbatim up to
+# AGENT_MEMORY_TOKEN_BUDGET, older turns are folded into a summary capped at
+# AGENT_MEMORY_SUMMARY_TOKENS. AGENT_MEMORY_SUMMARIZER may name a callable
+# (summary, turns, max_tokens) -> str, e.g. an LLM-backed summarizer.
+AGENT_MEMORY_TOKEN_BUDGET = int(os.getenv('AGENT_MEMORY_TOKEN_BUDGET', 1500))
+AGENT_MEMORY_SUMMARY_TOKENS = int(os.getenv('AGENT_MEMORY_SUMMARY_TOKENS', 300))
+AGENT_MEMORY_SUMMARIZER = os.getenv('AGENT_MEMORY_SUMMARIZER', 'agent.memory.extractive_summary')
+
+REST_FRAMEWORK = {
+    # orjson-backed when orjson is installed, DRF's encoder otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'investments.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Local memory by default; point every process at a shared backend (e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379/1) so invalidations and leases are seen by all
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+
+# Serialized profiles are cached per user and invalidated on every profile save.
+# Invalidations only reach other workers through a shared backend; with a
+# process-local one (locmem), entries and data versions (and so ETags) expire
+# after PROFILE_LOCAL_CACHE_SECONDS instead.
+PROFILE_CACHE_ALIAS = os.getenv('PROFILE_CACHE_ALIAS', 'default')
+PROFILE_CACHE_SECONDS = int(os.getenv('PROFILE_CACHE_SECONDS', 3600))
+PROFILE_LOCAL_CACHE_SECONDS = int(os.getenv('PROFILE_LOCAL_CACHE_SECONDS', 5))
+
+# Seconds a fetched market price is reused before yfinance is asked again
+PRICE_CACHE_SECONDS = int(os.getenv('PRICE_CACHE_SECONDS', 60))
+
+# Age at which a news headline counts half as much in a symbol's sentiment
+SENTIMENT_HALF_LIFE_HOURS = float(os.getenv('SENTIMENT_HALF_LIFE_HOURS', 24))
+
+# Live price WebSocket: upstream poll interval per symbol (seconds) and the
+# most tick messages per second sent to one connection; faster ticks are coalesced
+PRICE_STREAM_INTERVAL = float(os.getenv('PRICE_STREAM_INTERVAL', 5))
+PRICE_STREAM_MAX_RATE = float(os.getenv('PRICE_STREAM_MAX_RATE', 4))
+
+# Seconds a market replay tick stays in the cache unless the replay refreshes
+# it; once `replay_market` stops, virtual prices fall back to live data after this
+REPLAY_TICK_TTL = float(os.getenv('REPLAY_TICK_TTL', 15))
+
+# Fraction of requests (0-1) timed in detail: DB queries, yfinance, LLM,
+# serializer and projection time go into a Server-Timing header and the /metrics breakdown.
+# Every request is counted in the /metrics latency histograms either way.
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', 0))
+
+# Opt-in profiling of the views named in PROFILING_URL_NAMES, triggered by an
+# `X-Profile: <PROFILING_TOKEN>` header, this sample rate (0-1) or a rate set at
+# runtime with `manage.py profiles enable`. PROFILING_MODE is 'sample' (collapsed
+# stacks every PROFILING_INTERVAL_MS) or 'cprofile' (pstats); the newest
+# PROFILING_MAX_FILES files are kept in PROFILING_DIR.
+PROFILING_URL_NAMES = [name for name in os.getenv('PROFILING_URL_NAMES', 'transactions-create,agent-chat').split(',') if name]
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sample')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 5))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 200))
+
+# Insurance and bond products served by /investment/catalog/ from an in-memory
+# index; the files are checked for changes every CATALOG_RELOAD_SECONDS
+CATALOG_FILES = [path for path in os.getenv(
+    'CATALOG_FILES', f"{BASE_DIR / 'investments' / 'insurance.json'},{BASE_DIR / 'investments' / 'bonds.json'}"
+).split(',') if path]
+CATALOG_RELOAD_SECONDS = float(os.getenv('CATALOG_RELOAD_SECONDS', 2))
+
+# Yield curve (tenor in years: yield in percent) used for bond pricing when no
+# treasury yield series (^IRX, ^FVX, ^TNX, ^TYX) can be fetched
+BOND_FALLBACK_CURVE = {
+    float(tenor): float(rate) for tenor, rate in (
+        point.split(':') for point in os.getenv('BOND_FALLBACK_CURVE', '0.25:6.5,5:6.9,10:7.1,30:7.3').split(',') if point
+    )
+}
+# Most bonds one POST to /investment/bonds/pricing/ may price
+BOND_PRICING_MAX_INSTRUMENTS = int(os.getenv('BOND_PRICING_MAX_INSTRUMENTS', 10000))
+
+# Monte Carlo projections (/investment/projections/) resample the monthly
+# returns of PROJECTION_BENCHMARK, or without its history assume lognormal
+# returns with these annual percentages. At PROJECTION_POOL_MIN_PATHS paths or
+# more, PROJECTION_WORKERS processes (0 disables the pool) share the paths.
+PROJECTION_BENCHMARK = os.getenv('PROJECTION_BENCHMARK', '^NSEI')
+PROJECTION_ASSUMED_RETURN = float(os.getenv('PROJECTION_ASSUMED_RETURN', 12))
+PROJECTION_ASSUMED_VOLATILITY = float(os.getenv('PROJECTION_ASSUMED_VOLATILITY', 18))
+PROJECTION_MAX_PATHS = int(os.getenv('PROJECTION_MAX_PATHS', 500000))
+PROJECTION_WORKERS = int(os.getenv('PROJECTION_WORKERS', 0))
+PROJECTION_POOL_MIN_PATHS = int(os.getenv('PROJECTION_POOL_MIN_PATHS', 200000))
+
+# Warnings from the app loggers (failed price fetches, catalog reloads, event
+# publishing, profile writes) go to the console at LOG_LEVEL or above
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        app: {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'WARNING')}
+        for app in ('account', 'agent', 'investments', 'virtual_market', 'server')
+    },
+}
@@ -0,0 +1,70 @@
+import warnings
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .db_router import check_shared_cache, pin_to_primary, replica_reads
+
+
+def with_replica(**overrides):
+    """Settings with a second SQLite alias as the replica."""
+    databases = {
+        **settings.DATABASES,
+        'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:', 'TEST': {'MIRROR': 'default'}},
+    }
+    return override_settings(DATABASES=databases, **overrides)
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        # Django warns about overriding DATABASES; the router only reads it and
+        # no query is sent through the replica connection
+        replica = with_replica()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            replica.enable()
+        self.addCleanup(replica.disable)
+        cache.clear()
+
+    def read(self, **kwargs):
+        """The alias a replica-routed view would read users from."""
+        return replica_reads(lambda request, **kwargs: User.objects.all().db)(None, **kwargs)
+
+    def test_reads_go_to_replica_inside_replica_reads(self):
+        self.assertEqual(self.read(id=1), 'replica')
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_write_keeps_rest_of_request_on_primary(self):
+        @replica_reads
+        def view(request, id=None):
+            before = User.objects.all().db
+            User.objects.create_user(username='writer', password='secret')
+            return before, User.objects.all().db
+
+        self.assertEqual(view(None, id=1), ('replica', 'default'))
+
+    def test_recent_writer_is_pinned_to_primary(self):
+        pin_to_primary(7)
+        self.assertEqual(self.read(id=7), 'default')
+        self.assertEqual(self.read(user_id=7), 'default')
+        self.assertEqual(self.read(id=8), 'replica')
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def errors(self, backend):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            with with_replica(CACHES={'default': {'BACKEND': backend, 'LOCATION': '/tmp/db-router-check'}}):
+                return [error.id for error in check_shared_cache(None)]
+
+    def test_replica_with_process_local_cache_is_an_error(self):
+        self.assertEqual(self.errors('django.core.cache.backends.locmem.LocMemCache'), ['server.E001'])
+        self.assertEqual(self.errors('django.core.cache.backends.dummy.DummyCache'), ['server.E001'])
+
+    def test_replica_with_shared_cache_passes(self):
+        self.assertEqual(self.errors('django.core.cache.backends.filebased.FileBasedCache'), [])
+
+    def test_no_replica_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
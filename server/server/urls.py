@@ -16,12 +16,16 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
-from agent.views import FinanceAgentView
+from agent.views import FinanceAgentView, FinanceAgentJobView, AgentJobDetailView
+from server.instrumentation import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('investment/', include('investments.urls')),
     path('user/', include('account.urls')),
     path('api/finance-agent/', FinanceAgentView.as_view(), name='finance-agent'),
+    path('api/finance-agent/jobs/', FinanceAgentJobView.as_view(), name='finance-agent-jobs'),
+    path('api/agent-jobs/<int:id>/', AgentJobDetailView.as_view(), name='agent-job-detail'),
     path('virtual/', include('virtual_market.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,13 @@
+from investments.consumers import PriceStreamConsumer
+
+from .replay import FEED, current_ticks
+
+
+class ReplayStreamConsumer(PriceStreamConsumer):
+    """Simulated ticks from `manage.py replay_market`, with the same protocol as ws/prices/."""
+    feed = FEED
+    polled = False
+
+    async def latest_ticks(self, symbols):
+        ticks = await current_ticks(sorted(symbols))
+        return [{'symbol': symbol, 'price': str(price), 'ts': ts} for symbol, (price, ts) in ticks.items()]
@@ -0,0 +1,47 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from virtual_market.replay import DEFAULT_BARS_FILE, ReplayEngine, file_bars, yfinance_bars
+
+
+class Command(BaseCommand):
+    help = "Replay historical intraday bars on a simulated clock, pricing virtual trades from the current tick."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to replay (default: every symbol in the bars file)")
+        parser.add_argument('--source', choices=['file', 'yfinance'], default='file')
+        parser.add_argument('--file', default=str(DEFAULT_BARS_FILE), help="Intraday bars JSON for --source file")
+        parser.add_argument('--period', default='5d', help="History period for --source yfinance")
+        parser.add_argument('--interval', default='60m', help="Bar interval for --source yfinance")
+        parser.add_argument('--speed', type=float, default=100.0,
+                            help="Simulated seconds per real second; 0 replays as fast as possible")
+        parser.add_argument('--loops', type=int, default=1, help="Times to replay the bars (0 = until interrupted)")
+
+    def handle(self, *args, **options):
+        symbols = [symbol.upper() for symbol in options['symbols']]
+        if options['source'] == 'yfinance' and not symbols:
+            self.stderr.write("--source yfinance needs at least one symbol")
+            return
+
+        loop_number = 0
+        while not options['loops'] or loop_number < options['loops']:
+            loop_number += 1
+            if options['source'] == 'file':
+                streams = file_bars(options['file'], symbols)
+            else:
+                streams = yfinance_bars(symbols, options['period'], options['interval'])
+            engine = ReplayEngine(streams.values(), speed=options['speed'])
+            try:
+                elapsed = asyncio.run(engine.run())
+            except KeyboardInterrupt:
+                self.stdout.write(f"Stopped at {engine.sim_now} after {engine.ticks} ticks")
+                return
+            if engine.sim_start is None:
+                self.stderr.write("No bars to replay")
+                return
+            self.stdout.write(
+                f"Replayed {engine.ticks} ticks for {len(engine.symbols)} symbols "
+                f"({engine.sim_start} to {engine.sim_now}) in {elapsed:.2f}s, "
+                f"{engine.ticks / max(elapsed, 1e-9):.0f} ticks/s"
+            )
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_alter_userprofile_virtualboughtsum'),
+        ('virtual_market', '0002_alter_virtualportfolio_virtual_asset_symbol_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedVirtualTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('virtual_asset_symbol', models.CharField(max_length=100)),
+                ('virtual_quantity', models.IntegerField()),
+                ('virtual_transaction_type', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('virtual_price', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtual_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('virtual_created_at', models.DateTimeField()),
+                ('virtual_archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VirtualPositionSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('virtual_asset_symbol', models.CharField(max_length=100)),
+                ('virtual_closed_positions', models.IntegerField(default=0)),
+                ('virtual_trade_count', models.IntegerField(default=0)),
+                ('virtual_closed_quantity', models.IntegerField(default=0)),
+                ('virtual_bought_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('virtual_sold_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('virtual_realized_profit_loss', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('virtual_first_trade_at', models.DateTimeField()),
+                ('virtual_last_trade_at', models.DateTimeField()),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.userprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_profile', 'virtual_asset_symbol'), name='unique_virtual_position_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('virtual_market', '0003_archivedvirtualtransaction_virtualpositionsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvirtualtransaction',
+            name='virtual_asset_type',
+            field=models.CharField(choices=[('stock', 'Stock'), ('bond', 'Bond'), ('insurance', 'Insurance')], default='stock', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='virtualtransaction',
+            name='virtual_asset_type',
+            field=models.CharField(choices=[('stock', 'Stock'), ('bond', 'Bond'), ('insurance', 'Insurance')], default='stock', max_length=10),
+        ),
+    ]
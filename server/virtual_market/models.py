@@ -1,5 +1,6 @@
 from django.db import models
 from account.models import UserProfile
+from investments.models import ASSET_TYPES
 
 class VirtualPortfolio(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
@@ -16,7 +17,43 @@ class VirtualTransaction(models.Model):
     virtual_transaction_type = models.CharField(max_length=4, choices=[('buy', 'Buy'), ('sell', 'Sell')])
     virtual_price = models.DecimalField(max_digits=15, decimal_places=2)  # Price at transaction time
     virtual_amount = models.DecimalField(max_digits=15, decimal_places=2)  # Total cost/value
+    virtual_asset_type = models.CharField(max_length=10, choices=ASSET_TYPES, default='stock')
     virtual_created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user_profile} - {self.virtual_transaction_type} {self.virtual_quantity} of {self.virtual_asset_symbol} at {self.virtual_price}"
\ No newline at end of file
+        return f"{self.user_profile} - {self.virtual_transaction_type} {self.virtual_quantity} of {self.virtual_asset_symbol} at {self.virtual_price}"
+
+class ArchivedVirtualTransaction(models.Model):
+    """A VirtualTransaction of a closed-out position, moved out of the live table with its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    virtual_asset_symbol = models.CharField(max_length=100)
+    virtual_quantity = models.IntegerField()
+    virtual_transaction_type = models.CharField(max_length=4, choices=[('buy', 'Buy'), ('sell', 'Sell')])
+    virtual_price = models.DecimalField(max_digits=15, decimal_places=2)
+    virtual_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    virtual_asset_type = models.CharField(max_length=10, choices=ASSET_TYPES, default='stock')
+    virtual_created_at = models.DateTimeField()
+    virtual_archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_profile} - archived {self.virtual_transaction_type} {self.virtual_quantity} of {self.virtual_asset_symbol} at {self.virtual_price}"
+
+class VirtualPositionSummary(models.Model):
+    """Realized totals of a user's archived virtual positions in one symbol, each bought and sold down to zero."""
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    virtual_asset_symbol = models.CharField(max_length=100)
+    virtual_closed_positions = models.IntegerField(default=0)
+    virtual_trade_count = models.IntegerField(default=0)
+    virtual_closed_quantity = models.IntegerField(default=0)  # Units bought, and so also sold
+    virtual_bought_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    virtual_sold_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    virtual_realized_profit_loss = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    virtual_first_trade_at = models.DateTimeField()
+    virtual_last_trade_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user_profile', 'virtual_asset_symbol'], name='unique_virtual_position_summary')]
+
+    def __str__(self):
+        return f"{self.user_profile} - {self.virtual_asset_symbol} realized {self.virtual_realized_profit_loss}"
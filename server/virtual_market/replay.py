@@ -0,0 +1,153 @@
+"""
+Simulated-clock market replay for the virtual market.
+
+Historical intraday bars are streamed per symbol as generators, merged into a
+single time-ordered stream with heapq.merge and replayed against a simulated
+clock running `speed` times faster than real time (speed 0 replays as fast as
+possible, for load generation). Every tick is published to the `replay.<symbol>`
+channel groups behind `ws/replay/` and stored in the cache, where virtual trades
+read it as their fill price. The web server and `manage.py replay_market` must
+share a cache backend (e.g. Redis) for fills to see the replayed prices.
+Stored ticks expire after REPLAY_TICK_TTL seconds and are refreshed while the
+replay waits for the next one, so if the replay is killed prices fall back to
+live data shortly after.
+"""
+import asyncio
+import heapq
+import json
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+from zoneinfo import ZoneInfo
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from investments.prices import get_price_history
+from investments.streaming import publish_tick
+
+Bar = namedtuple('Bar', ['ts', 'symbol', 'price'])
+
+FEED = 'replay'
+DEFAULT_BARS_FILE = settings.BASE_DIR.parent / 'client' / 'src' / 'stocks.json'
+
+
+def _tick_key(symbol):
+    return f"replay:tick:{symbol}"
+
+
+def current_price(symbol):
+    """Price of the symbol at the current simulated tick, or None outside a replay."""
+    tick = cache.get(_tick_key(symbol))
+    return Decimal(tick[0]) if tick else None
+
+
+def current_prices(symbols):
+    """`current_price` for many symbols at once, omitting those not being replayed."""
+    keys = {_tick_key(symbol): symbol for symbol in symbols}
+    return {keys[key]: Decimal(tick[0]) for key, tick in cache.get_many(keys).items()}
+
+
+async def current_ticks(symbols):
+    """(price, simulated epoch seconds) of the current tick of each symbol being replayed."""
+    keys = {_tick_key(symbol): symbol for symbol in symbols}
+    return {
+        keys[key]: (Decimal(price), datetime.fromisoformat(stamp).timestamp())
+        for key, (price, stamp) in (await cache.aget_many(keys)).items()
+    }
+
+
+def _to_price(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def file_bars(path=DEFAULT_BARS_FILE, symbols=None):
+    """
+    Per-symbol bar generators from an Alpha Vantage style intraday dump.
+
+    :return: {symbol: generator of Bar in time order}
+    """
+    with open(path) as f:
+        series = json.load(f)['stocks']
+
+    def stream(symbol, tz, bars):
+        for stamp in sorted(bars):
+            ts = datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').replace(tzinfo=tz)
+            yield Bar(ts, symbol, _to_price(bars[stamp]['4. close']))
+
+    streams = {}
+    for item in series:
+        meta = item['Meta Data']
+        symbol = meta['2. Symbol']
+        if symbols and symbol not in symbols:
+            continue
+        key = next(key for key in item if key.startswith('Time Series'))
+        streams[symbol] = stream(symbol, ZoneInfo(meta.get('6. Time Zone', 'US/Eastern')), item[key])
+    return streams
+
+
+def yfinance_bars(symbols, period='5d', interval='60m'):
+    """Per-symbol bar generators from yfinance history, cached like live prices."""
+    def stream(symbol):
+        for bar in get_price_history(symbol, period, interval):
+            yield Bar(bar['ts'], symbol, bar['close'])
+
+    return {symbol: stream(symbol) for symbol in symbols}
+
+
+class ReplayEngine:
+    def __init__(self, streams, speed=100.0, layer=None):
+        """
+        :param streams: Iterables of Bar, each in time order (e.g. from `file_bars`).
+        :param speed: Simulated seconds per wall-clock second; 0 means no waiting.
+        """
+        self.streams = list(streams)
+        self.speed = speed
+        self.layer = layer or get_channel_layer()
+        self.symbols = set()
+        self.ticks = 0
+        self.sim_start = self.sim_now = None
+        self.latest = {}  # Cache entry of each symbol's current tick
+
+    def ticks_by_time(self):
+        """Merged bars, grouped into the ticks that share a simulated timestamp."""
+        for ts, bars in groupby(heapq.merge(*self.streams), key=attrgetter('ts')):
+            yield ts, list(bars)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        wall_start = loop.time()
+        try:
+            for ts, bars in self.ticks_by_time():
+                if self.sim_start is None:
+                    self.sim_start = ts
+                if self.speed:
+                    await self.wait_until(wall_start + (ts - self.sim_start).total_seconds() / self.speed)
+                await self.publish(ts, bars)
+        finally:
+            # Outside a replay virtual trades go back to client-supplied prices
+            await cache.adelete_many([_tick_key(symbol) for symbol in self.symbols])
+        return loop.time() - wall_start
+
+    async def wait_until(self, deadline):
+        """Sleep until a loop time, refreshing the stored ticks before they expire."""
+        loop = asyncio.get_running_loop()
+        refresh = settings.REPLAY_TICK_TTL / 3
+        while (remaining := deadline - loop.time()) > 0:
+            await asyncio.sleep(min(remaining, refresh))
+            if self.latest and loop.time() < deadline:
+                await cache.aset_many(self.latest, settings.REPLAY_TICK_TTL)
+
+    async def publish(self, ts, bars):
+        self.sim_now = ts
+        stamp = ts.isoformat()
+        entries = {_tick_key(bar.symbol): (str(bar.price), stamp) for bar in bars}
+        self.latest.update(entries)
+        await cache.aset_many(entries, settings.REPLAY_TICK_TTL)
+        for bar in bars:
+            self.symbols.add(bar.symbol)
+            await publish_tick(bar.symbol, bar.price, ts=ts.timestamp(), layer=self.layer, feed=FEED)
+        self.ticks += len(bars)
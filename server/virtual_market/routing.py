@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import ReplayStreamConsumer
+
+websocket_urlpatterns = [
+    path('ws/replay/', ReplayStreamConsumer.as_asgi()),
+]
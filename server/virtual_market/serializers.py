@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from investments.serializers import FlatListSerializer
 from .models import VirtualPortfolio, VirtualTransaction
 
 class VirtualPortfolioSerializer(serializers.ModelSerializer):
@@ -9,4 +10,5 @@ class VirtualPortfolioSerializer(serializers.ModelSerializer):
 class VirtualTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = VirtualTransaction
-        fields = ['id', 'user_profile', 'virtual_asset_symbol', 'virtual_quantity', 'virtual_transaction_type', 'virtual_price', 'virtual_amount', 'virtual_created_at']
\ No newline at end of file
+        fields = ['id', 'user_profile', 'virtual_asset_symbol', 'virtual_quantity', 'virtual_transaction_type', 'virtual_price', 'virtual_amount', 'virtual_created_at']
+        list_serializer_class = FlatListSerializer
\ No newline at end of file
@@ -3,10 +3,18 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import VirtualPortfolio, VirtualTransaction
 from .serializers import VirtualPortfolioSerializer, VirtualTransactionSerializer
-from account.models import UserProfile
+from .replay import current_price
+from account.models import UserProfile, ledger_reason
+from account.cache import etag_user_data
+from server.db_router import read_from_replica
+from investments.models import asset_class
+from investments.renderers import LIST_RENDERERS
+from account.events import publish_user_event, trade_event
+from django.db import models, transaction
 from decimal import Decimal
 
 class VirtualPortfolioView(APIView):
+    @etag_user_data
     def get(self, request, id=None):
         try:
             profile = UserProfile.objects.get(user__id=id)
@@ -17,6 +25,10 @@ class VirtualPortfolioView(APIView):
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
 class VirtualTransactionView(APIView):
+    renderer_classes = LIST_RENDERERS
+
+    @read_from_replica
+    @etag_user_data
     def get(self, request, id=None):
         if not id:
             return Response({"error": "User ID is required for GET requests"}, status=status.HTTP_400_BAD_REQUEST)
@@ -28,6 +40,7 @@ class VirtualTransactionView(APIView):
         except UserProfile.DoesNotExist:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    @transaction.atomic
     def post(self, request, id=None):
         user_id = request.data.get('user_id')
         virtual_asset_type = request.data.get('virtual_asset_type')
@@ -38,6 +51,10 @@ class VirtualTransactionView(APIView):
             profile = UserProfile.objects.get(user__id=user_id)
             virtual_asset_symbol = request.data.get('virtual_asset_symbol')
             virtual_price = request.data.get('virtual_price')
+            # During a market replay, fills use the simulated tick rather than the client's price
+            replay_price = current_price(virtual_asset_symbol) if virtual_asset_symbol else None
+            if replay_price is not None:
+                virtual_price = replay_price
             virtual_quantity = request.data.get('virtual_quantity', 0)
             virtual_transaction_type = request.data.get('virtual_transaction_type')
             print(virtual_asset_symbol, virtual_price, virtual_quantity, virtual_transaction_type)
@@ -86,8 +103,9 @@ class VirtualTransactionView(APIView):
                     virtual_portfolio = VirtualPortfolio.objects.get(user_profile=profile, virtual_asset_symbol=virtual_asset_symbol)
                     virtual_portfolio.virtual_quantity = models.F('virtual_quantity') + virtual_quantity
                     virtual_portfolio.save()
+                    virtual_portfolio.refresh_from_db(fields=['virtual_quantity'])
                 except VirtualPortfolio.DoesNotExist:
-                    VirtualPortfolio.objects.create(
+                    virtual_portfolio = VirtualPortfolio.objects.create(
                         user_profile=profile,
                         virtual_asset_symbol=virtual_asset_symbol,
                         virtual_quantity=virtual_quantity
@@ -140,7 +158,8 @@ class VirtualTransactionView(APIView):
             if profile.virtualstocks < 0:
                 profile.virtualstocks = 0
 
-            profile.save()
+            with ledger_reason('virtual_trade'):
+                profile.save()
 
             virtual_transaction = VirtualTransaction.objects.create(
                 user_profile=profile,
@@ -148,7 +167,8 @@ class VirtualTransactionView(APIView):
                 virtual_quantity=virtual_quantity,
                 virtual_transaction_type=virtual_transaction_type,
                 virtual_price=virtual_price,
-                virtual_amount=virtual_amount
+                virtual_amount=virtual_amount,
+                virtual_asset_type=asset_class(virtual_asset_type)
             )
             serializer = VirtualTransactionSerializer(virtual_transaction)
 
@@ -156,9 +176,18 @@ class VirtualTransactionView(APIView):
             if virtual_transaction_type == 'sell':
                 response_data['virtual_profit_loss'] = str(virtual_profit_loss)
 
+            # Sent once the trade commits, so dashboards update without re-fetching
+            event_transaction = {key: value for key, value in response_data.items() if key not in ('user_profile', 'virtual_profit_loss')}
+            publish_user_event(profile.user_id, trade_event(
+                profile, 'virtual', virtual_asset_symbol, virtual_portfolio.virtual_quantity, event_transaction,
+                virtual_profit_loss if virtual_transaction_type == 'sell' else None,
+            ))
+
             return Response(response_data, status=status.HTTP_201_CREATED)
 
         except UserProfile.DoesNotExist:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
+            # Undo any partial writes; the error is reported rather than raised
+            transaction.set_rollback(True)
             return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -165,47 +165,47 @@ def fetch_financial_risk_indicators(ticker: str):
         return None
 
 
-# forex_df = fetch_forex_rates("EURUSD=X", "1mo")
-# print(forex_df.head())
+if __name__ == "__main__":
+    # forex_df = fetch_forex_rates("EURUSD=X", "1mo")
+    # print(forex_df.head())
  
-Example usage:
-df = fetch_stock_prices("AMZN", "1wk")
-print(df.head())
-print(df)
+    # Example usage:
+    df = fetch_stock_prices("AMZN", "1wk")
+    print(df.head())
+    print(df)
 
-# index_df = fetch_market_indices("^GDAXI", "1mo")
-# print(index_df.head())
+    # index_df = fetch_market_indices("^GDAXI", "1mo")
+    # print(index_df.head())
 
-# forex_df = fetch_forex_rates("EURCHF=X", "1wk")
-# print(forex_df)
+    # forex_df = fetch_forex_rates("EURCHF=X", "1wk")
+    # print(forex_df)
 
-# financials = fetch_company_financials("TSLA")
-# print(financials)
+    # financials = fetch_company_financials("TSLA")
+    # print(financials)
 
-# ratings = fetch_analyst_ratings("NVDA")
-# print(ratings)
+    # ratings = fetch_analyst_ratings("NVDA")
+    # print(ratings)
 
-# commodity_prices = fetch_commodity_prices("ALI=F", "1mo")
-# print(commodity_prices.head())
+    # commodity_prices = fetch_commodity_prices("ALI=F", "1mo")
+    # print(commodity_prices.head())
 
-# bond_data = fetch_bond_yields("^TNX", "1wk")
-# print(bond_data.head())
+    # bond_data = fetch_bond_yields("^TNX", "1wk")
+    # print(bond_data.head())
 
-# Fetch financial news for Microsoft (MSFT)
-# news_data = fetch_financial_news("NVDA")
-# import json
-# print(json.dumps(news_data, indent=4))
+    # Fetch financial news for Microsoft (MSFT)
+    # news_data = fetch_financial_news("NVDA")
+    # import json
+    # print(json.dumps(news_data, indent=4))
 
 
-# volatility = analyze_stock_volatility("NVDA", "1wk")
-# if volatility is not None:
-#     print(f"Apple's stock volatility (1-year): {volatility:.4f}")
-# else:
-#     print("Failed to fetch stock volatility.")
-
-# beta = fetch_financial_risk_indicators("NVDA")
-# if beta is not None:
-#     print(f"Apple's beta value: {beta}")
-# else:
-#     print("Failed to fetch beta value.")
+    # volatility = analyze_stock_volatility("NVDA", "1wk")
+    # if volatility is not None:
+    #     print(f"Apple's stock volatility (1-year): {volatility:.4f}")
+    # else:
+    #     print("Failed to fetch stock volatility.")
 
+    # beta = fetch_financial_risk_indicators("NVDA")
+    # if beta is not None:
+    #     print(f"Apple's beta value: {beta}")
+    # else:
+    #     print("Failed to fetch beta value.")